@@ -0,0 +1,212 @@
+"""Fake OpenAI-compatible backend for the benchmarks.
+
+Answers ``/v1/chat/completions`` the way a model would, with a suggestion
+for every row of the prompt's table, buffered or streamed as server-sent
+events, after a configurable latency. A configurable share of the requests
+fails, to measure how retries affect the endpoints. ``/v1/models`` lists
+the one fake model.
+
+Run it on its own to point a development instance at it::
+
+    python benchmarks/fake_backend.py --port 8081 --latency-ms 300
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import re
+import time
+
+from aiohttp import web
+
+MODEL = "bench-model"
+
+# Characters of the reply sent per streamed chunk
+STREAM_CHUNK_CHARS = 48
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _slug(text: str) -> str:
+    """Return ``text`` as a lowercase object ID."""
+    return _SLUG_RE.sub("_", text.lower()).strip("_")
+
+
+def _suggestion(row: dict[str, str]) -> str:
+    """Return a plausible suggestion for one row of a prompt table."""
+    if "pattern" in row:
+        return f"{row['domain']}.{{location}}_{{device}}_{_slug(row['pattern']) or 'main'}"
+    if "entity_id" in row:
+        domain, _, object_id = row["entity_id"].partition(".")
+        return f"{domain}.{_slug(row.get('name') or '') or object_id}_bench"
+    return f"{row.get('name') or row['id']} Bench"
+
+
+def reply_suggestions(prompt: str) -> list[dict]:
+    """Return the reply entries to a suggestion prompt, one per table row.
+
+    The table is the last block of tab-separated lines of the prompt, under a
+    header row whose first column is ``id``.
+    """
+    lines = prompt.splitlines()
+    start = max(
+        (position for position, line in enumerate(lines) if line.startswith("id\t")), default=None
+    )
+    suggestions = []
+    if start is not None:
+        columns = lines[start].split("\t")
+        for line in lines[start + 1 :]:
+            if "\t" not in line:
+                continue
+            row = dict(zip(columns, line.split("\t")))
+            suggestions.append({"id": row["id"], "suggestion": _suggestion(row)})
+    return suggestions
+
+
+class FakeBackend:
+    """OpenAI-compatible server answering suggestion prompts.
+
+    Every request waits ``latency`` seconds, spread by ``jitter`` and
+    extended by ``row_latency`` per suggested row to mimic generation, and
+    fails with ``failure_status`` with probability ``failure_rate``.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        row_latency: float = 0.0,
+        failure_rate: float = 0.0,
+        failure_status: int = 500,
+        seed: int = 0,
+    ) -> None:
+        """Initialize the backend."""
+        self.latency = latency
+        self.jitter = jitter
+        self.row_latency = row_latency
+        self.failure_rate = failure_rate
+        self.failure_status = failure_status
+        self.stats = {"requests": 0, "failures": 0, "rows": 0}
+        self._random = random.Random(seed)
+        self._runner: web.AppRunner | None = None
+
+    def app(self) -> web.Application:
+        """Return the web application of the backend."""
+        app = web.Application()
+        app.router.add_get("/v1/models", self._models)
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+        return app
+
+    async def async_start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Serve the backend and return its base URL."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}/v1"
+
+    async def async_stop(self) -> None:
+        """Stop serving the backend."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _models(self, request: web.Request) -> web.Response:
+        """List the fake model."""
+        return web.json_response(
+            {
+                "object": "list",
+                "data": [{"id": MODEL, "object": "model", "created": 0, "owned_by": "bench"}],
+            }
+        )
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        """Answer a chat completion after the configured latency."""
+        body = await request.json()
+        self.stats["requests"] += 1
+        prompt = body["messages"][-1]["content"]
+        suggestions = reply_suggestions(prompt)
+        content = json.dumps({"suggestions": suggestions})
+
+        delay = self._random.gauss(self.latency, self.jitter) + len(suggestions) * self.row_latency
+        await asyncio.sleep(max(0.0, delay))
+        if self._random.random() < self.failure_rate:
+            self.stats["failures"] += 1
+            return web.json_response(
+                {"error": {"message": "Injected failure", "type": "server_error"}},
+                status=self.failure_status,
+                headers={"retry-after": "0"},
+            )
+        self.stats["rows"] += len(suggestions)
+
+        completion = {
+            "id": f"chatcmpl-{self.stats['requests']}",
+            "created": int(time.time()),
+            "model": body.get("model", MODEL),
+        }
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    **completion,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": len(prompt) // 4,
+                        "completion_tokens": len(content) // 4,
+                        "total_tokens": (len(prompt) + len(content)) // 4,
+                    },
+                }
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        deltas = [{"role": "assistant", "content": ""}] + [
+            {"content": content[start : start + STREAM_CHUNK_CHARS]}
+            for start in range(0, len(content), STREAM_CHUNK_CHARS)
+        ]
+        for position, delta in enumerate(deltas):
+            last = position == len(deltas) - 1
+            chunk = {
+                **completion,
+                "object": "chat.completion.chunk",
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": "stop" if last else None}
+                ],
+            }
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def main() -> None:
+    """Serve the fake backend until interrupted."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--row-latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--failure-status", type=int, default=500)
+    args = parser.parse_args()
+
+    backend = FakeBackend(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        row_latency=args.row_latency_ms / 1000,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+    )
+    web.run_app(backend.app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,549 @@
+"""Benchmarks of the Entity Renamer HTTP endpoints on large synthetic registries.
+
+For every registry size, a Home Assistant instance is filled with synthetic
+areas, devices and entities, the integration's views are served over HTTP
+and every endpoint is called the way the panel calls it. Suggestions come
+from a local fake OpenAI-compatible backend with configurable latency and
+failure rate. Latency, throughput and the memory allocated per request are
+reported for every endpoint, and can be compared against a saved baseline
+to catch regressions::
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json
+
+Runs against the Home Assistant installed for the tests.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from collections.abc import Awaitable, Callable
+from functools import partial
+from types import SimpleNamespace
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from fake_backend import MODEL, FakeBackend  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from synthetic import async_populate_registries, synthetic_registry  # noqa: E402
+
+from custom_components import entity_renamer  # noqa: E402
+from custom_components.entity_renamer.cache import SuggestionCache  # noqa: E402
+from custom_components.entity_renamer.client import async_create_entry_client  # noqa: E402
+from custom_components.entity_renamer.const import CONF_BASE_URL, CONF_MODEL, DOMAIN  # noqa: E402
+from custom_components.entity_renamer.journal import RenameJournal  # noqa: E402
+from custom_components.entity_renamer.references import ReferenceIndex  # noqa: E402
+from custom_components.entity_renamer.registry_index import RegistryIndex  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+
+# Registries loaded before the synthetic data is added; floors and labels
+# only exist in newer Home Assistant versions
+REGISTRIES = (
+    "floor_registry",
+    "label_registry",
+    "area_registry",
+    "device_registry",
+    "entity_registry",
+)
+
+VIEWS = (
+    entity_renamer.EntityListView,
+    entity_renamer.DeviceListView,
+    entity_renamer.RegistryChangesView,
+    entity_renamer.RenameEntityView,
+    entity_renamer.BulkRenameView,
+    entity_renamer.CheckRenamesView,
+    entity_renamer.RenameJournalView,
+    entity_renamer.UndoRenameView,
+    entity_renamer.OpenAISuggestionsView,
+    entity_renamer.OpenAIDeviceSuggestionsView,
+)
+
+API = "/api/entity_renamer"
+
+# Query of the panel's paged search
+SEARCH_PAGE = {"search": "sensor", "sort": "name", "limit": "100"}
+
+# Latency and memory increases below these are noise, not regressions
+MIN_LATENCY_REGRESSION_MS = 1.0
+MIN_MEMORY_REGRESSION_KIB = 64.0
+
+
+class _BenchConfigEntries:
+    """Stand-in for the config entries of Home Assistant, holding one entry."""
+
+    def __init__(self, entry) -> None:
+        """Initialize with the single entry."""
+        self._entry = entry
+
+    def async_entries(self, domain: str | None = None, *args, **kwargs) -> list:
+        """Return the entry."""
+        return [self._entry]
+
+    def async_get_entry(self, entry_id: str):
+        """Return the entry if it has ``entry_id``."""
+        return self._entry if entry_id == self._entry.entry_id else None
+
+
+async def _async_handle(handler, request: web.Request) -> web.StreamResponse:
+    """Call a view handler with the URL parameters, as Home Assistant does."""
+    return await handler(request, **request.match_info)
+
+
+def _api_app(hass: HomeAssistant) -> web.Application:
+    """Return a web application serving the integration's views."""
+    app = web.Application(client_max_size=64 * 1024 * 1024)
+    app["hass"] = hass
+    for view_class in VIEWS:
+        view = view_class()
+        for method in ("get", "post", "delete"):
+            if (handler := getattr(view, method, None)) is not None:
+                app.router.add_route(method.upper(), view.url, partial(_async_handle, handler))
+    return app
+
+
+class Recorder:
+    """Latency, throughput and memory of the requests to each endpoint."""
+
+    def __init__(self) -> None:
+        """Initialize the recorder."""
+        self.results: dict[str, dict] = {}
+        self._latencies: dict[str, list[float]] = defaultdict(list)
+        self._errors: Counter[str] = Counter()
+        self._peaks: dict[str, int] = {}
+
+    async def async_call(self, name: str, call: Callable[[], Awaitable[bool]]) -> None:
+        """Time one call, which returns whether the request succeeded."""
+        start = time.perf_counter()
+        if not await call():
+            self._errors[name] += 1
+        self._latencies[name].append(time.perf_counter() - start)
+
+    async def async_trace(self, name: str, call: Callable[[], Awaitable[bool]]) -> None:
+        """Trace the peak memory allocated by one call.
+
+        Tracing slows every allocation down, so these calls are not timed.
+        """
+        tracemalloc.start()
+        try:
+            await call()
+            self._peaks[name] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    async def async_measure(
+        self, name: str, call: Callable[[], Awaitable[bool]], repeat: int, items: int = 1
+    ) -> None:
+        """Time ``repeat`` calls, trace one more and summarize them."""
+        for _ in range(repeat):
+            await self.async_call(name, call)
+        await self.async_trace(name, call)
+        self.summarize(name, items)
+
+    def summarize(self, name: str, items: int = 1) -> None:
+        """Record the results of an endpoint; ``items`` are handled per request."""
+        latencies = sorted(self._latencies[name])
+        total = sum(latencies)
+        self.results[name] = {
+            "requests": len(latencies),
+            "errors": self._errors[name],
+            "items": items,
+            "p50_ms": round(statistics.median(latencies) * 1000, 3),
+            "p95_ms": round(latencies[int((len(latencies) - 1) * 0.95)] * 1000, 3),
+            "max_ms": round(latencies[-1] * 1000, 3),
+            "requests_per_s": round(len(latencies) / total, 2),
+            "items_per_s": round(len(latencies) * items / total, 1),
+            "peak_kib": round(self._peaks.get(name, 0) / 1024, 1),
+        }
+
+
+async def _async_request(
+    session: aiohttp.ClientSession,
+    method: str,
+    path: str,
+    *,
+    expect: tuple[int, ...] = (200,),
+    **kwargs,
+):
+    """Send a request to the integration and return its status and body.
+
+    Failed suggestions (``429`` and ``500``) are counted as errors; any
+    other status outside ``expect`` means the endpoint is broken rather than
+    slow, so it stops the benchmark.
+    """
+    async with session.request(method, f"{API}{path}", **kwargs) as response:
+        body = await response.read()
+        if response.status not in (*expect, 429, 500):
+            raise RuntimeError(f"{method} {path} answered {response.status}: {body[:200]!r}")
+        return response.status, body
+
+
+async def _async_setup(hass: HomeAssistant, base_url: str, size: int, seed: int) -> None:
+    """Load the registries, add the synthetic data and set up the integration."""
+    for name in REGISTRIES:
+        try:
+            module = importlib.import_module(f"homeassistant.helpers.{name}")
+        except ImportError:
+            continue
+        await module.async_load(hass)
+
+    entry = SimpleNamespace(
+        entry_id="benchmark",
+        domain=DOMAIN,
+        title="Benchmark",
+        data={"api_key": "benchmark", CONF_BASE_URL: base_url, CONF_MODEL: MODEL},
+        options={},
+    )
+    hass.config_entries = _BenchConfigEntries(entry)
+
+    await async_populate_registries(hass, synthetic_registry(size, seed), entry.entry_id)
+
+    # The same state as async_setup and async_setup_entry create
+    index = RegistryIndex(hass)
+    index.async_start()
+    cache = SuggestionCache(hass)
+    await cache.async_load()
+    journal = RenameJournal(hass)
+    await journal.async_load()
+    references = ReferenceIndex(hass)
+    hass.data.setdefault(DOMAIN, {}).update(
+        index=index, cache=cache, journal=journal, references=references
+    )
+    client, http_client = await async_create_entry_client(hass, entry)
+    hass.data[DOMAIN][entry.entry_id] = {"client": client, "http_client": http_client}
+
+
+async def async_benchmark_size(size: int, args: argparse.Namespace) -> dict:
+    """Benchmark every endpoint on a registry of ``size`` entities."""
+    recorder = Recorder()
+    backend = FakeBackend(
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        row_latency=args.row_latency_ms / 1000,
+        failure_rate=args.failure_rate,
+        failure_status=args.failure_status,
+        seed=args.seed,
+    )
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        base_url = await backend.async_start()
+        runner = web.AppRunner(_api_app(hass))
+        await runner.setup()
+        await web.TCPSite(runner, "127.0.0.1", 0).start()
+        host, port = runner.addresses[0][:2]
+        try:
+            start = time.perf_counter()
+            await _async_setup(hass, base_url, size, args.seed)
+            setup_s = time.perf_counter() - start
+
+            async with aiohttp.ClientSession(f"http://{host}:{port}") as session:
+                await _async_run_endpoints(hass, session, recorder, size, args)
+        finally:
+            if runtime := hass.data.get(DOMAIN, {}).get("benchmark"):
+                await runtime["http_client"].aclose()
+            await runner.cleanup()
+            await backend.async_stop()
+            await hass.async_stop(force=True)
+
+    return {
+        "entities": size,
+        "setup_s": round(setup_s, 2),
+        "max_rss_mib": _max_rss_mib(),
+        "backend": dict(backend.stats),
+        "endpoints": recorder.results,
+    }
+
+
+async def _async_run_endpoints(
+    hass: HomeAssistant,
+    session: aiohttp.ClientSession,
+    recorder: Recorder,
+    size: int,
+    args: argparse.Namespace,
+) -> None:
+    """Call every endpoint the way the panel does and record the results."""
+    repeat = args.repeat
+
+    async def _ok(method: str, path: str, expect=(200,), **kwargs) -> bool:
+        status, _ = await _async_request(session, method, path, expect=expect, **kwargs)
+        return status in expect
+
+    async def _cold_entities() -> bool:
+        # A fresh index is built by the request, as on the first one after startup
+        hass.data[DOMAIN]["index"].async_stop()
+        index = hass.data[DOMAIN]["index"] = RegistryIndex(hass)
+        index.async_start()
+        return await _ok("GET", "/entities")
+
+    await recorder.async_measure("entities (cold)", _cold_entities, min(repeat, 5), size)
+
+    _, body = await _async_request(session, "GET", "/entities")
+    entities = json.loads(body)
+    etag = hass.data[DOMAIN]["index"].etag
+
+    await recorder.async_measure("entities", partial(_ok, "GET", "/entities"), repeat, size)
+    await recorder.async_measure(
+        "entities (search page)",
+        partial(_ok, "GET", "/entities", params=SEARCH_PAGE),
+        repeat,
+        int(SEARCH_PAGE["limit"]),
+    )
+    await recorder.async_measure(
+        "entities (not modified)",
+        partial(_ok, "GET", "/entities", expect=(304,), headers={"If-None-Match": etag}),
+        repeat,
+        size,
+    )
+
+    _, body = await _async_request(session, "GET", "/devices")
+    devices = json.loads(body)
+    await recorder.async_measure("devices", partial(_ok, "GET", "/devices"), repeat, len(devices))
+
+    batch = entities[: args.batch_size]
+    renames = [
+        {
+            "entity_id": entity["entity_id"],
+            "new_entity_id": f"{entity['entity_id']}_bench",
+            "new_name": f"{entity['name'] or entity['entity_id']} Bench",
+        }
+        for entity in batch
+    ]
+    await recorder.async_measure(
+        "check", partial(_ok, "POST", "/check", json={"renames": renames}), repeat, len(batch)
+    )
+
+    suggest_entities = entities[: args.suggest_size]
+    suggest_body = {"entities": suggest_entities, "refresh": True, "local": False}
+    await recorder.async_measure(
+        "suggest",
+        partial(_ok, "POST", "/suggest", json=suggest_body),
+        args.suggest_repeat,
+        len(suggest_entities),
+    )
+
+    async def _stream() -> bool:
+        _, body = await _async_request(
+            session, "POST", "/suggest", json={**suggest_body, "stream": True}
+        )
+        # The last line reports whether the suggestions were all produced
+        return bool(json.loads(body.splitlines()[-1]).get("success"))
+
+    await recorder.async_measure(
+        "suggest (stream)", _stream, args.suggest_repeat, len(suggest_entities)
+    )
+    suggest_devices = devices[: args.suggest_size]
+    await recorder.async_measure(
+        "suggest_device",
+        partial(
+            _ok,
+            "POST",
+            "/suggest_device",
+            json={"devices": suggest_devices, "refresh": True, "local": False},
+        ),
+        args.suggest_repeat,
+        len(suggest_devices),
+    )
+
+    # Each bulk rename is undone before the next one, so every call renames
+    # the same entities
+    batch_ids = []
+
+    async def _bulk_rename() -> bool:
+        _, body = await _async_request(
+            session, "POST", "/rename_bulk", expect=(200, 409), json={"entities": renames}
+        )
+        result = json.loads(body)
+        batch_ids.append(result.get("batch_id"))
+        return bool(result.get("success"))
+
+    async def _undo() -> bool:
+        if (batch_id := batch_ids.pop()) is None:
+            return False
+        return await _ok("POST", f"/journal/{batch_id}/undo", json={})
+
+    for _ in range(repeat):
+        await recorder.async_call("rename_bulk", _bulk_rename)
+        await recorder.async_call("undo", _undo)
+    await recorder.async_trace("rename_bulk", _bulk_rename)
+    await recorder.async_trace("undo", _undo)
+    recorder.summarize("rename_bulk", len(batch))
+    recorder.summarize("undo", len(batch))
+
+    # The change feed replays the single renames below
+    since = hass.data[DOMAIN]["index"].token
+
+    # Entities outside the bulk batch, unless the registry is that small
+    single = iter(entities[len(batch) :] if len(entities) > len(batch) + repeat else entities)
+
+    async def _rename() -> bool:
+        entity = next(single)
+        return await _ok(
+            "POST",
+            "/rename",
+            json={"entity_id": entity["entity_id"], "new_entity_id": f"{entity['entity_id']}_one"},
+        )
+
+    await recorder.async_measure("rename", _rename, repeat)
+
+    await recorder.async_measure(
+        "changes", partial(_ok, "GET", "/changes", params={"since": since}), repeat
+    )
+    await recorder.async_measure("journal", partial(_ok, "GET", "/journal"), repeat)
+
+
+def _max_rss_mib() -> float | None:
+    """Return the peak resident memory of the process so far, in MiB."""
+    try:
+        import resource
+    except ImportError:
+        # Not available on Windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def find_regressions(baseline: dict, results: dict, tolerance: float) -> list[str]:
+    """Return the endpoints that got slower or use more memory than in ``baseline``.
+
+    An endpoint regressed when its median or 95th percentile latency, or
+    the memory one request allocates, grew by more than ``tolerance`` (a
+    fraction) and by more than the noise floor.
+    """
+    regressions = []
+    for size, run in results["sizes"].items():
+        before_run = baseline.get("sizes", {}).get(size)
+        if before_run is None:
+            continue
+        for name, after in run["endpoints"].items():
+            before = before_run["endpoints"].get(name)
+            if before is None:
+                continue
+            checks = [
+                ("p50_ms", MIN_LATENCY_REGRESSION_MS, "ms"),
+                ("p95_ms", MIN_LATENCY_REGRESSION_MS, "ms"),
+                ("peak_kib", MIN_MEMORY_REGRESSION_KIB, "KiB"),
+            ]
+            for key, floor, unit in checks:
+                old, new = before[key], after[key]
+                if new > old * (1 + tolerance) and new - old > floor:
+                    growth = f" (+{(new - old) / old:.0%})" if old else ""
+                    regressions.append(
+                        f"{size} entities, {name}: {key} {old:g} -> {new:g} {unit}{growth}"
+                    )
+    return regressions
+
+
+def _print_run(run: dict) -> None:
+    """Print the results of one registry size as a table."""
+    print(
+        f"\n{run['entities']} entities: setup {run['setup_s']} s, "
+        f"peak RSS {run['max_rss_mib']} MiB, backend {run['backend']}"
+    )
+    print(
+        f"{'endpoint':<26}{'items':>7}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}"
+        f"{'req/s':>9}{'items/s':>11}{'peak KiB':>10}{'errors':>8}"
+    )
+    for name, result in run["endpoints"].items():
+        print(
+            f"{name:<26}{result['items']:>7}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+            f"{result['max_ms']:>10.1f}{result['requests_per_s']:>9.1f}"
+            f"{result['items_per_s']:>11.0f}{result['peak_kib']:>10.0f}{result['errors']:>8}"
+        )
+
+
+def _parse_args() -> argparse.Namespace:
+    """Return the command line options."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="entities per registry"
+    )
+    parser.add_argument("--repeat", type=int, default=20, help="timed requests per endpoint")
+    parser.add_argument(
+        "--batch-size", type=int, default=1000, help="renames per check and bulk rename"
+    )
+    parser.add_argument(
+        "--suggest-size", type=int, default=200, help="entities or devices per suggestion request"
+    )
+    parser.add_argument(
+        "--suggest-repeat", type=int, default=3, help="timed requests per suggestion endpoint"
+    )
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="backend latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="backend latency spread")
+    parser.add_argument(
+        "--row-latency-ms", type=float, default=1.0, help="backend latency per suggested row"
+    )
+    parser.add_argument(
+        "--failure-rate", type=float, default=0.0, help="share of failed backend requests"
+    )
+    parser.add_argument(
+        "--failure-status", type=int, default=500, help="status of failed backend requests"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic registries")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare against the results in this JSON file")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.2, help="allowed growth over the baseline"
+    )
+    return parser.parse_args()
+
+
+async def _async_main(args: argparse.Namespace) -> dict:
+    """Benchmark every registry size."""
+    results = {
+        "settings": {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("sizes", "output", "baseline", "tolerance")
+        },
+        "python": platform.python_version(),
+        "sizes": {},
+    }
+    for size in args.sizes:
+        run = await async_benchmark_size(size, args)
+        results["sizes"][str(size)] = run
+        _print_run(run)
+    return results
+
+
+def main() -> int:
+    """Run the benchmarks and return the exit status."""
+    args = _parse_args()
+    results = asyncio.run(_async_main(args))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("settings") != results["settings"]:
+        print("\nWarning: the baseline was recorded with other settings")
+    regressions = find_regressions(baseline, results, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} regressions over {args.tolerance:.0%}:")
+        for regression in regressions:
+            print(f"  {regression}")
+        return 1
+    print(f"\nNo regressions over {args.tolerance:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
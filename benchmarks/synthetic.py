@@ -0,0 +1,158 @@
+"""Synthetic entity, device and area registries for the benchmarks.
+
+The registries look like a large real installation: devices of a handful
+of models spread over many areas, each with several entities named after
+the device, a share of them renamed by the user and a few without a device.
+The same ``size`` and ``seed`` always give the same registries.
+"""
+
+import random
+
+from homeassistant.helpers import area_registry as ar
+from homeassistant.helpers import device_registry as dr
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import slugify
+
+PLATFORM = "entity_renamer_bench"
+
+ROOMS = (
+    "Living Room",
+    "Kitchen",
+    "Bedroom",
+    "Bathroom",
+    "Hallway",
+    "Office",
+    "Garage",
+    "Garden",
+    "Basement",
+    "Attic",
+    "Laundry",
+    "Porch",
+)
+
+# Manufacturer, model and the entities every device of the model has, as
+# (domain, object ID suffix, original name)
+MODELS = (
+    ("Signify", "Hue Bulb", (("light", "", None),)),
+    ("Shelly", "Plug S", (("switch", "", None), ("sensor", "power", "Power"))),
+    (
+        "Shelly",
+        "Plus 1PM",
+        (("switch", "", None), ("sensor", "power", "Power"), ("sensor", "energy", "Energy")),
+    ),
+    (
+        "Aqara",
+        "Climate Sensor",
+        (
+            ("sensor", "temperature", "Temperature"),
+            ("sensor", "humidity", "Humidity"),
+            ("sensor", "battery", "Battery"),
+        ),
+    ),
+    ("Aqara", "Door Sensor", (("binary_sensor", "door", "Door"), ("sensor", "battery", "Battery"))),
+    ("IKEA", "Tradfri Remote", (("sensor", "battery", "Battery"), ("event", "button", "Button"))),
+    ("Ecobee", "Thermostat", (("climate", "", None), ("sensor", "temperature", "Temperature"))),
+)
+
+
+def synthetic_registry(size: int, seed: int = 0) -> dict:
+    """Return ``areas``, ``devices`` and ``entities`` for ``size`` entities.
+
+    Devices are dicts with ``key``, ``name``, ``manufacturer``, ``model`` and
+    ``area`` (an index into ``areas``, or ``None``). Entities are dicts with
+    ``domain``, ``unique_id``, ``object_id``, ``original_name``, ``name`` and
+    ``device`` (an index into ``devices``, or ``None``).
+    """
+    rng = random.Random(seed)
+    floors = max(1, size // (len(ROOMS) * 100))
+    areas = [
+        room if floor == 0 else f"{room} {floor + 1}" for floor in range(floors) for room in ROOMS
+    ]
+
+    devices = []
+    entities = []
+    # Entities of devices, then helpers without a device for the last 5%
+    while len(entities) < size * 0.95:
+        manufacturer, model, parts = rng.choice(MODELS)
+        position = len(devices)
+        name = f"{model} {position + 1}"
+        devices.append(
+            {
+                "key": f"device_{position}",
+                "name": name,
+                "manufacturer": manufacturer,
+                "model": model,
+                # Some devices are not assigned to an area
+                "area": rng.randrange(len(areas)) if rng.random() < 0.9 else None,
+            }
+        )
+        for domain, suffix, original_name in parts:
+            object_id = slugify(f"{name} {suffix}")
+            entities.append(
+                {
+                    "domain": domain,
+                    "unique_id": f"{position}_{domain}_{suffix}",
+                    "object_id": object_id,
+                    "original_name": original_name,
+                    # Some entities were already named by the user
+                    "name": (
+                        f"{areas[rng.randrange(len(areas))]} {model}"
+                        if rng.random() < 0.3
+                        else None
+                    ),
+                    "device": position,
+                }
+            )
+
+    for position in range(len(entities), size):
+        entities.append(
+            {
+                "domain": "input_boolean",
+                "unique_id": f"helper_{position}",
+                "object_id": f"helper_{position}",
+                "original_name": f"Helper {position}",
+                "name": None,
+                "device": None,
+            }
+        )
+    return {"areas": areas, "devices": devices, "entities": entities}
+
+
+async def async_populate_registries(hass, registry: dict, config_entry_id: str) -> None:
+    """Create the areas, devices and entities of a synthetic registry.
+
+    The registries must already be loaded. Devices are linked to
+    ``config_entry_id``; entities are created on their own platform.
+    """
+    area_registry = ar.async_get(hass)
+    device_registry = dr.async_get(hass)
+    entity_registry = er.async_get(hass)
+
+    area_ids = [area_registry.async_create(name).id for name in registry["areas"]]
+    device_ids = []
+    for device in registry["devices"]:
+        entry = device_registry.async_get_or_create(
+            config_entry_id=config_entry_id,
+            identifiers={(PLATFORM, device["key"])},
+            name=device["name"],
+            manufacturer=device["manufacturer"],
+            model=device["model"],
+        )
+        if device["area"] is not None:
+            device_registry.async_update_device(entry.id, area_id=area_ids[device["area"]])
+        device_ids.append(entry.id)
+
+    for entity in registry["entities"]:
+        entry = entity_registry.async_get_or_create(
+            entity["domain"],
+            PLATFORM,
+            entity["unique_id"],
+            suggested_object_id=entity["object_id"],
+            original_name=entity["original_name"],
+            device_id=device_ids[entity["device"]] if entity["device"] is not None else None,
+        )
+        if entity["name"]:
+            entity_registry.async_update_entity(entry.entity_id, name=entity["name"])
+
+    # Let the registry update events settle before anything is measured
+    await hass.async_block_till_done()
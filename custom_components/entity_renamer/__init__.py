@@ -3,19 +3,65 @@
 import json
 import logging
 import os
+from collections.abc import Callable
+from functools import partial
+from typing import Any
 
 import homeassistant.helpers.entity_registry as er
 import voluptuous as vol
+from aiohttp import web
 from homeassistant.components import frontend
 from homeassistant.components.http import HomeAssistantView, StaticPathConfig
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.core import HomeAssistant
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+)
+from homeassistant.exceptions import ConfigEntryNotReady, HomeAssistantError
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.area_registry import async_get as async_get_area_registry
 from homeassistant.helpers.device_registry import async_get as async_get_device_registry
+from homeassistant.helpers.start import async_at_started
 from homeassistant.helpers.typing import ConfigType
-
-from .const import DOMAIN, VERSION
+from homeassistant.loader import async_get_integration
+
+from .cache import SuggestionCache
+from .client import async_create_entry_client, entry_base_url, entry_model, get_entry_client
+from .const import (
+    CONF_CHUNK_TOKENS,
+    CONF_MAX_CONCURRENCY,
+    DEFAULT_CHUNK_TOKENS,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MODEL,
+    DOMAIN,
+)
+from .jobs import JOB_KINDS, JobManager, job_summary
+from .journal import RenameJournal, async_record_renames
+from .references import ReferenceIndex
+from .registry_index import RegistryIndex, device_payload, entity_payload
+from .renames import (
+    EntityIdChecker,
+    async_apply_renames,
+    async_check_proposed_ids,
+    async_undo_batch,
+)
+from .rewrite import async_rewrite_references
+from .rules import local_device_suggestion, local_entity_suggestion
+from .scheduler import RateLimitExceeded, async_get_scheduler
+from .startup import StartupTimer, prewarm
+from .suggestions import (
+    DEVICE_INSTRUCTIONS,
+    DEVICE_SYSTEM_PROMPT,
+    SuggestionError,
+    async_suggest,
+    async_suggest_entities,
+    describe_device,
+    device_fingerprint,
+    device_suggestion_row,
+    entity_suggestion_row,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -24,9 +70,66 @@ CONFIG_SCHEMA = vol.Schema({DOMAIN: vol.Schema({})}, extra=vol.ALLOW_EXTRA)
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up the Entity Renamer component."""
-    _LOGGER.info("Starting AI Entity Renamer version %s", VERSION)
-    hass.data[DOMAIN] = {}
+    integration = await async_get_integration(hass, DOMAIN)
+    _LOGGER.info("Starting AI Entity Renamer version %s", integration.version)
+    timer = StartupTimer()
+    # The config flow may already have created the request schedulers
+    hass.data.setdefault(DOMAIN, {})["startup"] = timer
+
+    with timer.measure("registry index"):
+        # The index is built on first use, not here
+        index = RegistryIndex(hass)
+        index.async_start()
+        hass.data[DOMAIN]["index"] = index
+        hass.data[DOMAIN]["cache"] = SuggestionCache(hass)
+
+    with timer.measure("rename journal"):
+        journal = RenameJournal(hass)
+        await journal.async_load()
+        hass.data[DOMAIN]["journal"] = journal
+
+    with timer.measure("reference index"):
+        # The configuration is read once Home Assistant has started
+        references = ReferenceIndex(hass)
+        references.async_start()
+        hass.data[DOMAIN]["references"] = references
+
+    with timer.measure("job queue"):
+        jobs = JobManager(hass, partial(_async_suggest_items, hass))
+        await jobs.async_load()
+        hass.data[DOMAIN]["jobs"] = jobs
+
+    async def _async_started(hass: HomeAssistant) -> None:
+        """Pre-warm the SDK, then resume unfinished suggestion jobs."""
+        # Importing the SDK and loading the tokenizer block, and loading the
+        # tokenizer may download its encoding, so do both in the executor
+        # once Home Assistant is up instead of delaying its startup.
+        with timer.measure("pre-warm in executor"):
+            await hass.async_add_executor_job(prewarm)
+        jobs.async_resume()
+        hass.async_create_background_task(references.async_refresh(), f"{DOMAIN} reference index")
+        _LOGGER.info("AI Entity Renamer startup: %s", timer.summary())
+
+    async_at_started(hass, _async_started)
+
+    with timer.measure("panel, views and services"):
+        _async_register_api(hass)
+
+    with timer.measure("static files"):
+        await hass.http.async_register_static_paths(
+            [
+                StaticPathConfig(
+                    "/entity_renamer", os.path.join(os.path.dirname(__file__), "frontend"), False
+                )
+            ]
+        )
+
+    return True
+
 
+@callback
+def _async_register_api(hass: HomeAssistant) -> None:
+    """Register the panel, the HTTP views and the services."""
     # Register the panel
     frontend.async_register_built_in_panel(
         hass,
@@ -51,6 +154,14 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     hass.http.register_view(DeviceListView)
     hass.http.register_view(RenameDeviceView)
     hass.http.register_view(OpenAIDeviceSuggestionsView)
+    hass.http.register_view(RegistryChangesView)
+    hass.http.register_view(BulkRenameView)
+    hass.http.register_view(CheckRenamesView)
+    hass.http.register_view(ReferencesView)
+    hass.http.register_view(RenameJournalView)
+    hass.http.register_view(UndoRenameView)
+    hass.http.register_view(SuggestionJobsView)
+    hass.http.register_view(SuggestionJobView)
 
     # Register services
     hass.services.async_register(
@@ -75,29 +186,149 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
             }
         ),
     )
-
-    # Serve local files
-    await hass.http.async_register_static_paths(
-        [
-            StaticPathConfig(
-                "/entity_renamer", os.path.join(os.path.dirname(__file__), "frontend"), False
-            )
-        ]
+    hass.services.async_register(
+        DOMAIN,
+        "bulk_rename",
+        partial(bulk_rename_service, hass),
+        schema=vol.Schema(
+            {
+                vol.Optional("entities", default=[]): [
+                    vol.Schema(
+                        {
+                            vol.Required("entity_id"): cv.string,
+                            vol.Required("new_entity_id"): cv.string,
+                            vol.Optional("new_name"): cv.string,
+                        }
+                    )
+                ],
+                vol.Optional("devices", default=[]): [
+                    vol.Schema(
+                        {
+                            vol.Required("device_id"): cv.string,
+                            vol.Required("new_name"): cv.string,
+                        }
+                    )
+                ],
+                vol.Optional("rewrite_references", default=False): cv.boolean,
+            }
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+    hass.services.async_register(
+        DOMAIN,
+        "undo_rename",
+        partial(undo_rename_service, hass),
+        schema=vol.Schema(
+            {
+                vol.Optional("batch_id"): cv.string,
+                vol.Optional("rewrite_references", default=False): cv.boolean,
+            }
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
     )
-
-    return True
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Entity Renamer from a config entry."""
+    try:
+        with hass.data[DOMAIN]["startup"].measure("backend client"):
+            client, http_client = await async_create_entry_client(hass, entry)
+    except ImportError as err:
+        raise ConfigEntryNotReady("OpenAI package not installed") from err
+
+    hass.data[DOMAIN][entry.entry_id] = {"client": client, "http_client": http_client}
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry."""
+    runtime = hass.data[DOMAIN].pop(entry.entry_id, None)
+    if runtime:
+        await runtime["http_client"].aclose()
     return True
 
 
+async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Reload the entry so a changed API key or concurrency takes effect."""
+    await hass.config_entries.async_reload(entry.entry_id)
+
+
+def _max_concurrency(entry: ConfigEntry | None) -> int:
+    """Return how many suggestion requests may run at once for an entry."""
+    if entry is None:
+        return DEFAULT_MAX_CONCURRENCY
+    return entry.options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+
+
+def _chunk_tokens(entry: ConfigEntry | None) -> int:
+    """Return the prompt token budget of one suggestion request for an entry."""
+    if entry is None:
+        return DEFAULT_CHUNK_TOKENS
+    return entry.options.get(CONF_CHUNK_TOKENS, DEFAULT_CHUNK_TOKENS)
+
+
+def _local_rule(data: dict, rule: Callable[..., str | None]) -> Callable[[dict], str | None] | None:
+    """Return the local rule a suggestion request asks for, if any.
+
+    Local rules answer the items they are sure about unless ``local`` is
+    false; with ``local_only`` they answer every item and the model is not
+    used at all.
+    """
+    if data.get("local_only"):
+        return partial(rule, strict=False)
+    if data.get("local", True):
+        return rule
+    return None
+
+
+def _not_modified(request, etag: str) -> web.Response | None:
+    """Return a 304 response when the client already has ``etag``."""
+    if_none_match = request.headers.get("If-None-Match", "")
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    if etag in tags or "*" in tags:
+        return web.Response(status=304, headers={"ETag": etag})
+    return None
+
+
+def _with_etag(response: web.Response, etag: str) -> web.Response:
+    """Tag a list response so clients can revalidate it cheaply."""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+async def _async_stream_suggestions(request, build_row, suggest) -> web.StreamResponse:
+    """Stream suggestions to the client as newline-delimited JSON.
+
+    Each line is ``{"index": ..., "suggestion": ...}`` for one item, sent as
+    soon as the model has produced it; a retried item may be sent again.
+    The last line reports ``success`` and, on failure, the ``error``.
+    """
+    response = web.StreamResponse(
+        headers={"Content-Type": "application/x-ndjson", "Cache-Control": "no-cache"}
+    )
+    await response.prepare(request)
+
+    async def _async_write(payload: dict) -> None:
+        await response.write(json.dumps(payload).encode() + b"\n")
+
+    async def _async_on_item(position: int, suggestion) -> None:
+        row = build_row(position, suggestion)
+        await _async_write({"index": position, "suggestion": row})
+
+    try:
+        await suggest(on_item=_async_on_item)
+    except Exception as e:
+        _LOGGER.error("Error streaming suggestions: %s", e)
+        await _async_write({"success": False, "error": str(e)})
+    else:
+        await _async_write({"success": True})
+
+    await response.write_eof()
+    return response
+
+
 class EntityListView(HomeAssistantView):
     """View to handle Entity List requests."""
 
@@ -105,43 +336,40 @@ class EntityListView(HomeAssistantView):
     name = "api:entity_renamer:entities"
 
     async def get(self, request):
-        """Handle GET request for entity list."""
+        """Handle GET request for entity list.
+
+        Supports the optional query parameters ``area``, ``device``,
+        ``domain``, ``search``, ``sort``, ``offset`` and ``limit``. The total
+        number of matches is returned in the ``X-Total-Count`` header.
+        """
         hass = request.app["hass"]
-        registry = er.async_get(hass)
+        index = hass.data[DOMAIN]["index"]
+        query = request.query
+
+        etag = index.etag
+        if (not_modified := _not_modified(request, etag)) is not None:
+            return not_modified
 
-        entities = []
-        for entity_id, entity in registry.entities.items():
-            # Get device info if available
-            device_id = entity.device_id
-            device_name = "No Device"
-            area_id = None
-            area_name = "No Area"
-
-            if device_id:
-                device_registry = async_get_device_registry(hass)
-                device = device_registry.async_get(device_id)
-                if device:
-                    device_name = device.name or device.model or "Unknown Device"
-                    area_id = device.area_id
-
-            # Get area info if available
-            if area_id:
-                area_registry = async_get_area_registry(hass)
-                area = area_registry.async_get_area(area_id)
-                if area:
-                    area_name = area.name
-
-            entities.append(
-                {
-                    "entity_id": entity_id,
-                    "name": entity.name or entity_id.split(".")[-1],
-                    "device_name": device_name,
-                    "area_name": area_name,
-                    "original_name": entity.original_name,
-                }
+        try:
+            offset = int(query.get("offset", 0))
+            limit = int(query["limit"]) if "limit" in query else None
+            if offset < 0 or (limit is not None and limit < 0):
+                raise ValueError("offset and limit must not be negative")
+            total, rows = index.async_query(
+                area=query.get("area"),
+                device=query.get("device"),
+                domain=query.get("domain"),
+                search=query.get("search"),
+                sort=query.get("sort"),
+                offset=offset,
+                limit=limit,
             )
+        except ValueError as e:
+            return self.json({"success": False, "error": str(e)}, status_code=400)
 
-        return self.json(entities)
+        response = self.json([entity_payload(row) for row in rows])
+        response.headers["X-Total-Count"] = str(total)
+        return _with_etag(response, etag)
 
 
 class DeviceListView(HomeAssistantView):
@@ -153,27 +381,45 @@ class DeviceListView(HomeAssistantView):
     async def get(self, request):
         """Handle GET request for device list."""
         hass = request.app["hass"]
-        device_registry = async_get_device_registry(hass)
-        area_registry = async_get_area_registry(hass)
-
-        devices = []
-        for device_id, device in device_registry.devices.items():
-            area_name = "No Area"
-            if device.area_id:
-                area = area_registry.async_get_area(device.area_id)
-                if area:
-                    area_name = area.name
-            devices.append(
-                {
-                    "id": device_id,
-                    "name": device.name or device.model or "Unknown Device",
-                    "manufacturer": device.manufacturer or "",
-                    "model": device.model or "",
-                    "area_name": area_name,
-                }
-            )
+        index = hass.data[DOMAIN]["index"]
+
+        etag = index.etag
+        if (not_modified := _not_modified(request, etag)) is not None:
+            return not_modified
+
+        devices = [device_payload(row) for row in index.async_devices()]
+        return _with_etag(self.json(devices), etag)
+
+
+class RegistryChangesView(HomeAssistantView):
+    """View to handle registry change feed requests."""
+
+    url = "/api/entity_renamer/changes"
+    name = "api:entity_renamer:changes"
 
-        return self.json(devices)
+    async def get(self, request):
+        """Handle GET request for the entity and device changes since a revision.
+
+        ``since`` is the revision token from a previous response or the
+        ``ETag`` of a list response. When the changes cannot be replayed the
+        response has ``reset`` set and the client should reload the lists.
+        """
+        hass = request.app["hass"]
+        index = hass.data[DOMAIN]["index"]
+
+        since = request.query.get("since")
+        if not since:
+            return self.json({"success": False, "error": "Missing since"}, status_code=400)
+
+        changes = index.async_changes_since(since)
+        return self.json(
+            {
+                "success": True,
+                "revision": index.token,
+                "reset": changes is None,
+                "changes": changes or [],
+            }
+        )
 
 
 class RenameEntityView(HomeAssistantView):
@@ -190,6 +436,7 @@ class RenameEntityView(HomeAssistantView):
         entity_id = data.get("entity_id")
         new_entity_id = data.get("new_entity_id")
         new_name = data.get("new_name")
+        rewrite = bool(data.get("rewrite_references"))
 
         if not entity_id or not new_entity_id:
             return self.json(
@@ -199,15 +446,32 @@ class RenameEntityView(HomeAssistantView):
 
         registry = er.async_get(hass)
         try:
+            entry = registry.async_get(entity_id)
             update_kwargs = {"new_entity_id": new_entity_id}
             if new_name:
                 update_kwargs["name"] = new_name
             registry.async_update_entity(entity_id, **update_kwargs)
-            return self.json({"success": True})
         except Exception as e:
             _LOGGER.error("Error renaming entity: %s", e)
             return self.json({"success": False, "error": str(e)}, status_code=500)
 
+        old_name = entry.name if entry else None
+        batch_id = async_record_renames(
+            hass, "rename", [[entity_id, new_entity_id, old_name, new_name or old_name]], []
+        )
+
+        if rewrite:
+            result = await async_rewrite_references(hass, {entity_id: new_entity_id})
+            return self.json(
+                {"success": True, "batch_id": batch_id, "references": [], "rewrite": result}
+            )
+
+        # The configuration still uses the old ID
+        references = await hass.data[DOMAIN]["references"].async_lookup([entity_id])
+        return self.json(
+            {"success": True, "batch_id": batch_id, "references": references[entity_id]}
+        )
+
 
 class RenameDeviceView(HomeAssistantView):
     """View to handle Device Rename requests."""
@@ -231,161 +495,133 @@ class RenameDeviceView(HomeAssistantView):
 
         registry = async_get_device_registry(hass)
         try:
+            device = registry.async_get(device_id)
             registry.async_update_device(device_id, name=new_name)
-            return self.json({"success": True})
         except Exception as e:
             _LOGGER.error("Error renaming device: %s", e)
             return self.json({"success": False, "error": str(e)}, status_code=500)
 
+        old_name = device.name if device else None
+        batch_id = async_record_renames(hass, "rename", [], [[device_id, old_name, new_name]])
+        return self.json({"success": True, "batch_id": batch_id})
 
-class OpenAISuggestionsView(HomeAssistantView):
-    """View to handle OpenAI Suggestions requests."""
 
-    url = "/api/entity_renamer/suggest"
-    name = "api:entity_renamer:suggest"
+class BulkRenameView(HomeAssistantView):
+    """View to handle batch rename requests."""
+
+    url = "/api/entity_renamer/rename_bulk"
+    name = "api:entity_renamer:rename_bulk"
 
     async def post(self, request):
-        """Handle POST request for OpenAI suggestions."""
+        """Handle POST request for renaming entities and devices in one transaction."""
         hass = request.app["hass"]
         data = await request.json()
 
         entities = data.get("entities", [])
+        devices = data.get("devices", [])
+        rewrite = bool(data.get("rewrite_references"))
 
-        if not entities:
-            return self.json({"success": False, "error": "No entities provided"}, status_code=400)
+        if not entities and not devices:
+            return self.json(
+                {"success": False, "error": "No entities or devices provided"}, status_code=400
+            )
 
         try:
-            import openai
+            result = async_apply_renames(hass, entities, devices)
+        except Exception as e:
+            _LOGGER.error("Error applying batch rename: %s", e)
+            return self.json({"success": False, "error": str(e)}, status_code=500)
+        if rewrite and result["success"]:
+            result["rewrite"] = await async_rewrite_references(hass, _renamed_ids(entities))
+        return self.json(result, status_code=200 if result["success"] else 409)
 
-            # Get API key from config
-            config_entries = hass.config_entries.async_entries(DOMAIN)
-            if not config_entries:
-                return self.json(
-                    {"success": False, "error": "Integration not configured"}, status_code=400
-                )
 
-            api_key = config_entries[0].data.get("api_key")
-            if not api_key:
-                return self.json(
-                    {"success": False, "error": "OpenAI API key not configured"}, status_code=400
-                )
+class CheckRenamesView(HomeAssistantView):
+    """View to handle pre-flight checks of proposed entity IDs."""
 
-            # Initialize client with explicit parameters to avoid environment issues
-            try:
-                client = openai.OpenAI(api_key=api_key, timeout=30.0)
-            except TypeError as init_error:
-                # Fallbacks for older versions or environment issues
-                _LOGGER.warning(
-                    "OpenAI client init failed, trying alternative: %s",
-                    init_error,
-                )
-                try:
-                    client = openai.OpenAI(api_key=api_key)
-                except TypeError as second_error:
-                    _LOGGER.warning(
-                        "OpenAI client init failed again, using basic HTTP client: %s",
-                        second_error,
-                    )
-                    import httpx
+    url = "/api/entity_renamer/check"
+    name = "api:entity_renamer:check"
 
-                    client = openai.OpenAI(
-                        api_key=api_key,
-                        http_client=httpx.Client(timeout=30.0),
-                    )
+    async def post(self, request):
+        """Handle POST request for checking proposed entity IDs."""
+        hass = request.app["hass"]
+        data = await request.json()
 
-            # Prepare the prompt
-            prompt = (
-                "Suggest Home Assistant entity IDs following the official naming convention:\n"
-                "- Format: `<domain>.<location_code>_<device_type>_<function>_<identifier>`\n"
-                "- Use ONLY lowercase letters, numbers, and underscores\n"
-                "- Do NOT start or end with underscores\n"
-                "- Examples: 'light.kitchen_ceiling_main', 'sensor.bedroom_temp_primary'\n"
-                "- Keep location codes short (living_room → living, master_bedroom → master)\n"
-                "- Prioritize clarity and consistency over brevity\n"
-                "Return only a JSON array of entity_id strings in the original order.\n\n"
-            )
+        renames = data.get("renames", [])
 
-            for entity in entities:
-                prompt += f"Entity ID: {entity['entity_id']}\n"
-                prompt += f"Current Name: {entity['name']}\n"
-                prompt += f"Device: {entity['device_name']}\n"
-                prompt += f"Area: {entity['area_name']}\n"
-                prompt += f"Domain: {entity['entity_id'].split('.')[0]}\n"
-                prompt += "Goal: Create systematic entity_id for automations\n\n"
-
-            # Call OpenAI API
-            response = await hass.async_add_executor_job(
-                lambda: client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are a Home Assistant entity naming expert. Create technical entity IDs "
-                                "following HA's strict naming conventions for use in automations and integrations. "
-                                "Focus on machine-readability and systematic organization."
-                            ),
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.7,
-                )
+        if not renames or not all(rename.get("entity_id") for rename in renames):
+            return self.json(
+                {"success": False, "error": "Missing renames or entity_id"}, status_code=400
             )
 
-            # Parse the response
-            try:
-                content = response.choices[0].message.content
-                # Extract JSON from the response
-                import re
-
-                json_match = re.search(r"\[.*\]", content, re.DOTALL)
-                if json_match:
-                    suggestions = json.loads(json_match.group(0))
-                else:
-                    suggestions = json.loads(content)
-
-                # Ensure we have the right number of suggestions
-                if len(suggestions) != len(entities):
-                    return self.json(
-                        {"success": False, "error": "Received incorrect number of suggestions"},
-                        status_code=500,
-                    )
+        return self.json({"success": True, "results": async_check_proposed_ids(hass, renames)})
 
-                # Combine original entities with suggestions
-                result = []
 
-                def _id_to_name(eid: str) -> str:
-                    parts = eid.split(".", 1)
-                    if len(parts) > 1:
-                        name_part = parts[1]
-                    else:
-                        name_part = parts[0]
-                    return " ".join(word.capitalize() for word in name_part.split("_"))
+class ReferencesView(HomeAssistantView):
+    """View to look up the configuration that refers to entities."""
 
-                for i, entity in enumerate(entities):
-                    suggested_id = suggestions[i]
-                    result.append(
-                        {
-                            **entity,
-                            "suggested_id": suggested_id,
-                            "suggested_name": _id_to_name(suggested_id),
-                        }
-                    )
+    url = "/api/entity_renamer/references"
+    name = "api:entity_renamer:references"
 
-                return self.json({"success": True, "suggestions": result})
+    async def post(self, request):
+        """Handle POST request for the references to a list of entity IDs."""
+        hass = request.app["hass"]
+        data = await request.json()
 
-            except json.JSONDecodeError:
-                return self.json(
-                    {"success": False, "error": "Failed to parse OpenAI response"}, status_code=500
-                )
+        entity_ids = data.get("entity_ids")
 
-        except ImportError:
-            return self.json(
-                {"success": False, "error": "OpenAI package not installed"}, status_code=500
-            )
-        except Exception as e:
-            _LOGGER.error("Error getting suggestions: %s", e)
-            return self.json({"success": False, "error": str(e)}, status_code=500)
+        if not entity_ids or not all(isinstance(entity_id, str) for entity_id in entity_ids):
+            return self.json({"success": False, "error": "Missing entity_ids"}, status_code=400)
+
+        references = await hass.data[DOMAIN]["references"].async_lookup(entity_ids)
+        return self.json({"success": True, "references": references})
+
+
+class RenameJournalView(HomeAssistantView):
+    """View to list the rename batches in the journal."""
+
+    url = "/api/entity_renamer/journal"
+    name = "api:entity_renamer:journal"
+
+    async def get(self, request):
+        """Handle GET request for the applied rename batches, newest first."""
+        journal = request.app["hass"].data[DOMAIN]["journal"]
+        return self.json({"success": True, "batches": journal.async_batches()})
+
+
+class UndoRenameView(HomeAssistantView):
+    """View to undo a rename batch."""
+
+    url = "/api/entity_renamer/journal/{batch_id}/undo"
+    name = "api:entity_renamer:journal:undo"
+
+    async def post(self, request, batch_id):
+        """Handle POST request for reverting every rename of a batch."""
+        hass = request.app["hass"]
+        data = await request.json() if request.can_read_body else {}
+
+        result = await _async_undo_renames(hass, batch_id, bool(data.get("rewrite_references")))
+        if result is None:
+            return self.json({"success": False, "error": "Batch not found"}, status_code=404)
+        return self.json(result, status_code=200 if result["success"] else 409)
+
+
+class OpenAISuggestionsView(HomeAssistantView):
+    """View to handle OpenAI Suggestions requests."""
+
+    url = "/api/entity_renamer/suggest"
+    name = "api:entity_renamer:suggest"
+
+    async def post(self, request):
+        """Handle POST request for OpenAI suggestions."""
+        data = await request.json()
+
+        entities = data.get("entities", [])
+
+        if not entities:
+            return self.json({"success": False, "error": "No entities provided"}, status_code=400)
+
+        return await _async_suggestion_response(self, request, "entities", entities, data)
 
 
 class OpenAIDeviceSuggestionsView(HomeAssistantView):
@@ -396,7 +632,6 @@ class OpenAIDeviceSuggestionsView(HomeAssistantView):
 
     async def post(self, request):
         """Handle POST request for device name suggestions."""
-        hass = request.app["hass"]
         data = await request.json()
 
         devices = data.get("devices", [])
@@ -404,128 +639,185 @@ class OpenAIDeviceSuggestionsView(HomeAssistantView):
         if not devices:
             return self.json({"success": False, "error": "No devices provided"}, status_code=400)
 
-        try:
-            import openai
+        return await _async_suggestion_response(self, request, "devices", devices, data)
 
-            config_entries = hass.config_entries.async_entries(DOMAIN)
-            if not config_entries:
-                return self.json(
-                    {"success": False, "error": "Integration not configured"}, status_code=400
-                )
 
-            api_key = config_entries[0].data.get("api_key")
-            if not api_key:
-                return self.json(
-                    {"success": False, "error": "OpenAI API key not configured"}, status_code=400
-                )
+class SuggestionJobsView(HomeAssistantView):
+    """View to handle background suggestion job requests."""
 
-            try:
-                client = openai.OpenAI(api_key=api_key, timeout=30.0)
-            except TypeError as init_error:
-                _LOGGER.warning("OpenAI client init failed, trying alternative: %s", init_error)
-                try:
-                    client = openai.OpenAI(api_key=api_key)
-                except TypeError as second_error:
-                    _LOGGER.warning(
-                        "OpenAI client init failed again, using basic HTTP client: %s",
-                        second_error,
-                    )
-                    import httpx
-
-                    client = openai.OpenAI(api_key=api_key, http_client=httpx.Client(timeout=30.0))
-
-            prompt = (
-                "Suggest human-readable device names for Home Assistant following these rules:\n"
-                "- Use proper capitalization and spaces\n"
-                "- Format: '[Location] [Device Type]' or '[Descriptive Name]'\n"
-                "- Be concise but clear for UI display\n"
-                "- Consider the device's physical location and purpose\n"
-                "- Examples: 'Kitchen Light', 'Living Room Thermostat', 'Main Bedroom Motion Sensor'\n"
-                "Return only a JSON array of device names in the original order.\n\n"
-            )
+    url = "/api/entity_renamer/jobs"
+    name = "api:entity_renamer:jobs"
 
-            for device in devices:
-                prompt += f"Device: {device['name']}\n"
-                prompt += f"Manufacturer: {device.get('manufacturer', 'Unknown')}\n"
-                prompt += f"Model: {device.get('model', 'Unknown')}\n"
-                prompt += f"Area: {device.get('area_name', 'No Area')}\n"
-                prompt += "Goal: Create a user-friendly name for dashboard display\n\n"
-
-            response = await hass.async_add_executor_job(
-                lambda: client.chat.completions.create(
-                    model="gpt-4",
-                    messages=[
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are a Home Assistant device naming expert. Create user-friendly device names "
-                                "that are clear, location-based, and suitable for UI display. Focus on human "
-                                "readability over technical structure."
-                            ),
-                        },
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.7,
-                )
+    async def get(self, request):
+        """Handle GET request for the status of all jobs."""
+        jobs = request.app["hass"].data[DOMAIN]["jobs"]
+        return self.json({"success": True, "jobs": [job_summary(job) for job in jobs.async_jobs()]})
+
+    async def post(self, request):
+        """Handle POST request for queueing a suggestion job."""
+        hass = request.app["hass"]
+        data = await request.json()
+
+        kind = data.get("kind")
+        items = data.get("items", [])
+
+        if kind not in JOB_KINDS or not items:
+            return self.json(
+                {"success": False, "error": "Missing kind (entities or devices) or items"},
+                status_code=400,
+            )
+        if get_entry_client(hass) is None and not data.get("local_only"):
+            return self.json(
+                {"success": False, "error": "Integration not configured"}, status_code=400
             )
 
-            try:
-                content = response.choices[0].message.content
-                import re
+        job = hass.data[DOMAIN]["jobs"].async_create(kind, items, data)
+        return self.json({"success": True, "job": job_summary(job)})
 
-                json_match = re.search(r"\[.*\]", content, re.DOTALL)
-                if json_match:
-                    suggestions = json.loads(json_match.group(0))
-                else:
-                    suggestions = json.loads(content)
 
-                if len(suggestions) != len(devices):
-                    return self.json(
-                        {"success": False, "error": "Received incorrect number of suggestions"},
-                        status_code=500,
-                    )
+class SuggestionJobView(HomeAssistantView):
+    """View to handle requests for a single suggestion job."""
 
-                # Validate device name format
-                def _validate_device_name(name: str) -> str:
-                    """Ensure device name follows proper conventions."""
-                    if not name or not isinstance(name, str):
-                        return "Unnamed Device"
-
-                    # Ensure proper capitalization
-                    name = name.strip()
-                    if name.islower():
-                        name = " ".join(word.capitalize() for word in name.split())
-
-                    return name
-
-                result = []
-                for i, device in enumerate(devices):
-                    suggestion = suggestions[i]
-                    if isinstance(suggestion, dict):
-                        suggestion = (
-                            suggestion.get("name")
-                            or suggestion.get("suggested_name")
-                            or next(iter(suggestion.values()), "")
-                        )
-
-                    # Add validation
-                    validated_name = _validate_device_name(suggestion)
-                    result.append({**device, "suggested_name": validated_name})
-
-                return self.json({"success": True, "suggestions": result})
-
-            except json.JSONDecodeError:
-                return self.json(
-                    {"success": False, "error": "Failed to parse OpenAI response"}, status_code=500
-                )
+    url = "/api/entity_renamer/jobs/{job_id}"
+    name = "api:entity_renamer:job"
 
-        except ImportError:
-            return self.json(
-                {"success": False, "error": "OpenAI package not installed"}, status_code=500
+    async def get(self, request, job_id):
+        """Handle GET request for the progress and results of a job.
+
+        ``results`` holds a suggestion row for every item finished so far,
+        starting at the optional ``offset`` query parameter.
+        """
+        hass = request.app["hass"]
+        if (job := hass.data[DOMAIN]["jobs"].async_get(job_id)) is None:
+            return self.json({"success": False, "error": "Job not found"}, status_code=404)
+
+        try:
+            offset = max(int(request.query.get("offset", 0)), 0)
+        except ValueError:
+            return self.json({"success": False, "error": "Invalid offset"}, status_code=400)
+
+        # Rows are built for every finished item so duplicate IDs are
+        # resolved the same way whatever the offset
+        build_row = _row_builder(hass, job["kind"], job["items"])
+        rows = [build_row(position, job["results"][position]) for position in range(job["done"])]
+        return self.json({"success": True, "job": job_summary(job), "results": rows[offset:]})
+
+    async def post(self, request, job_id):
+        """Handle POST request for retrying a failed or cancelled job."""
+        jobs = request.app["hass"].data[DOMAIN]["jobs"]
+        if (job := jobs.async_retry(job_id)) is None:
+            return self.json({"success": False, "error": "Job not found"}, status_code=404)
+        return self.json({"success": True, "job": job_summary(job)})
+
+    async def delete(self, request, job_id):
+        """Handle DELETE request for cancelling and removing a job."""
+        jobs = request.app["hass"].data[DOMAIN]["jobs"]
+        if not jobs.async_remove(job_id):
+            return self.json({"success": False, "error": "Job not found"}, status_code=404)
+        return self.json({"success": True})
+
+
+async def _async_suggestion_response(view, request, kind: str, items: list[dict], data: dict):
+    """Answer a suggestion request, buffered or streamed."""
+    hass = request.app["hass"]
+    try:
+        if get_entry_client(hass) is None and not data.get("local_only"):
+            return view.json(
+                {"success": False, "error": "Integration not configured"}, status_code=400
             )
-        except Exception as e:
-            _LOGGER.error("Error getting device suggestions: %s", e)
-            return self.json({"success": False, "error": str(e)}, status_code=500)
+
+        build_row = _row_builder(hass, kind, items)
+        suggest = partial(_async_suggest_items, hass, kind, items, data)
+        if data.get("stream"):
+            return await _async_stream_suggestions(request, build_row, suggest)
+
+        try:
+            suggestions = await suggest()
+        except RateLimitExceeded as e:
+            return view.json({"success": False, "error": str(e)}, status_code=429)
+        except SuggestionError as e:
+            return view.json({"success": False, "error": str(e)}, status_code=500)
+
+        # Combine original items with suggestions
+        result = [
+            build_row(position, suggestion) for position, suggestion in enumerate(suggestions)
+        ]
+        return view.json({"success": True, "suggestions": result})
+
+    except ImportError:
+        return view.json(
+            {"success": False, "error": "OpenAI package not installed"}, status_code=500
+        )
+    except Exception as e:
+        _LOGGER.error("Error getting %s suggestions: %s", kind, e)
+        return view.json({"success": False, "error": str(e)}, status_code=500)
+
+
+async def _async_suggest_items(
+    hass: HomeAssistant, kind: str, items: list[dict], options: dict, on_item=None
+) -> list:
+    """Return one raw suggestion per entity or device in ``items``.
+
+    ``options`` are the ``refresh``, ``local`` and ``local_only`` flags of
+    the request.
+    """
+    entry, client = get_entry_client(hass) or (None, None)
+    if client is None and not options.get("local_only"):
+        raise SuggestionError("Integration not configured")
+
+    cache = hass.data[DOMAIN]["cache"]
+    refresh = bool(options.get("refresh"))
+    model = entry_model(entry) if entry else DEFAULT_MODEL
+    scheduler = async_get_scheduler(hass, entry_base_url(entry) if entry else None)
+    if kind == "entities":
+        return await async_suggest_entities(
+            client,
+            items,
+            chunk_tokens=_chunk_tokens(entry),
+            max_concurrency=_max_concurrency(entry),
+            cache=cache,
+            refresh=refresh,
+            local=_local_rule(options, local_entity_suggestion),
+            on_item=on_item,
+            scheduler=scheduler,
+            model=model,
+        )
+
+    return await async_suggest(
+        client,
+        DEVICE_SYSTEM_PROMPT,
+        DEVICE_INSTRUCTIONS,
+        items,
+        describe_device,
+        chunk_tokens=_chunk_tokens(entry),
+        max_concurrency=_max_concurrency(entry),
+        cache=cache,
+        cache_key=partial(device_fingerprint, model=model),
+        refresh=refresh,
+        local=_local_rule(options, local_device_suggestion),
+        on_item=on_item,
+        scheduler=scheduler,
+        model=model,
+    )
+
+
+def _row_builder(hass: HomeAssistant, kind: str, items: list[dict]) -> Callable[[int, Any], dict]:
+    """Return a function that turns the suggestion for an item into a result row."""
+    if kind == "devices":
+        return lambda position, suggestion: device_suggestion_row(items[position], suggestion)
+
+    # Suggested IDs are made valid and unique before they reach the user
+    checker = EntityIdChecker(hass)
+
+    def _row(position: int, suggested_id) -> dict:
+        entity = items[position]
+        new_entity_id, adjusted = checker.async_check(position, entity["entity_id"], suggested_id)
+        row = entity_suggestion_row(entity, new_entity_id)
+        if adjusted is not None:
+            row["adjusted"] = adjusted
+        return row
+
+    return _row
 
 
 async def apply_rename_service(hass, service):
@@ -535,10 +827,24 @@ async def apply_rename_service(hass, service):
     new_name = service.data.get("new_name")
 
     registry = er.async_get(hass)
+    entry = registry.async_get(entity_id)
     update_kwargs = {"new_entity_id": new_entity_id}
     if new_name:
         update_kwargs["name"] = new_name
     registry.async_update_entity(entity_id, **update_kwargs)
+    old_name = entry.name if entry else None
+    async_record_renames(
+        hass, "apply_rename", [[entity_id, new_entity_id, old_name, new_name or old_name]], []
+    )
+
+    if (references := hass.data.get(DOMAIN, {}).get("references")) is not None:
+        if found := (await references.async_lookup([entity_id]))[entity_id]:
+            _LOGGER.warning(
+                "Renamed %s to %s, but it is still referred to by %s",
+                entity_id,
+                new_entity_id,
+                ", ".join(f"{ref['type']} {ref['name']} ({ref['source']})" for ref in found),
+            )
 
 
 async def apply_device_rename_service(hass, service):
@@ -547,4 +853,65 @@ async def apply_device_rename_service(hass, service):
     new_name = service.data.get("new_name")
 
     registry = async_get_device_registry(hass)
+    device = registry.async_get(device_id)
     registry.async_update_device(device_id, name=new_name)
+    async_record_renames(
+        hass, "apply_device_rename", [], [[device_id, device.name if device else None, new_name]]
+    )
+
+
+def _renamed_ids(entities: list[dict]) -> dict[str, str]:
+    """Return the old to new entity ID mapping of a batch of entity renames."""
+    return {rename["entity_id"]: rename["new_entity_id"] for rename in entities}
+
+
+async def bulk_rename_service(hass, service: ServiceCall) -> ServiceResponse:
+    """Bulk rename service call."""
+    entities = service.data.get("entities", [])
+    result = async_apply_renames(hass, entities, service.data.get("devices", []))
+    if not result["success"] and not service.return_response:
+        raise HomeAssistantError(f"Batch rename failed: {_batch_errors(result)}")
+    if result["success"] and service.data.get("rewrite_references"):
+        result["rewrite"] = await async_rewrite_references(hass, _renamed_ids(entities))
+    return result
+
+
+def _batch_errors(result: dict) -> str:
+    """Return the errors of the renames that caused a batch to fail."""
+    return "; ".join(
+        row["error"]
+        for row in (*result["entities"], *result["devices"])
+        if row.get("error") and not row["error"].startswith(("Not applied", "Rolled back"))
+    )
+
+
+async def _async_undo_renames(
+    hass: HomeAssistant, batch_id: str | None, rewrite: bool
+) -> dict | None:
+    """Undo a journal batch, or the newest one, and return the result.
+
+    Returns ``None`` if there is no such batch. With ``rewrite`` the
+    references to the renamed entities are rewritten back as well.
+    """
+    if (batch := hass.data[DOMAIN]["journal"].async_get(batch_id)) is None:
+        return None
+    if batch.get("undone_by"):
+        return {"success": False, "error": f"Batch {batch['id']} was already undone"}
+    result = async_undo_batch(hass, batch)
+    if rewrite and result["success"]:
+        result["rewrite"] = await async_rewrite_references(
+            hass, {new_entity_id: entity_id for entity_id, new_entity_id, *_ in batch["entities"]}
+        )
+    return result
+
+
+async def undo_rename_service(hass, service: ServiceCall) -> ServiceResponse:
+    """Undo rename service call."""
+    result = await _async_undo_renames(
+        hass, service.data.get("batch_id"), service.data["rewrite_references"]
+    )
+    if result is None:
+        raise HomeAssistantError("No rename batch to undo")
+    if not result["success"] and not service.return_response:
+        raise HomeAssistantError(f"Undo failed: {result.get('error') or _batch_errors(result)}")
+    return result
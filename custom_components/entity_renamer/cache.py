@@ -0,0 +1,86 @@
+"""Persistent cache of model suggestions for the Entity Renamer integration."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import CACHE_MAX_ENTRIES, CACHE_SAVE_DELAY, CACHE_TTL, DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.suggestion_cache"
+
+
+def fingerprint(*parts) -> str:
+    """Return a stable key for the context a suggestion was made in."""
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False, default=str).encode()).hexdigest()
+
+
+class SuggestionCache:
+    """LRU cache of suggestions with a TTL, persisted through ``Store``.
+
+    Entries are kept in least recently used order and map a fingerprint to
+    the time the suggestion was made and the suggestion itself.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        *,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL,
+    ) -> None:
+        """Initialize the cache."""
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._entries: OrderedDict[str, list] = OrderedDict()
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+
+    async def async_load(self) -> None:
+        """Load the persisted entries the first time the cache is used."""
+        async with self._load_lock:
+            if self._loaded:
+                return
+            data = await self._store.async_load() or {}
+            now = time.time()
+            for key, (created, value) in data.get("entries", {}).items():
+                if now - created < self._ttl:
+                    self._entries[key] = [created, value]
+            self._loaded = True
+            _LOGGER.debug("Loaded %s cached suggestions", len(self._entries))
+
+    @callback
+    def async_get(self, key: str):
+        """Return the cached suggestion for ``key``, or ``None``."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry[0] >= self._ttl:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    @callback
+    def async_set(self, key: str, value) -> None:
+        """Store a suggestion, evicting the least recently used entries."""
+        self._entries[key] = [time.time(), value]
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+        self._store.async_delay_save(self._data_to_save, CACHE_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the data to persist."""
+        return {"entries": dict(self._entries)}
@@ -0,0 +1,160 @@
+"""Model backend client management for the Entity Renamer integration.
+
+A config entry names its backend: the OpenAI API by default, or any
+OpenAI-compatible server such as llama.cpp or Ollama through a base URL,
+together with the model to use and how many requests may run at once.
+"""
+
+import hashlib
+import logging
+import time
+from functools import partial
+
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.httpx_client import get_async_client
+from homeassistant.util.ssl import get_default_context
+
+from .const import (
+    CONF_BASE_URL,
+    CONF_MAX_CONCURRENCY,
+    CONF_MODEL,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MODEL,
+    DOMAIN,
+    REQUEST_TIMEOUT,
+    VALIDATION_TTL,
+)
+from .scheduler import async_get_scheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+
+# Local servers ignore the API key, but the OpenAI client requires one
+NO_API_KEY = "no-api-key"
+
+
+def entry_api_key(entry: ConfigEntry) -> str | None:
+    """Return the API key of an entry, preferring the one set in the options."""
+    return entry.options.get("api_key") or entry.data.get("api_key")
+
+
+def entry_base_url(entry: ConfigEntry) -> str | None:
+    """Return the base URL of an entry's backend, or ``None`` for the OpenAI API."""
+    return entry.options.get(CONF_BASE_URL, entry.data.get(CONF_BASE_URL)) or None
+
+
+def entry_model(entry: ConfigEntry) -> str:
+    """Return the model an entry asks for suggestions."""
+    return entry.options.get(CONF_MODEL) or entry.data.get(CONF_MODEL) or DEFAULT_MODEL
+
+
+def import_sdk() -> None:
+    """Import the OpenAI SDK and ``httpx``.
+
+    Importing them takes a noticeable time, so this is run in the executor
+    before either is first needed on the event loop.
+    """
+    import httpx  # noqa: F401
+    import openai  # noqa: F401
+
+
+async def async_create_entry_client(hass: HomeAssistant, entry: ConfigEntry):
+    """Create the pooled async OpenAI client used by an entry until it is unloaded.
+
+    Returns the OpenAI client together with the ``httpx.AsyncClient`` it owns,
+    which has to be closed when the entry is unloaded. The pool is built here
+    rather than by Home Assistant's client factory, which fixes its own
+    connection limits and does not let its clients be closed.
+    """
+    await hass.async_add_executor_job(import_sdk)
+    import httpx
+    import openai
+
+    base_url = entry_base_url(entry)
+    max_concurrency = entry.options.get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+    http_client = httpx.AsyncClient(
+        verify=get_default_context(),
+        timeout=REQUEST_TIMEOUT,
+        limits=httpx.Limits(
+            max_connections=max_concurrency, max_keepalive_connections=max_concurrency
+        ),
+        # Keep the backend's scheduler in step with the rate limits it reports
+        event_hooks={"response": [async_get_scheduler(hass, base_url).async_observe_response]},
+    )
+    # The OpenAI client inspects the platform when it is constructed, which
+    # does blocking I/O, so build it in the executor. Rate-limited and failed
+    # requests are retried by the scheduler, not by the client.
+    client = await hass.async_add_executor_job(
+        partial(
+            openai.AsyncOpenAI,
+            api_key=entry_api_key(entry) or NO_API_KEY,
+            base_url=base_url,
+            http_client=http_client,
+            max_retries=0,
+        )
+    )
+    return client, http_client
+
+
+async def async_create_probe_client(
+    hass: HomeAssistant, api_key: str | None, base_url: str | None = None
+):
+    """Create a short-lived async OpenAI client on Home Assistant's shared pool."""
+    await hass.async_add_executor_job(import_sdk)
+    import openai
+
+    return await hass.async_add_executor_job(
+        partial(
+            openai.AsyncOpenAI,
+            api_key=api_key or NO_API_KEY,
+            base_url=base_url,
+            http_client=get_async_client(hass),
+            max_retries=0,
+        )
+    )
+
+
+def _backend_digest(api_key: str | None, base_url: str | None) -> str:
+    """Return the hash an API key is remembered by, so the key itself is not kept."""
+    return hashlib.sha256(f"{base_url or ''}\n{api_key or ''}".encode()).hexdigest()
+
+
+@callback
+def async_cached_models(
+    hass: HomeAssistant, api_key: str | None, base_url: str | None = None
+) -> list[str] | None:
+    """Return the models of a recently validated backend, or ``None``."""
+    validated = hass.data.get(DOMAIN, {}).get("validated", {})
+    cached = validated.get(_backend_digest(api_key, base_url))
+    if cached is None or time.monotonic() - cached[0] > VALIDATION_TTL:
+        return None
+    return cached[1]
+
+
+async def async_validate_backend(
+    hass: HomeAssistant, api_key: str | None, base_url: str | None = None
+) -> list[str]:
+    """Check that the backend accepts ``api_key`` and return the IDs of its models.
+
+    The key and the model list are remembered for ``VALIDATION_TTL``, so
+    submitting the same settings again, or reopening the options, does not
+    contact the backend. Failed checks are not remembered.
+    """
+    if (models := async_cached_models(hass, api_key, base_url)) is not None:
+        return models
+
+    client = await async_create_probe_client(hass, api_key, base_url)
+    page = await async_get_scheduler(hass, base_url).async_run(client.models.list)
+    models = sorted(model.id for model in page.data)
+    validated = hass.data.setdefault(DOMAIN, {}).setdefault("validated", {})
+    validated[_backend_digest(api_key, base_url)] = (time.monotonic(), models)
+    return models
+
+
+def get_entry_client(hass: HomeAssistant):
+    """Return the first loaded config entry and its client, or ``None``."""
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        if runtime := hass.data.get(DOMAIN, {}).get(entry.entry_id):
+            return entry, runtime["client"]
+    return None
@@ -0,0 +1,120 @@
+"""Grouping of look-alike entities for the Entity Renamer integration.
+
+Large installs have many entities that differ only in the device they belong
+to, such as the power, energy and voltage sensors of every smart plug of one
+model. Such entities are grouped by domain, device model and name pattern so
+the model is asked for one entity ID template per group, which is then
+expanded locally for every entity of the group.
+"""
+
+import re
+
+from .const import CLUSTER_MIN_SIZE
+from .registry_index import known_name
+from .rules import location_code
+
+# Placeholders an entity ID template may use
+TEMPLATE_FIELDS = ("location", "device")
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+_INVALID_RE = re.compile(r"[^a-z0-9_]+")
+_UNDERSCORES_RE = re.compile(r"_{2,}")
+
+
+def _words(text) -> list[str]:
+    """Split text into lowercase words."""
+    return _WORD_RE.findall(str(text or "").lower())
+
+
+def name_pattern(entity: dict) -> str:
+    """Return the entity's name without its device and area, with numbers masked.
+
+    ``Kitchen Plug Power`` on the device ``Kitchen Plug`` and ``Power`` on
+    any other plug both give ``power``.
+    """
+    context = set(_words(known_name(entity.get("device_name"))))
+    context.update(_words(known_name(entity.get("area_name"))))
+    words = _words(entity.get("original_name") or entity.get("name"))
+    return " ".join("#" if word.isdigit() else word for word in words if word not in context)
+
+
+def cluster_key(entity: dict) -> tuple[str, str, str] | None:
+    """Return the ``(domain, device model, name pattern)`` an entity is grouped by.
+
+    Entities without a device model are not grouped.
+    """
+    domain, _, object_id = (entity.get("entity_id") or "").partition(".")
+    model = " ".join(_words(entity.get("device_model")))
+    if not domain or not object_id or not model:
+        return None
+    return domain, model, name_pattern(entity)
+
+
+def cluster_entities(entities: list[dict]) -> tuple[list[list[int]], list[int]]:
+    """Group look-alike entities.
+
+    Returns the positions of each group of at least ``CLUSTER_MIN_SIZE``
+    entities, in order of their first entity, and the positions of the
+    entities that are not part of a group.
+    """
+    groups: dict[tuple, list[int]] = {}
+    singles = []
+    for position, entity in enumerate(entities):
+        if (key := cluster_key(entity)) is None:
+            singles.append(position)
+        else:
+            groups.setdefault(key, []).append(position)
+
+    clusters = []
+    for positions in groups.values():
+        if len(positions) >= CLUSTER_MIN_SIZE:
+            clusters.append(positions)
+        else:
+            singles.extend(positions)
+    singles.sort()
+    return clusters, singles
+
+
+def cluster_template_item(entities: list[dict]) -> dict:
+    """Return the item describing a group of look-alike entities to the model."""
+    example = entities[0]
+    # Only entities with a cluster key are grouped
+    key = cluster_key(example)
+    assert key is not None
+    domain, _, pattern = key
+    return {
+        "domain": domain,
+        "model": example.get("device_model"),
+        "pattern": pattern,
+        "count": len(entities),
+        "example": example,
+    }
+
+
+def expand_template(template, entity: dict) -> str | None:
+    """Fill in an entity ID template for one entity of its group.
+
+    ``{location}`` becomes the short location code of the entity's area and
+    ``{device}`` the entity's device name without the area; either is left
+    empty for an entity without an area or device. The domain is always the
+    entity's own. Returns ``None`` if the template does not give an entity ID.
+    """
+    if not isinstance(template, str):
+        return None
+    domain = entity["entity_id"].split(".", 1)[0]
+    area_name = known_name(entity.get("area_name"))
+    area_words = set(_words(area_name))
+    values = {
+        "location": location_code(area_name) or "",
+        "device": "_".join(
+            word for word in _words(known_name(entity.get("device_name"))) if word not in area_words
+        ),
+    }
+    object_id = _PLACEHOLDER_RE.sub(
+        lambda match: values.get(match.group(1).lower(), ""), template.rpartition(".")[2]
+    )
+    object_id = _UNDERSCORES_RE.sub("_", _INVALID_RE.sub("_", object_id.lower())).strip("_")
+    if not object_id:
+        return None
+    return f"{domain}.{object_id}"
@@ -1,15 +1,109 @@
 """Config flow for Entity Renamer integration."""
 import logging
+from urllib.parse import urlparse
+
 import voluptuous as vol
 
 from homeassistant import config_entries
 from homeassistant.core import callback
 from homeassistant.helpers import config_validation as cv
-
-from .const import DOMAIN
+from homeassistant.helpers.selector import (
+    SelectSelector,
+    SelectSelectorConfig,
+    SelectSelectorMode,
+)
+
+from .client import (
+    async_cached_models,
+    async_validate_backend,
+    entry_api_key,
+    entry_base_url,
+    entry_model,
+)
+from .const import (
+    CONF_BASE_URL,
+    CONF_CHUNK_TOKENS,
+    CONF_MAX_CONCURRENCY,
+    CONF_MODEL,
+    DEFAULT_CHUNK_TOKENS,
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_MODEL,
+    DOMAIN,
+    MAX_CHUNK_TOKENS,
+    MAX_CONCURRENCY_LIMIT,
+    MIN_CHUNK_TOKENS,
+)
+from .scheduler import RateLimitExceeded
 
 _LOGGER = logging.getLogger(__name__)
 
+
+async def _async_validate_api_key(hass, api_key, base_url=None, model=None):
+    """Check an API key and model against the backend and return the form errors, if any."""
+    errors = {}
+    try:
+        import openai
+
+        models = await async_validate_backend(hass, api_key, base_url)
+        # Backends that do not list their models cannot be checked
+        if model and models and model not in models:
+            errors[CONF_MODEL] = "unknown_model"
+    except ImportError:
+        errors["base"] = "openai_not_installed"
+    except RateLimitExceeded as e:
+        _LOGGER.error("OpenAI API rate limit exceeded: %s", e)
+        errors["base"] = "rate_limit_exceeded"
+    except openai.AuthenticationError as e:
+        _LOGGER.error("Invalid OpenAI API key: %s", e)
+        errors["api_key"] = "invalid_api_key"
+    except openai.RateLimitError as e:
+        _LOGGER.error("OpenAI API rate limit exceeded: %s", e)
+        errors["base"] = "rate_limit_exceeded"
+    except openai.APITimeoutError as e:
+        _LOGGER.error("OpenAI API request timed out: %s", e)
+        errors["base"] = "timeout_error"
+    except openai.APIConnectionError as e:
+        _LOGGER.error("Failed to connect to OpenAI API: %s", e)
+        errors["base"] = "connection_error"
+    except openai.BadRequestError as e:
+        _LOGGER.error("Bad request to OpenAI API: %s", e)
+        errors["base"] = "bad_request_error"
+    except openai.InternalServerError as e:
+        _LOGGER.error("OpenAI API internal server error: %s", e)
+        errors["base"] = "openai_server_error"
+    except openai.PermissionDeniedError as e:
+        _LOGGER.error("Permission denied by OpenAI API: %s", e)
+        errors["api_key"] = "permission_denied"
+    except openai.UnprocessableEntityError as e:
+        _LOGGER.error("Unprocessable entity error from OpenAI API: %s", e)
+        errors["base"] = "unprocessable_entity"
+    except Exception as e:
+        _LOGGER.error("Unexpected error validating OpenAI API key: %s", e)
+        errors["base"] = "unknown_error"
+    return errors
+
+
+async def _async_validate_backend(hass, user_input):
+    """Check the backend settings of a form and return the form errors, if any."""
+    api_key = user_input.get("api_key", "")
+    base_url = user_input.get(CONF_BASE_URL) or None
+    if base_url is not None and urlparse(base_url).scheme not in ("http", "https"):
+        return {CONF_BASE_URL: "invalid_base_url"}
+    # Only the OpenAI API needs a key; local servers usually do not check it
+    if not api_key and base_url is None:
+        return {"api_key": "api_key_required"}
+    return await _async_validate_api_key(hass, api_key, base_url, user_input.get(CONF_MODEL))
+
+
+def _model_field(models: list[str] | None):
+    """Return the form field of the model: a selector once the models are known."""
+    if not models:
+        return str
+    return SelectSelector(
+        SelectSelectorConfig(options=models, custom_value=True, mode=SelectSelectorMode.DROPDOWN)
+    )
+
+
 class EntityRenamerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Entity Renamer."""
 
@@ -20,89 +114,30 @@ class EntityRenamerConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         """Handle the initial step."""
         errors = {}
 
+        models = None
         if user_input is not None:
-            # Validate the API key (we could test it here if needed)
-            api_key = user_input.get("api_key", "")
-            
-            if not api_key:
-                errors["api_key"] = "api_key_required"
-            else:
-                # Test the API key with OpenAI
-                try:
-                    import openai
-                    
-                    # Initialize client with explicit parameters to avoid environment issues
-                    try:
-                        client = openai.OpenAI(
-                            api_key=api_key,
-                            timeout=30.0
-                        )
-                    except TypeError as init_error:
-                        # Fallbacks for older versions or environment issues
-                        _LOGGER.warning(
-                            "OpenAI client init failed, trying alternative: %s",
-                            init_error,
-                        )
-                        try:
-                            client = openai.OpenAI(api_key=api_key)
-                        except TypeError as second_error:
-                            _LOGGER.warning(
-                                "OpenAI client init failed again, using basic HTTP client: %s",
-                                second_error,
-                            )
-                            import httpx
-
-                            client = openai.OpenAI(
-                                api_key=api_key,
-                                http_client=httpx.Client(timeout=30.0),
-                            )
-                    
-                    # Simple test call to validate the API key
-                    await self.hass.async_add_executor_job(
-                        lambda: client.models.list()
-                    )
-                    
-                    # If we get here, the API key is valid
-                    return self.async_create_entry(
-                        title="Entity Renamer",
-                        data=user_input,
-                    )
-                except ImportError:
-                    errors["base"] = "openai_not_installed"
-                except openai.AuthenticationError as e:
-                    _LOGGER.error("Invalid OpenAI API key: %s", e)
-                    errors["api_key"] = "invalid_api_key"
-                except openai.RateLimitError as e:
-                    _LOGGER.error("OpenAI API rate limit exceeded: %s", e)
-                    errors["base"] = "rate_limit_exceeded"
-                except openai.APIConnectionError as e:
-                    _LOGGER.error("Failed to connect to OpenAI API: %s", e)
-                    errors["base"] = "connection_error"
-                except openai.APITimeoutError as e:
-                    _LOGGER.error("OpenAI API request timed out: %s", e)
-                    errors["base"] = "timeout_error"
-                except openai.BadRequestError as e:
-                    _LOGGER.error("Bad request to OpenAI API: %s", e)
-                    errors["base"] = "bad_request_error"
-                except openai.InternalServerError as e:
-                    _LOGGER.error("OpenAI API internal server error: %s", e)
-                    errors["base"] = "openai_server_error"
-                except openai.PermissionDeniedError as e:
-                    _LOGGER.error("Permission denied by OpenAI API: %s", e)
-                    errors["api_key"] = "permission_denied"
-                except openai.UnprocessableEntityError as e:
-                    _LOGGER.error("Unprocessable entity error from OpenAI API: %s", e)
-                    errors["base"] = "unprocessable_entity"
-                except Exception as e:
-                    _LOGGER.error("Unexpected error validating OpenAI API key: %s", e)
-                    errors["base"] = "unknown_error"
+            errors = await _async_validate_backend(self.hass, user_input)
+            if not errors:
+                # If we get here, the backend accepted the API key
+                return self.async_create_entry(
+                    title="Entity Renamer",
+                    data=user_input,
+                )
+            models = async_cached_models(
+                self.hass, user_input.get("api_key"), user_input.get(CONF_BASE_URL) or None
+            )
+        user_input = user_input or {}
 
         # Show the form
         return self.async_show_form(
             step_id="user",
             data_schema=vol.Schema(
                 {
-                    vol.Required("api_key"): str,
+                    vol.Optional("api_key", default=user_input.get("api_key", "")): str,
+                    vol.Optional(CONF_BASE_URL, default=user_input.get(CONF_BASE_URL, "")): str,
+                    vol.Optional(
+                        CONF_MODEL, default=user_input.get(CONF_MODEL, DEFAULT_MODEL)
+                    ): _model_field(models),
                 }
             ),
             errors=errors,
@@ -127,91 +162,40 @@ class EntityRenamerOptionsFlow(config_entries.OptionsFlow):
         errors = {}
 
         if user_input is not None:
-            # Validate the API key
-            api_key = user_input.get("api_key", "")
-            
-            if not api_key:
-                errors["api_key"] = "api_key_required"
-            else:
-                # Test the API key with OpenAI
-                try:
-                    import openai
-                    
-                    # Initialize client with explicit parameters to avoid environment issues
-                    try:
-                        client = openai.OpenAI(
-                            api_key=api_key,
-                            timeout=30.0
-                        )
-                    except TypeError as init_error:
-                        # Fallbacks for older versions or environment issues
-                        _LOGGER.warning(
-                            "OpenAI client init failed, trying alternative: %s",
-                            init_error,
-                        )
-                        try:
-                            client = openai.OpenAI(api_key=api_key)
-                        except TypeError as second_error:
-                            _LOGGER.warning(
-                                "OpenAI client init failed again, using basic HTTP client: %s",
-                                second_error,
-                            )
-                            import httpx
-
-                            client = openai.OpenAI(
-                                api_key=api_key,
-                                http_client=httpx.Client(timeout=30.0),
-                            )
-                    
-                    # Simple test call to validate the API key
-                    await self.hass.async_add_executor_job(
-                        lambda: client.models.list()
-                    )
-                    
-                    # If we get here, the API key is valid
-                    return self.async_create_entry(
-                        title="",
-                        data=user_input,
-                    )
-                except ImportError:
-                    errors["base"] = "openai_not_installed"
-                except openai.AuthenticationError as e:
-                    _LOGGER.error("Invalid OpenAI API key: %s", e)
-                    errors["api_key"] = "invalid_api_key"
-                except openai.RateLimitError as e:
-                    _LOGGER.error("OpenAI API rate limit exceeded: %s", e)
-                    errors["base"] = "rate_limit_exceeded"
-                except openai.APIConnectionError as e:
-                    _LOGGER.error("Failed to connect to OpenAI API: %s", e)
-                    errors["base"] = "connection_error"
-                except openai.APITimeoutError as e:
-                    _LOGGER.error("OpenAI API request timed out: %s", e)
-                    errors["base"] = "timeout_error"
-                except openai.BadRequestError as e:
-                    _LOGGER.error("Bad request to OpenAI API: %s", e)
-                    errors["base"] = "bad_request_error"
-                except openai.InternalServerError as e:
-                    _LOGGER.error("OpenAI API internal server error: %s", e)
-                    errors["base"] = "openai_server_error"
-                except openai.PermissionDeniedError as e:
-                    _LOGGER.error("Permission denied by OpenAI API: %s", e)
-                    errors["api_key"] = "permission_denied"
-                except openai.UnprocessableEntityError as e:
-                    _LOGGER.error("Unprocessable entity error from OpenAI API: %s", e)
-                    errors["base"] = "unprocessable_entity"
-                except Exception as e:
-                    _LOGGER.error("Unexpected error validating OpenAI API key: %s", e)
-                    errors["base"] = "unknown_error"
+            errors = await _async_validate_backend(self.hass, user_input)
+            if not errors:
+                # If we get here, the backend accepted the API key
+                return self.async_create_entry(
+                    title="",
+                    data=user_input,
+                )
 
         # Get current values
-        current_api_key = self.config_entry.data.get("api_key", "")
+        current_api_key = entry_api_key(self.config_entry) or ""
+        current_base_url = entry_base_url(self.config_entry) or ""
+        current_model = entry_model(self.config_entry)
+        models = async_cached_models(self.hass, current_api_key, current_base_url or None)
+        current_concurrency = self.config_entry.options.get(
+            CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY
+        )
+        current_chunk_tokens = self.config_entry.options.get(
+            CONF_CHUNK_TOKENS, DEFAULT_CHUNK_TOKENS
+        )
 
         # Show the form
         return self.async_show_form(
             step_id="init",
             data_schema=vol.Schema(
                 {
-                    vol.Required("api_key", default=current_api_key): str,
+                    vol.Optional("api_key", default=current_api_key): str,
+                    vol.Optional(CONF_BASE_URL, default=current_base_url): str,
+                    vol.Optional(CONF_MODEL, default=current_model): _model_field(models),
+                    vol.Optional(CONF_MAX_CONCURRENCY, default=current_concurrency): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=MAX_CONCURRENCY_LIMIT)
+                    ),
+                    vol.Optional(CONF_CHUNK_TOKENS, default=current_chunk_tokens): vol.All(
+                        vol.Coerce(int), vol.Range(min=MIN_CHUNK_TOKENS, max=MAX_CHUNK_TOKENS)
+                    ),
                 }
             ),
             errors=errors,
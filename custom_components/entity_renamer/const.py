@@ -1,11 +1,59 @@
 """Constants for the Entity Renamer integration."""
-import json
-import os
 
 DOMAIN = "entity_renamer"
 
-# Get version from manifest.json
-MANIFEST_PATH = os.path.join(os.path.dirname(__file__), "manifest.json")
-with open(MANIFEST_PATH) as manifest_file:
-    manifest = json.load(manifest_file)
-    VERSION = manifest["version"]
+CONF_BASE_URL = "base_url"
+CONF_MODEL = "model"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_CHUNK_TOKENS = "chunk_tokens"
+
+# Timeout in seconds for requests to the OpenAI API
+REQUEST_TIMEOUT = 30.0
+
+# Model used when the config entry does not name one
+DEFAULT_MODEL = "gpt-4"
+
+# Suggestion requests are split into chunks of at most this many prompt
+# tokens, which are sent to the model concurrently.
+DEFAULT_CHUNK_TOKENS = 2000
+MIN_CHUNK_TOKENS = 500
+MAX_CHUNK_TOKENS = 16000
+DEFAULT_MAX_CONCURRENCY = 4
+MAX_CONCURRENCY_LIMIT = 16
+# Number of times a failed chunk is retried before the request fails
+CHUNK_RETRIES = 2
+
+# A backend that accepted an API key is not asked again for this long
+# (seconds) when the same settings are submitted
+VALIDATION_TTL = 3600
+
+# Starting limits of the request scheduler for the OpenAI API, replaced by
+# the limits it reports in the x-ratelimit headers of its responses. Other
+# backends are not limited until they report limits.
+DEFAULT_REQUESTS_PER_MINUTE = 500
+DEFAULT_TOKENS_PER_MINUTE = 10000
+# Reply tokens a suggestion request is expected to use per row
+COMPLETION_TOKENS_PER_ROW = 20
+# Number of times a rate-limited or failed request is retried, and the
+# backoff in seconds before the first retry and at most
+RATE_LIMIT_RETRIES = 5
+RATE_LIMIT_BACKOFF = 1.0
+RATE_LIMIT_MAX_BACKOFF = 60.0
+
+# Suggestions are cached per entity/device context for this long (seconds)
+CACHE_TTL = 30 * 24 * 3600
+CACHE_MAX_ENTRIES = 20000
+# Delay in seconds before cache changes are written to disk
+CACHE_SAVE_DELAY = 30
+
+# Entities of one domain, device model and name pattern are named from a
+# single template once there are at least this many of them
+CLUSTER_MIN_SIZE = 3
+
+# Background suggestion jobs
+JOB_BATCH_SIZE = 100
+JOB_MAX_FINISHED = 20
+JOB_SAVE_DELAY = 10
+
+# Rename batches kept in the journal for undo
+JOURNAL_MAX_BATCHES = 500
@@ -0,0 +1,27 @@
+"""Diagnostics support for the Entity Renamer integration."""
+
+from typing import Any
+
+from homeassistant.components.diagnostics import async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .client import entry_base_url, entry_model
+from .const import DOMAIN
+
+TO_REDACT = {"api_key"}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return the backend settings and the startup timing report of an entry."""
+    data = hass.data.get(DOMAIN, {})
+    timer = data.get("startup")
+    return {
+        "data": async_redact_data(dict(entry.data), TO_REDACT),
+        "options": async_redact_data(dict(entry.options), TO_REDACT),
+        "backend": {"base_url": entry_base_url(entry), "model": entry_model(entry)},
+        "loaded": entry.entry_id in data,
+        "startup_ms": dict(timer.steps) if timer else {},
+    }
@@ -4,6 +4,121 @@ import {
   css,
 } from "https://unpkg.com/lit-element@2.4.0/lit-element.js?module";
 
+// Last list responses by URL. Kept at module level so a reopened panel can
+// revalidate with the stored ETag instead of downloading the lists again.
+const listCache = new Map();
+
+const ENTITIES_URL = "/api/entity_renamer/entities";
+const DEVICES_URL = "/api/entity_renamer/devices";
+
+const BULK_RENAME_URL = "/api/entity_renamer/rename_bulk";
+const REFERENCES_URL = "/api/entity_renamer/references";
+const JOBS_URL = "/api/entity_renamer/jobs";
+const JOURNAL_URL = "/api/entity_renamer/journal";
+
+// Selections larger than this are suggested by a background job
+const JOB_THRESHOLD = 200;
+const JOB_POLL_INTERVAL_MS = 2000;
+
+// Why the integration changed a suggested entity ID before showing it
+const ADJUSTED_REASONS = {
+  domain: "Domain kept",
+  invalid: "Made a valid entity ID",
+  in_use: "Suffix added, ID already in use",
+  duplicate: "Suffix added, ID suggested twice",
+};
+
+// How often the panel pulls registry changes while it is open
+const SYNC_INTERVAL_MS = 10000;
+
+// Filtering runs in a worker holding a search index over the entity list.
+// Typing only searches once it pauses for SEARCH_DEBOUNCE_MS.
+const SEARCH_WORKER_URL = new URL("search-worker.js", import.meta.url);
+const SEARCH_DEBOUNCE_MS = 150;
+
+// Tables only render the rows scrolled into view. Every row has the same
+// height, so the visible rows follow from the scroll position alone.
+const ROW_HEIGHT = 40;
+const TABLE_HEIGHT = 480;
+const OVERSCAN_ROWS = 10;
+
+// Rows of a table with `count` rows to render at scroll position `scrollTop`
+function visibleRange(count, scrollTop) {
+  const top = Math.min(scrollTop, Math.max(0, count * ROW_HEIGHT - TABLE_HEIGHT));
+  return {
+    start: Math.max(0, Math.floor(top / ROW_HEIGHT) - OVERSCAN_ROWS),
+    end: Math.min(count, Math.ceil((top + TABLE_HEIGHT) / ROW_HEIGHT) + OVERSCAN_ROWS),
+  };
+}
+
+// Empty row standing in for `rows` rows that are not rendered
+function spacerRow(rows, columns) {
+  return html`
+    <tr class="spacer">
+      <td colspan=${columns} style="height: ${rows * ROW_HEIGHT}px"></td>
+    </tr>
+  `;
+}
+
+// Read a newline-delimited JSON suggestion stream. Calls onRow(index, row)
+// for every suggestion as it arrives and returns the final status line.
+async function readSuggestionStream(response, onRow) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  let status = { success: false, error: "Suggestion stream ended unexpectedly" };
+
+  const handleLine = (line) => {
+    if (!line.trim()) {
+      return;
+    }
+    const message = JSON.parse(line);
+    if (message.index !== undefined) {
+      onRow(message.index, message.suggestion);
+    } else {
+      status = message;
+    }
+  };
+
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) {
+      break;
+    }
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    lines.forEach(handleLine);
+  }
+  handleLine(buffer + decoder.decode());
+  return status;
+}
+
+// Summarize why a batch rename was rejected, naming the renames at fault
+function bulkRenameError(data) {
+  if (data.error) {
+    return data.error;
+  }
+  const failed = [...(data.entities || []), ...(data.devices || [])].filter(
+    (row) => !row.success && !/^(Not applied|Rolled back)/.test(row.error || "")
+  );
+  return failed
+    .map((row) => `${row.entity_id || row.device_id}: ${row.error}`)
+    .join("; ");
+}
+
+// Describe what rewriting the references to renamed entities changed
+function rewriteSummary(rewrite) {
+  const changed = [...rewrite.files, ...rewrite.dashboards.map((d) => `dashboard ${d}`)];
+  if (changed.length === 0) {
+    return "no references to update";
+  }
+  return (
+    `updated ${rewrite.replacements} references in ${changed.join(", ")} ` +
+    `(backup in ${rewrite.backup})`
+  );
+}
+
 class EntityRenamerPanel extends LitElement {
   static get properties() {
     return {
@@ -13,7 +128,7 @@ class EntityRenamerPanel extends LitElement {
       panel: { type: Object },
       entities: { type: Array },
       filteredEntities: { type: Array },
-      selectedEntities: { type: Array },
+      selectedEntities: { type: Object },
       suggestions: { type: Array },
       loading: { type: Boolean },
       suggestionsLoading: { type: Boolean },
@@ -25,10 +140,15 @@ class EntityRenamerPanel extends LitElement {
       areas: { type: Array },
       devices: { type: Array },
       deviceList: { type: Array },
-      selectedDevices: { type: Array },
+      selectedDevices: { type: Object },
       deviceSuggestions: { type: Array },
       deviceSuggestionsLoading: { type: Boolean },
       view: { type: String },
+      localOnly: { type: Boolean },
+      jobProgress: { type: String },
+      references: { type: Object },
+      rewriteReferences: { type: Boolean },
+      lastBatchId: { type: String },
     };
   }
 
@@ -36,7 +156,8 @@ class EntityRenamerPanel extends LitElement {
     super();
     this.entities = [];
     this.filteredEntities = [];
-    this.selectedEntities = [];
+    // Selections are keyed by entity and device ID, in selection order
+    this.selectedEntities = new Map();
     this.suggestions = [];
     this.loading = true;
     this.suggestionsLoading = false;
@@ -48,44 +169,65 @@ class EntityRenamerPanel extends LitElement {
     this.areas = [];
     this.devices = [];
     this.deviceList = [];
-    this.selectedDevices = [];
+    this.localOnly = false;
+    this.jobProgress = "";
+    // Configuration objects using each entity ID, for the suggestion table
+    this.references = {};
+    this.rewriteReferences = false;
+    // Journal batch of the last rename applied from the panel, for "Undo"
+    this.lastBatchId = null;
+    this.selectedDevices = new Map();
     this.deviceSuggestions = [];
     this.deviceSuggestionsLoading = false;
     this.view = "entities";
+    this.revision = null;
+    this._syncTimer = null;
+    this._syncing = false;
+    // Area groups the user folded, and the rows of the grouped entity table
+    this.collapsedAreas = new Set();
+    this._entityRows = [];
+    // Selected entities among the filtered ones, in total and per area
+    this._filteredSelected = 0;
+    this._areaSelected = new Map();
+    this._scrollTop = {};
+    this._scrollFrame = null;
+    this._searchWorker = null;
+    this._searchId = 0;
+    this._searchWaiters = [];
+    this._searchTimer = null;
+    this._indexedEntities = [];
   }
 
   connectedCallback() {
     super.connectedCallback();
+    this._searchWorker = new Worker(SEARCH_WORKER_URL);
+    this._searchWorker.onmessage = (e) => this.handleSearchResult(e.data);
     this.loadEntities();
     this.loadDevices();
+    this._syncTimer = setInterval(() => this.syncChanges(), SYNC_INTERVAL_MS);
+  }
+
+  disconnectedCallback() {
+    super.disconnectedCallback();
+    clearInterval(this._syncTimer);
+    this._syncTimer = null;
+    cancelAnimationFrame(this._scrollFrame);
+    this._scrollFrame = null;
+    clearTimeout(this._searchTimer);
+    this._searchWorker.terminate();
+    this._searchWorker = null;
   }
 
   async loadEntities() {
     this.loading = true;
     try {
-      const headers = {};
-      if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
-        headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
-      }
-      const response = await fetch("/api/entity_renamer/entities", {
-        headers,
-      });
-      if (response.ok) {
-        const data = await response.json();
+      const data = await this.fetchList(ENTITIES_URL);
+      if (data) {
         this.entities = data;
-        this.filteredEntities = [...data];
-
-        // Extract unique areas and devices for filters
-        const areaSet = new Set();
-        const deviceSet = new Set();
-
-        this.entities.forEach(entity => {
-          if (entity.area_name) areaSet.add(entity.area_name);
-          if (entity.device_name) deviceSet.add(entity.device_name);
-        });
-
-        this.areas = Array.from(areaSet).sort();
-        this.devices = Array.from(deviceSet).sort();
+        this.revision = listCache.get(ENTITIES_URL)?.etag || null;
+        this.updateFilterOptions();
+        this.indexEntities();
+        await this.applyFilters();
       } else {
         this.showMessage("Failed to load entities", "error");
       }
@@ -96,22 +238,205 @@ class EntityRenamerPanel extends LitElement {
     }
   }
 
-  applyFilters() {
-    this.filteredEntities = this.entities.filter(entity => {
-      const matchesSearch = !this.searchTerm ||
-        entity.entity_id.toLowerCase().includes(this.searchTerm.toLowerCase()) ||
-        (entity.name && entity.name.toLowerCase().includes(this.searchTerm.toLowerCase()));
+  async fetchList(url) {
+    const headers = {};
+    if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
+      headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
+    }
+    const cached = listCache.get(url);
+    if (cached) {
+      headers["If-None-Match"] = cached.etag;
+    }
+    const response = await fetch(url, { headers, cache: "no-store" });
+    if (response.status === 304 && cached) {
+      return cached.data;
+    }
+    if (!response.ok) {
+      return null;
+    }
+    const data = await response.json();
+    const etag = response.headers.get("ETag");
+    if (etag) {
+      listCache.set(url, { etag, data });
+    }
+    return data;
+  }
+
+  updateFilterOptions() {
+    // Extract unique areas and devices for filters
+    const areaSet = new Set();
+    const deviceSet = new Set();
+
+    this.entities.forEach(entity => {
+      if (entity.area_name) areaSet.add(entity.area_name);
+      if (entity.device_name) deviceSet.add(entity.device_name);
+    });
+
+    this.areas = Array.from(areaSet).sort();
+    this.devices = Array.from(deviceSet).sort();
+  }
 
-      const matchesArea = !this.filterArea || entity.area_name === this.filterArea;
-      const matchesDevice = !this.filterDevice || entity.device_name === this.filterDevice;
+  async syncChanges() {
+    if (!this.revision || this._syncing) {
+      return;
+    }
+    this._syncing = true;
+    try {
+      const headers = {};
+      if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
+        headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
+      }
+      const response = await fetch(
+        `/api/entity_renamer/changes?since=${encodeURIComponent(this.revision)}`,
+        { headers, cache: "no-store" }
+      );
+      if (!response.ok) {
+        return;
+      }
+      const data = await response.json();
+      if (data.reset) {
+        await Promise.all([this.loadEntities(), this.loadDevices()]);
+        return;
+      }
+      if (data.changes.length > 0) {
+        this.applyChanges(data.changes);
+      }
+      this.revision = `"${data.revision}"`;
+      // The patched lists are what the server would return now, so keep
+      // the cache current and the next full load a 304.
+      listCache.set(ENTITIES_URL, { etag: this.revision, data: this.entities });
+      listCache.set(DEVICES_URL, { etag: this.revision, data: this.deviceList });
+    } catch (error) {
+      // Try again on the next tick
+    } finally {
+      this._syncing = false;
+    }
+  }
+
+  applyChanges(changes) {
+    const entities = new Map(this.entities.map((e) => [e.entity_id, e]));
+    const devices = new Map(this.deviceList.map((d) => [d.id, d]));
+    const removedEntities = new Set();
+    const removedDevices = new Set();
+
+    for (const change of changes) {
+      const target = change.type === "device" ? devices : entities;
+      const removed = change.type === "device" ? removedDevices : removedEntities;
+      if (change.action === "remove") {
+        target.delete(change.id);
+        removed.add(change.id);
+      } else {
+        target.set(change.id, change.row);
+        removed.delete(change.id);
+      }
+    }
+
+    this.entities = Array.from(entities.values());
+    this.deviceList = Array.from(devices.values());
+    removedEntities.forEach((id) => this.selectedEntities.delete(id));
+    removedDevices.forEach((id) => this.selectedDevices.delete(id));
+    this.updateFilterOptions();
+    this.indexEntities();
+    this.applyFilters();
+  }
+
+  // Send the entity list to the search worker to index. Searches are
+  // answered with positions in this list.
+  indexEntities() {
+    this._indexedEntities = this.entities;
+    this._searchWorker.postMessage({
+      type: "index",
+      rows: this.entities.map((e) => [e.entity_id, e.name, e.device_name, e.area_name]),
+    });
+  }
 
-      return matchesSearch && matchesArea && matchesDevice;
+  // Ask the search worker for the entities matching the filters. Resolves
+  // once the table shows them; results overtaken by a newer search are
+  // dropped.
+  applyFilters() {
+    clearTimeout(this._searchTimer);
+    this._searchTimer = null;
+    this._searchWorker.postMessage({
+      type: "search",
+      id: ++this._searchId,
+      term: this.searchTerm,
+      area: this.filterArea,
+      device: this.filterDevice,
     });
+    return new Promise((resolve) => this._searchWaiters.push(resolve));
+  }
+
+  handleSearchResult({ id, matches }) {
+    if (id !== this._searchId) {
+      return;
+    }
+    // Matches come ordered by area, ready to be grouped
+    this.filteredEntities = Array.from(matches, (position) => this._indexedEntities[position]);
+    this.updateEntityRows();
+    this._searchWaiters.forEach((resolve) => resolve());
+    this._searchWaiters = [];
+  }
+
+  // Group the filtered entities, which come ordered by area, into the rows
+  // of the entity table: a header row per area followed by its entities,
+  // unless it is folded. Also counts the selected entities per area for the
+  // group checkboxes.
+  updateEntityRows() {
+    const groups = new Map();
+    for (const entity of this.filteredEntities) {
+      const area = entity.area_name || "No Area";
+      if (!groups.has(area)) groups.set(area, []);
+      groups.get(area).push(entity);
+    }
+
+    const rows = [];
+    this._areaSelected = new Map();
+    this._filteredSelected = 0;
+    for (const [area, entities] of groups) {
+      const selected = entities.filter((e) => this.selectedEntities.has(e.entity_id)).length;
+      this._areaSelected.set(area, selected);
+      this._filteredSelected += selected;
+      rows.push({ area, entities });
+      if (!this.collapsedAreas.has(area)) {
+        for (const entity of entities) rows.push(entity);
+      }
+    }
+    this._entityRows = rows;
+    this.requestUpdate();
+  }
+
+  toggleArea(area) {
+    if (!this.collapsedAreas.delete(area)) {
+      this.collapsedAreas.add(area);
+    }
+    this.updateEntityRows();
+  }
+
+  handleScroll(table, e) {
+    this._scrollTop[table] = e.target.scrollTop;
+    if (!this._scrollFrame) {
+      this._scrollFrame = requestAnimationFrame(() => {
+        this._scrollFrame = null;
+        this.requestUpdate();
+      });
+    }
+  }
+
+  // Render the rows of `table` that are scrolled into view, with spacer
+  // rows standing in for the others so the scroll bar keeps its size
+  renderRows(table, rows, columns, renderRow) {
+    const { start, end } = visibleRange(rows.length, this._scrollTop[table] || 0);
+    return html`
+      ${start > 0 ? spacerRow(start, columns) : ""}
+      ${rows.slice(start, end).map(renderRow)}
+      ${end < rows.length ? spacerRow(rows.length - end, columns) : ""}
+    `;
   }
 
   handleSearchInput(e) {
     this.searchTerm = e.target.value;
-    this.applyFilters();
+    clearTimeout(this._searchTimer);
+    this._searchTimer = setTimeout(() => this.applyFilters(), SEARCH_DEBOUNCE_MS);
   }
 
   handleAreaFilter(e) {
@@ -126,13 +451,8 @@ class EntityRenamerPanel extends LitElement {
 
   async loadDevices() {
     try {
-      const headers = {};
-      if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
-        headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
-      }
-      const response = await fetch("/api/entity_renamer/devices", { headers });
-      if (response.ok) {
-        const data = await response.json();
+      const data = await this.fetchList(DEVICES_URL);
+      if (data) {
         this.deviceList = data;
       } else {
         this.showMessage("Failed to load devices", "error");
@@ -143,24 +463,64 @@ class EntityRenamerPanel extends LitElement {
   }
 
   toggleSelectDevice(device) {
-    const index = this.selectedDevices.findIndex((d) => d.id === device.id);
-    if (index === -1) {
-      this.selectedDevices = [...this.selectedDevices, device];
-    } else {
-      this.selectedDevices = this.selectedDevices.filter((d) => d.id !== device.id);
+    if (!this.selectedDevices.delete(device.id)) {
+      this.selectedDevices.set(device.id, device);
     }
+    this.requestUpdate();
   }
 
   selectAllDevices() {
-    this.selectedDevices = [...this.deviceList];
+    this.selectedDevices = new Map(this.deviceList.map((d) => [d.id, d]));
   }
 
   clearDeviceSelection() {
-    this.selectedDevices = [];
+    this.selectedDevices = new Map();
+  }
+
+  // Run a background suggestion job and pass on its rows as they finish.
+  // Used for large selections, which take longer than one request may last.
+  async runSuggestionJob(kind, items, headers, onRows) {
+    const response = await fetch(JOBS_URL, {
+      method: "POST",
+      headers,
+      body: JSON.stringify({ kind, items, local_only: this.localOnly }),
+    });
+    const created = await response.json();
+    if (!created.success) {
+      return created;
+    }
+
+    let offset = 0;
+    this.jobProgress = `0/${created.job.total}`;
+    try {
+      for (;;) {
+        await new Promise((resolve) => setTimeout(resolve, JOB_POLL_INTERVAL_MS));
+        const data = await (
+          await fetch(`${JOBS_URL}/${created.job.id}?offset=${offset}`, { headers })
+        ).json();
+        if (!data.success) {
+          return data;
+        }
+        const { job } = data;
+        if (data.results.length > 0) {
+          offset += data.results.length;
+          onRows(data.results);
+        }
+        this.jobProgress = `${job.done}/${job.total}`;
+        if (job.status === "completed") {
+          return { success: true };
+        }
+        if (job.status === "failed" || job.status === "cancelled") {
+          return { success: false, error: job.error || `Job ${job.status}` };
+        }
+      }
+    } finally {
+      this.jobProgress = "";
+    }
   }
 
   async getDeviceSuggestions() {
-    if (this.selectedDevices.length === 0) {
+    if (this.selectedDevices.size === 0) {
       this.showMessage("Please select at least one device", "warning");
       return;
     }
@@ -173,23 +533,31 @@ class EntityRenamerPanel extends LitElement {
       if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
         headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
       }
-      const response = await fetch("/api/entity_renamer/suggest_device", {
-        method: "POST",
-        headers,
-        body: JSON.stringify({ devices: this.selectedDevices }),
-      });
-      const data = await response.json();
+      const devices = [...this.selectedDevices.values()];
+      let data;
+      if (devices.length > JOB_THRESHOLD) {
+        data = await this.runSuggestionJob("devices", devices, headers, (rows) => {
+          this.deviceSuggestions = [...this.deviceSuggestions, ...rows];
+        });
+      } else {
+        const response = await fetch("/api/entity_renamer/suggest_device", {
+          method: "POST",
+          headers,
+          body: JSON.stringify({
+            devices,
+            stream: true,
+            local_only: this.localOnly,
+          }),
+        });
+
+        const rows = [];
+        data = await readSuggestionStream(response, (index, row) => {
+          rows[index] = row;
+          this.deviceSuggestions = rows.filter(Boolean);
+        });
+      }
 
       if (data.success) {
-        this.deviceSuggestions = data.suggestions.map((s) => ({
-          ...s,
-          suggested_name:
-            typeof s.suggested_name === "string"
-              ? s.suggested_name
-              : s.suggested_name?.name ||
-                s.suggested_name?.suggested_name ||
-                JSON.stringify(s.suggested_name),
-        }));
         this.showMessage("Device suggestions received successfully", "success");
       } else {
         this.showMessage(`Error: ${data.error}`, "error");
@@ -215,11 +583,10 @@ class EntityRenamerPanel extends LitElement {
 
       const data = await response.json();
       if (data.success) {
-        this.deviceList = this.deviceList.map((d) =>
-          d.id === device.id ? { ...d, name: suggestedName } : d
-        );
+        await this.syncChanges();
         this.deviceSuggestions = this.deviceSuggestions.filter((d) => d.id !== device.id);
-        this.selectedDevices = this.selectedDevices.filter((d) => d.id !== device.id);
+        this.selectedDevices.delete(device.id);
+        this.lastBatchId = data.batch_id;
         this.showMessage(`Renamed device ${device.name} successfully`, "success");
       } else {
         this.showMessage(`Error: ${data.error}`, "error");
@@ -240,76 +607,68 @@ class EntityRenamerPanel extends LitElement {
       headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
     }
 
-    const promises = this.deviceSuggestions.map((suggestion) =>
-      fetch("/api/entity_renamer/rename_device", {
+    try {
+      const response = await fetch(BULK_RENAME_URL, {
         method: "POST",
         headers,
-        body: JSON.stringify({ device_id: suggestion.id, new_name: suggestion.suggested_name }),
-      })
-    );
+        body: JSON.stringify({
+          devices: this.deviceSuggestions.map((suggestion) => ({
+            device_id: suggestion.id,
+            new_name: suggestion.suggested_name,
+          })),
+        }),
+      });
+      const data = await response.json();
 
-    try {
-      const results = await Promise.all(promises);
-      const allSuccessful = results.every((r) => r.ok);
-
-      if (allSuccessful) {
-        this.deviceList = this.deviceList.map((device) => {
-          const suggestion = this.deviceSuggestions.find((s) => s.id === device.id);
-          if (suggestion) {
-            return { ...device, name: suggestion.suggested_name };
-          }
-          return device;
-        });
+      await this.syncChanges();
+      if (data.success) {
         this.deviceSuggestions = [];
-        this.selectedDevices = [];
+        this.selectedDevices = new Map();
+        this.lastBatchId = data.batch_id;
         this.showMessage("All device suggestions applied successfully", "success");
       } else {
-        this.showMessage("Some device renames failed, please try again", "error");
+        this.showMessage(`Device renames not applied: ${bulkRenameError(data)}`, "error");
       }
     } catch (error) {
       this.showMessage(`Error: ${error.message}`, "error");
     }
   }
 
+  // Selection changes update the per-area counts in place, so a click
+  // costs the same however many entities there are
   toggleSelectEntity(entity) {
-    const index = this.selectedEntities.findIndex(e => e.entity_id === entity.entity_id);
-    if (index === -1) {
-      this.selectedEntities = [...this.selectedEntities, entity];
-    } else {
-      this.selectedEntities = this.selectedEntities.filter(e => e.entity_id !== entity.entity_id);
+    const area = entity.area_name || "No Area";
+    const change = this.selectedEntities.delete(entity.entity_id) ? -1 : 1;
+    if (change === 1) {
+      this.selectedEntities.set(entity.entity_id, entity);
     }
+    this._areaSelected.set(area, (this._areaSelected.get(area) || 0) + change);
+    this._filteredSelected += change;
+    this.requestUpdate();
   }
 
   selectAll() {
-    this.selectedEntities = [...this.filteredEntities];
+    this.selectedEntities = new Map(this.filteredEntities.map((e) => [e.entity_id, e]));
+    this.updateEntityRows();
   }
 
   clearSelection() {
-    this.selectedEntities = [];
+    this.selectedEntities = new Map();
+    this.updateEntityRows();
   }
 
-  toggleSelectGroup(groupEntities, checked) {
-    if (checked) {
-      const newEntities = groupEntities.filter(
-        (e) => !this.selectedEntities.some((se) => se.entity_id === e.entity_id)
-      );
-      this.selectedEntities = [...this.selectedEntities, ...newEntities];
-    } else {
-      const ids = new Set(groupEntities.map((e) => e.entity_id));
-      this.selectedEntities = this.selectedEntities.filter(
-        (e) => !ids.has(e.entity_id)
-      );
-    }
-  }
-
-  groupEntitiesByArea() {
-    const groups = {};
-    for (const entity of this.filteredEntities) {
-      const area = entity.area_name || "No Area";
-      if (!groups[area]) groups[area] = [];
-      groups[area].push(entity);
+  toggleSelectGroup(area, groupEntities, checked) {
+    for (const entity of groupEntities) {
+      if (checked) {
+        this.selectedEntities.set(entity.entity_id, entity);
+      } else {
+        this.selectedEntities.delete(entity.entity_id);
+      }
     }
-    return Object.entries(groups).sort((a, b) => a[0].localeCompare(b[0]));
+    const selected = checked ? groupEntities.length : 0;
+    this._filteredSelected += selected - (this._areaSelected.get(area) || 0);
+    this._areaSelected.set(area, selected);
+    this.requestUpdate();
   }
 
   toFriendlyName(entityId) {
@@ -322,7 +681,7 @@ class EntityRenamerPanel extends LitElement {
   }
 
   async getSuggestions() {
-    if (this.selectedEntities.length === 0) {
+    if (this.selectedEntities.size === 0) {
       this.showMessage("Please select at least one entity", "warning");
       return;
     }
@@ -337,21 +696,35 @@ class EntityRenamerPanel extends LitElement {
       if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
         headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
       }
-      const response = await fetch("/api/entity_renamer/suggest", {
-        method: "POST",
-        headers,
-        body: JSON.stringify({
-          entities: this.selectedEntities,
-        }),
+      const withName = (row) => ({
+        ...row,
+        suggested_name: row.suggested_name || this.toFriendlyName(row.suggested_id),
       });
+      const entities = [...this.selectedEntities.values()];
+      let data;
+      if (entities.length > JOB_THRESHOLD) {
+        data = await this.runSuggestionJob("entities", entities, headers, (rows) => {
+          this.suggestions = [...this.suggestions, ...rows.map(withName)];
+        });
+      } else {
+        const response = await fetch("/api/entity_renamer/suggest", {
+          method: "POST",
+          headers,
+          body: JSON.stringify({
+            entities,
+            stream: true,
+            local_only: this.localOnly,
+          }),
+        });
 
-      const data = await response.json();
+        const rows = [];
+        data = await readSuggestionStream(response, (index, row) => {
+          rows[index] = withName(row);
+          this.suggestions = rows.filter(Boolean);
+        });
+      }
 
       if (data.success) {
-        this.suggestions = data.suggestions.map(s => ({
-          ...s,
-          suggested_name: s.suggested_name || this.toFriendlyName(s.suggested_id),
-        }));
         this.showMessage("Suggestions received successfully", "success");
       } else {
         this.showMessage(`Error: ${data.error}`, "error");
@@ -361,6 +734,45 @@ class EntityRenamerPanel extends LitElement {
     } finally {
       this.suggestionsLoading = false;
     }
+    if (this.suggestions.length > 0) {
+      this.loadReferences(this.suggestions.map((s) => s.entity_id));
+    }
+  }
+
+  // Look up which automations, scripts, scenes and dashboards use the
+  // entities about to be renamed
+  async loadReferences(entityIds) {
+    const headers = { "Content-Type": "application/json" };
+    if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
+      headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
+    }
+    try {
+      const response = await fetch(REFERENCES_URL, {
+        method: "POST",
+        headers,
+        body: JSON.stringify({ entity_ids: entityIds }),
+      });
+      const data = await response.json();
+      if (data.success) {
+        this.references = { ...this.references, ...data.references };
+      }
+    } catch (error) {
+      // The table simply shows no references
+    }
+  }
+
+  renderReferences(entityId) {
+    const references = this.references[entityId];
+    if (!references) {
+      return "";
+    }
+    return html`
+      <span
+        title=${references.map((r) => `${r.type} ${r.name} (${r.source})`).join("\n")}
+      >
+        ${references.length === 0 ? "None" : references.length}
+      </span>
+    `;
   }
 
   async applyRename(entity, suggestedId, suggestedName) {
@@ -378,32 +790,37 @@ class EntityRenamerPanel extends LitElement {
           entity_id: entity.entity_id,
           new_entity_id: suggestedId,
           new_name: suggestedName,
+          rewrite_references: this.rewriteReferences,
         }),
       });
 
       const data = await response.json();
 
       if (data.success) {
-        // Update the entity in our local list
-        const updatedEntities = this.entities.map((e) => {
-          if (e.entity_id === entity.entity_id) {
-            return { ...e, entity_id: suggestedId, name: suggestedName };
-          }
-          return e;
-        });
-
-        this.entities = updatedEntities;
-        this.applyFilters();
+        // Pick up the renamed entity from the change feed
+        await this.syncChanges();
 
         // Remove from suggestions
         this.suggestions = this.suggestions.filter(
           (s) => s.entity_id !== entity.entity_id
         );
-
-        this.showMessage(
-          `Renamed ${entity.entity_id} successfully`,
-          "success"
-        );
+        this.lastBatchId = data.batch_id;
+
+        const references = data.references || [];
+        if (references.length > 0) {
+          this.showMessage(
+            `Renamed ${entity.entity_id}, but it is still used by ` +
+              references.map((r) => `${r.type} ${r.name}`).join(", "),
+            "warning"
+          );
+        } else if (data.rewrite) {
+          this.showMessage(
+            `Renamed ${entity.entity_id}, ${rewriteSummary(data.rewrite)}`,
+            "success"
+          );
+        } else {
+          this.showMessage(`Renamed ${entity.entity_id} successfully`, "success");
+        }
       } else {
         this.showMessage(`Error: ${data.error}`, "error");
       }
@@ -424,47 +841,65 @@ class EntityRenamerPanel extends LitElement {
     if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
       headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
     }
-    const promises = this.suggestions.map((suggestion) =>
-      fetch("/api/entity_renamer/rename", {
+    try {
+      const response = await fetch(BULK_RENAME_URL, {
         method: "POST",
         headers,
         body: JSON.stringify({
-          entity_id: suggestion.entity_id,
-          new_entity_id: suggestion.suggested_id,
-          new_name: suggestion.suggested_name,
+          entities: this.suggestions.map((suggestion) => ({
+            entity_id: suggestion.entity_id,
+            new_entity_id: suggestion.suggested_id,
+            new_name: suggestion.suggested_name,
+          })),
+          rewrite_references: this.rewriteReferences,
         }),
-      })
-    );
-
-    try {
-      const results = await Promise.all(promises);
-      const allSuccessful = results.every(r => r.ok);
-
-      if (allSuccessful) {
-        // Update all entities in our local list
-        const updatedEntities = this.entities.map((entity) => {
-          const suggestion = this.suggestions.find(
-            (s) => s.entity_id === entity.entity_id
-          );
-          if (suggestion) {
-            return {
-              ...entity,
-              entity_id: suggestion.suggested_id,
-              name: suggestion.suggested_name,
-            };
-          }
-          return entity;
-        });
-
-        this.entities = updatedEntities;
-        this.applyFilters();
+      });
+      const data = await response.json();
 
+      await this.syncChanges();
+      if (data.success) {
         // Clear suggestions
         this.suggestions = [];
+        this.lastBatchId = data.batch_id;
 
-        this.showMessage("All suggestions applied successfully", "success");
+        this.showMessage(
+          data.rewrite
+            ? `All suggestions applied, ${rewriteSummary(data.rewrite)}`
+            : "All suggestions applied successfully",
+          "success"
+        );
+      } else {
+        this.showMessage(`Renames not applied: ${bulkRenameError(data)}`, "error");
+      }
+    } catch (error) {
+      this.showMessage(`Error: ${error.message}`, "error");
+    }
+  }
+
+  async undoLastRename() {
+    const headers = { "Content-Type": "application/json" };
+    if (this.hass && this.hass.auth && this.hass.auth.accessToken) {
+      headers["Authorization"] = `Bearer ${this.hass.auth.accessToken}`;
+    }
+    try {
+      const response = await fetch(`${JOURNAL_URL}/${this.lastBatchId}/undo`, {
+        method: "POST",
+        headers,
+        body: JSON.stringify({ rewrite_references: this.rewriteReferences }),
+      });
+      const data = await response.json();
+
+      await this.syncChanges();
+      if (data.success) {
+        this.lastBatchId = null;
+        this.showMessage(
+          data.rewrite
+            ? `Last rename undone, ${rewriteSummary(data.rewrite)}`
+            : "Last rename undone",
+          "success"
+        );
       } else {
-        this.showMessage("Some renames failed, please try again", "error");
+        this.showMessage(`Rename not undone: ${bulkRenameError(data)}`, "error");
       }
     } catch (error) {
       this.showMessage(`Error: ${error.message}`, "error");
@@ -504,6 +939,11 @@ class EntityRenamerPanel extends LitElement {
               ${this.message}
             </div>
           ` : ""}
+          ${this.lastBatchId ? html`
+            <div class="undo">
+              <button @click=${this.undoLastRename}>Undo Last Rename</button>
+            </div>
+          ` : ""}
 
           ${this.view === 'entities' ? html`
           <div class="filters">
@@ -544,24 +984,20 @@ class EntityRenamerPanel extends LitElement {
               <div class="select-all-row">
                 <input
                   type="checkbox"
-                  ?checked=${this.selectedEntities.length === this.filteredEntities.length && this.filteredEntities.length > 0}
-                  @change=${() => this.selectedEntities.length === this.filteredEntities.length ? this.clearSelection() : this.selectAll()}
+                  .checked=${this.filteredEntities.length > 0 &&
+                    this._filteredSelected === this.filteredEntities.length}
+                  @change=${(e) => (e.target.checked ? this.selectAll() : this.clearSelection())}
                 />
                 <span>Select All</span>
               </div>
 
               ${this.filteredEntities.length === 0
                 ? html`<div class="no-entities">No entities found</div>`
-                : this.groupEntitiesByArea().map(([area, entities]) => html`
-                    <details class="area-group" open>
-                      <summary>
-                        <input
-                          type="checkbox"
-                          ?checked=${entities.every(e => this.selectedEntities.some(se => se.entity_id === e.entity_id))}
-                          @change=${(e) => this.toggleSelectGroup(entities, e.target.checked)}
-                        />
-                        ${area} (${entities.length})
-                      </summary>
+                : html`
+                    <div
+                      class="virtual-scroll"
+                      @scroll=${(e) => this.handleScroll("entities", e)}
+                    >
                       <table class="entity-table">
                         <thead>
                           <tr>
@@ -572,41 +1008,66 @@ class EntityRenamerPanel extends LitElement {
                           </tr>
                         </thead>
                         <tbody>
-                          ${entities.map(entity => html`
-                            <tr class="${this.selectedEntities.some(e => e.entity_id === entity.entity_id) ? 'selected' : ''}">
-                              <td>
-                                <input
-                                  type="checkbox"
-                                  ?checked=${this.selectedEntities.some(e => e.entity_id === entity.entity_id)}
-                                  @change=${() => this.toggleSelectEntity(entity)}
-                                />
-                              </td>
-                              <td>${entity.device_name}</td>
-                              <td>${entity.name}</td>
-                              <td>${entity.entity_id}</td>
-                            </tr>
-                          `)}
+                          ${this.renderRows("entities", this._entityRows, 4, (row) =>
+                            row.entities ? html`
+                              <tr class="area-row">
+                                <td colspan="4">
+                                  <input
+                                    type="checkbox"
+                                    .checked=${this._areaSelected.get(row.area) === row.entities.length}
+                                    @change=${(e) =>
+                                      this.toggleSelectGroup(row.area, row.entities, e.target.checked)}
+                                  />
+                                  <span class="area-toggle" @click=${() => this.toggleArea(row.area)}>
+                                    ${this.collapsedAreas.has(row.area) ? "▸" : "▾"}
+                                    ${row.area} (${row.entities.length})
+                                  </span>
+                                </td>
+                              </tr>
+                            ` : html`
+                              <tr class="${this.selectedEntities.has(row.entity_id) ? 'selected' : ''}">
+                                <td>
+                                  <input
+                                    type="checkbox"
+                                    .checked=${this.selectedEntities.has(row.entity_id)}
+                                    @change=${() => this.toggleSelectEntity(row)}
+                                  />
+                                </td>
+                                <td>${row.device_name}</td>
+                                <td>${row.name}</td>
+                                <td>${row.entity_id}</td>
+                              </tr>
+                            `
+                          )}
                         </tbody>
                       </table>
-                    </details>
-                  `)
+                    </div>
+                  `
               }
             </div>
 
             <div class="actions">
-              <span>${this.selectedEntities.length} entities selected</span>
+              <span>${this.selectedEntities.size} entities selected</span>
               <div class="button-highlight-message">
                 <strong>This is the "Get ID Suggestions" button ↓</strong>
               </div>
+              <label class="local-only">
+                <input
+                  type="checkbox"
+                  ?checked=${this.localOnly}
+                  @change=${(e) => (this.localOnly = e.target.checked)}
+                />
+                Local rules only (no OpenAI)
+              </label>
               <button
                 class="primary get-suggestions-highlight"
-                ?disabled=${this.selectedEntities.length === 0 || this.suggestionsLoading}
+                ?disabled=${this.selectedEntities.size === 0 || this.suggestionsLoading}
                 @click=${this.getSuggestions}
               >
                 ${this.suggestionsLoading
                   ? html`
                       <ha-circular-progress active size="small"></ha-circular-progress>
-                      Getting suggestions...
+                      Getting suggestions... ${this.jobProgress}
                     `
                   : "Get ID Suggestions"}
               </button>
@@ -615,7 +1076,10 @@ class EntityRenamerPanel extends LitElement {
             ${this.suggestions.length > 0 ? html`
               <div class="suggestions-section">
                 <h3>Suggested Entity IDs</h3>
-                <div class="suggestions-table-container">
+                <div
+                  class="suggestions-table-container virtual-scroll"
+                  @scroll=${(e) => this.handleScroll("suggestions", e)}
+                >
                   <table class="suggestions-table">
                     <thead>
                       <tr>
@@ -624,17 +1088,26 @@ class EntityRenamerPanel extends LitElement {
                         <th>Current Name</th>
                         <th>Suggested Entity ID</th>
                         <th>Suggested Friendly Name</th>
+                        <th>Used In</th>
                         <th>Actions</th>
                       </tr>
                     </thead>
                     <tbody>
-                      ${this.suggestions.map(suggestion => html`
+                      ${this.renderRows("suggestions", this.suggestions, 7, suggestion => html`
                         <tr>
                           <td>${suggestion.area_name}</td>
                           <td>${suggestion.device_name}</td>
                           <td>${suggestion.name}</td>
-                          <td>${suggestion.suggested_id}</td>
+                          <td title=${suggestion.suggested_id}>
+                            ${suggestion.suggested_id}
+                            ${suggestion.adjusted
+                              ? html`<span class="adjusted">
+                                  ${ADJUSTED_REASONS[suggestion.adjusted] || "Adjusted"}
+                                </span>`
+                              : ""}
+                          </td>
                           <td>${suggestion.suggested_name}</td>
+                          <td>${this.renderReferences(suggestion.entity_id)}</td>
                           <td>
                             <button
                               class="apply-button"
@@ -654,6 +1127,14 @@ class EntityRenamerPanel extends LitElement {
                   </table>
                 </div>
                 <div class="apply-all">
+                  <label class="local-only">
+                    <input
+                      type="checkbox"
+                      .checked=${this.rewriteReferences}
+                      @change=${(e) => (this.rewriteReferences = e.target.checked)}
+                    />
+                    Also update automations, scripts, scenes and dashboards
+                  </label>
                   <button
                     class="primary"
                     @click=${this.applyAllSuggestions}
@@ -663,16 +1144,16 @@ class EntityRenamerPanel extends LitElement {
                 </div>
               </div>
             ` : ""}
+          `}
           ` : html`
             <div class="entity-table-container">
               <div class="select-all-row">
                 <input
                   type="checkbox"
-                  ?checked=${this.selectedDevices.length === this.deviceList.length && this.deviceList.length > 0}
-                  @change=${() =>
-                    this.selectedDevices.length === this.deviceList.length
-                      ? this.clearDeviceSelection()
-                      : this.selectAllDevices()}
+                  .checked=${this.deviceList.length > 0 &&
+                    this.selectedDevices.size === this.deviceList.length}
+                  @change=${(e) =>
+                    e.target.checked ? this.selectAllDevices() : this.clearDeviceSelection()}
                 />
                 <span>Select All</span>
               </div>
@@ -680,58 +1161,68 @@ class EntityRenamerPanel extends LitElement {
               ${this.deviceList.length === 0
                 ? html`<div class="no-entities">No devices found</div>`
                 : html`
-                    <table class="entity-table device-table">
-                      <thead>
-                        <tr>
-                          <th class="select-col"></th>
-                          <th>Area</th>
-                          <th>Name</th>
-                          <th>Manufacturer</th>
-                          <th>Model</th>
-                        </tr>
-                      </thead>
-                      <tbody>
-                        ${this.deviceList.map(
-                          (device) => html`
-                            <tr class="${this.selectedDevices.some(
-                              (d) => d.id === device.id
-                            )
-                              ? 'selected'
-                              : ''}">
-                              <td>
-                                <input
-                                  type="checkbox"
-                                  ?checked=${this.selectedDevices.some(
-                                    (d) => d.id === device.id
-                                  )}
-                                  @change=${() => this.toggleSelectDevice(device)}
-                                />
-                              </td>
-                              <td>${device.area_name}</td>
-                              <td>${device.name}</td>
-                              <td>${device.manufacturer}</td>
-                              <td>${device.model}</td>
-                            </tr>
-                          `
-                        )}
-                      </tbody>
-                    </table>
+                    <div
+                      class="virtual-scroll"
+                      @scroll=${(e) => this.handleScroll("devices", e)}
+                    >
+                      <table class="entity-table device-table">
+                        <thead>
+                          <tr>
+                            <th class="select-col"></th>
+                            <th>Area</th>
+                            <th>Name</th>
+                            <th>Manufacturer</th>
+                            <th>Model</th>
+                          </tr>
+                        </thead>
+                        <tbody>
+                          ${this.renderRows(
+                            "devices",
+                            this.deviceList,
+                            5,
+                            (device) => html`
+                              <tr class="${this.selectedDevices.has(device.id) ? 'selected' : ''}">
+                                <td>
+                                  <input
+                                    type="checkbox"
+                                    .checked=${this.selectedDevices.has(device.id)}
+                                    @change=${() => this.toggleSelectDevice(device)}
+                                  />
+                                </td>
+                                <td>${device.area_name}</td>
+                                <td>${device.name}</td>
+                                <td>${device.manufacturer}</td>
+                                <td>${device.model}</td>
+                              </tr>
+                            `
+                          )}
+                        </tbody>
+                      </table>
+                    </div>
                   `}
             </div>
 
             <div class="actions">
-              <span>${this.selectedDevices.length} devices selected</span>
+              <span>${this.selectedDevices.size} devices selected</span>
+              <label class="local-only">
+                <input
+                  type="checkbox"
+                  ?checked=${this.localOnly}
+                  @change=${(e) => (this.localOnly = e.target.checked)}
+                />
+                Local rules only (no OpenAI)
+              </label>
               <button
                 class="primary"
                 ?disabled=${
-                  this.selectedDevices.length === 0 || this.deviceSuggestionsLoading
+                  this.selectedDevices.size === 0 || this.deviceSuggestionsLoading
                 }
                 @click=${this.getDeviceSuggestions}
               >
                 ${this.deviceSuggestionsLoading
                   ? html`
                       <ha-circular-progress active size="small"></ha-circular-progress>
-                      Getting suggestions...
+                      Getting suggestions... ${this.jobProgress}
                     `
                   : "Get Name Suggestions"}
               </button>
@@ -741,7 +1232,10 @@ class EntityRenamerPanel extends LitElement {
               ? html`
                   <div class="suggestions-section">
                     <h3>Suggested Device Names</h3>
-                    <div class="suggestions-table-container">
+                    <div
+                      class="suggestions-table-container virtual-scroll"
+                      @scroll=${(e) => this.handleScroll("deviceSuggestions", e)}
+                    >
                       <table class="suggestions-table device-suggestions-table">
                         <thead>
                           <tr>
@@ -752,7 +1246,10 @@ class EntityRenamerPanel extends LitElement {
                           </tr>
                         </thead>
                         <tbody>
-                          ${this.deviceSuggestions.map(
+                          ${this.renderRows(
+                            "deviceSuggestions",
+                            this.deviceSuggestions,
+                            4,
                             (suggestion) => html`
                               <tr>
                                 <td>${suggestion.area_name}</td>
@@ -841,6 +1338,18 @@ class EntityRenamerPanel extends LitElement {
         border: 1px solid #BEE3F8;
       }
 
+      .local-only {
+        display: flex;
+        align-items: center;
+        gap: 4px;
+      }
+
+      .adjusted {
+        margin-left: 8px;
+        font-size: 0.85em;
+        color: var(--secondary-text-color);
+      }
+
       .view-tabs {
         display: flex;
         gap: 8px;
@@ -944,24 +1453,50 @@ class EntityRenamerPanel extends LitElement {
         margin-right: 8px;
       }
 
-      .area-group {
-        margin-bottom: 8px;
+      .virtual-scroll {
+        max-height: 480px;
+        overflow-y: auto;
       }
 
-      .area-group summary {
-        display: flex;
-        align-items: center;
-        cursor: pointer;
-        padding: 8px 16px;
+      .virtual-scroll table {
+        table-layout: fixed;
+      }
+
+      .virtual-scroll th {
+        position: sticky;
+        top: 0;
+        z-index: 1;
+      }
+
+      /* Rows keep ROW_HEIGHT, which the windowing in renderRows relies on */
+      .virtual-scroll tbody tr {
+        height: 40px;
+      }
+
+      .virtual-scroll td {
+        white-space: nowrap;
+        overflow: hidden;
+        text-overflow: ellipsis;
+      }
+
+      .virtual-scroll tr.spacer td {
+        padding: 0;
+        border: none;
+      }
+
+      .area-row td {
         background: var(--secondary-background-color, #f5f5f5);
-        border: 1px solid var(--divider-color, #e0e0e0);
-        border-radius: 4px;
+        font-weight: 500;
       }
 
-      .area-group summary input {
+      .area-row input {
         margin-right: 8px;
       }
 
+      .area-toggle {
+        cursor: pointer;
+      }
+
       .actions {
         display: flex;
         flex-direction: column;
@@ -1035,9 +1570,16 @@ class EntityRenamerPanel extends LitElement {
         margin-bottom: 16px;
       }
 
+      .undo {
+        display: flex;
+        justify-content: flex-end;
+        margin-bottom: 16px;
+      }
+
       .apply-all {
         display: flex;
         justify-content: flex-end;
+        gap: 16px;
         margin-top: 16px;
       }
     `;
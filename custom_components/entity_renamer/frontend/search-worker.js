@@ -0,0 +1,90 @@
+// Search index for the entity table of the AI Entity Renamer panel.
+//
+// Runs in a Web Worker so filtering thousands of entities never blocks the
+// panel. The panel posts the entity list once per change ("index") and then
+// one message per filter change ("search"); each search is answered with
+// the positions of the matching entities in the posted list, ordered by
+// area so the panel can group them without sorting.
+
+const NO_AREA = "No Area";
+
+let index = null;
+
+// Lowercased "entity_id name device area" of every entity, searched for
+// substrings, and a trigram index over them to narrow down the candidates
+function buildIndex(rows) {
+  const texts = rows.map((row) => row.filter(Boolean).join(" ").toLowerCase());
+  const trigrams = new Map();
+  texts.forEach((text, position) => {
+    for (let i = 0; i + 3 <= text.length; i++) {
+      const trigram = text.slice(i, i + 3);
+      const postings = trigrams.get(trigram);
+      if (!postings) {
+        trigrams.set(trigram, [position]);
+      } else if (postings[postings.length - 1] !== position) {
+        postings.push(position);
+      }
+    }
+  });
+  // Entity positions by area name, then list order
+  const order = rows
+    .map((row, position) => position)
+    .sort((a, b) => (rows[a][3] || NO_AREA).localeCompare(rows[b][3] || NO_AREA) || a - b);
+  const rank = new Int32Array(rows.length);
+  order.forEach((position, i) => {
+    rank[position] = i;
+  });
+  return { rows, texts, trigrams, order, rank };
+}
+
+// Positions of the entities that may contain `token`: the shortest posting
+// list of its trigrams, or null when the token is too short to have any
+function candidates(token) {
+  if (token.length < 3) {
+    return null;
+  }
+  let shortest = null;
+  for (let i = 0; i + 3 <= token.length; i++) {
+    const postings = index.trigrams.get(token.slice(i, i + 3)) || [];
+    if (shortest === null || postings.length < shortest.length) {
+      shortest = postings;
+    }
+  }
+  return shortest;
+}
+
+// Positions of the entities containing every word of `term` and in the
+// given area and device, ordered by area
+function search(term, area, device) {
+  const tokens = term.toLowerCase().split(/\s+/).filter(Boolean);
+  let narrowed = null;
+  for (const token of tokens) {
+    const found = candidates(token);
+    if (found !== null && (narrowed === null || found.length < narrowed.length)) {
+      narrowed = found;
+    }
+  }
+
+  const matches = (narrowed || index.order).filter((position) => {
+    const [, , deviceName, areaName] = index.rows[position];
+    if ((area && areaName !== area) || (device && deviceName !== device)) {
+      return false;
+    }
+    const text = index.texts[position];
+    return tokens.every((token) => text.includes(token));
+  });
+  if (narrowed !== null) {
+    matches.sort((a, b) => index.rank[a] - index.rank[b]);
+  }
+  return Int32Array.from(matches);
+}
+
+self.onmessage = (event) => {
+  const message = event.data;
+  if (message.type === "index") {
+    index = buildIndex(message.rows);
+  } else if (message.type === "search" && index) {
+    const matches = search(message.term, message.area, message.device);
+    self.postMessage({ id: message.id, matches }, [matches.buffer]);
+  }
+};
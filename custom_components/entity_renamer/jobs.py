@@ -0,0 +1,218 @@
+"""Background suggestion jobs for the Entity Renamer integration."""
+
+import asyncio
+import logging
+import secrets
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .const import DOMAIN, JOB_BATCH_SIZE, JOB_MAX_FINISHED, JOB_SAVE_DELAY
+
+_LOGGER = logging.getLogger(__name__)
+
+STORAGE_VERSION = 1
+STORAGE_KEY = f"{DOMAIN}.jobs"
+
+JOB_KINDS = ("entities", "devices")
+
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+# Options of a suggestion request that are kept with a job
+JOB_OPTIONS = ("refresh", "local", "local_only")
+
+SuggestFunction = Callable[[str, list[dict], dict], Awaitable[list]]
+
+
+def job_summary(job: dict) -> dict:
+    """Return the status and progress of a job, without its items and results."""
+    return {
+        "id": job["id"],
+        "kind": job["kind"],
+        "status": job["status"],
+        "created": job["created"],
+        "updated": job["updated"],
+        "total": len(job["items"]),
+        "done": job["done"],
+        "error": job["error"],
+    }
+
+
+class JobManager:
+    """Queue of suggestion jobs, run one at a time in the background.
+
+    Each job asks for suggestions for its items in order, in batches of
+    ``JOB_BATCH_SIZE``, using ``suggest(kind, items, options)``. Results are
+    kept per item and saved in ``Store`` after every batch. A job that was
+    queued or running when Home Assistant stopped resumes where it left off
+    the next time ``async_resume`` is called.
+    """
+
+    def __init__(self, hass: HomeAssistant, suggest: SuggestFunction) -> None:
+        """Initialize the job manager."""
+        self.hass = hass
+        self._suggest = suggest
+        self._store: Store[dict[str, Any]] = Store(hass, STORAGE_VERSION, STORAGE_KEY)
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._worker: asyncio.Task | None = None
+        self._ready = False
+
+    async def async_load(self) -> None:
+        """Load the persisted jobs."""
+        data = await self._store.async_load() or {}
+        for job in data.get("jobs", []):
+            if job["status"] == STATUS_RUNNING:
+                job["status"] = STATUS_QUEUED
+            self._jobs[job["id"]] = job
+        _LOGGER.debug("Loaded %s suggestion jobs", len(self._jobs))
+
+    @callback
+    def async_resume(self) -> None:
+        """Start working through the queued jobs."""
+        self._ready = True
+        # A worker that ran without suspending may already be done when its
+        # task is returned, so finished workers are checked for, not cleared
+        if (self._worker is None or self._worker.done()) and any(
+            job["status"] == STATUS_QUEUED for job in self._jobs.values()
+        ):
+            self._worker = self.hass.async_create_background_task(
+                self._async_work(), f"{DOMAIN} suggestion jobs"
+            )
+
+    @callback
+    def async_jobs(self) -> list[dict]:
+        """Return all jobs, oldest first."""
+        return list(self._jobs.values())
+
+    @callback
+    def async_get(self, job_id: str) -> dict | None:
+        """Return a job by ID."""
+        return self._jobs.get(job_id)
+
+    @callback
+    def async_create(self, kind: str, items: list[dict], options: dict) -> dict:
+        """Queue a job that suggests names for ``items``."""
+        now = time.time()
+        job: dict[str, Any] = {
+            "id": secrets.token_hex(8),
+            "kind": kind,
+            "status": STATUS_QUEUED,
+            "created": now,
+            "updated": now,
+            "options": {key: options[key] for key in JOB_OPTIONS if key in options},
+            "items": items,
+            "results": [None] * len(items),
+            "done": 0,
+            "error": None,
+        }
+        self._jobs[job["id"]] = job
+        self._prune()
+        self._save()
+        if self._ready:
+            self.async_resume()
+        return job
+
+    @callback
+    def async_retry(self, job_id: str) -> dict | None:
+        """Queue a failed or cancelled job again; finished items are kept."""
+        if (job := self._jobs.get(job_id)) is None:
+            return None
+        if job["status"] in (STATUS_FAILED, STATUS_CANCELLED):
+            self._set_status(job, STATUS_QUEUED)
+            self._save()
+            if self._ready:
+                self.async_resume()
+        return job
+
+    @callback
+    def async_cancel(self, job_id: str) -> dict | None:
+        """Cancel a job; a batch already sent finishes but is not used."""
+        if (job := self._jobs.get(job_id)) is None:
+            return None
+        if job["status"] in (STATUS_QUEUED, STATUS_RUNNING):
+            self._set_status(job, STATUS_CANCELLED)
+            self._save()
+        return job
+
+    @callback
+    def async_remove(self, job_id: str) -> bool:
+        """Cancel and forget a job."""
+        if self.async_cancel(job_id) is None:
+            return False
+        del self._jobs[job_id]
+        self._save()
+        return True
+
+    async def _async_work(self) -> None:
+        """Run queued jobs until there are none left."""
+        while job := next(
+            (job for job in self._jobs.values() if job["status"] == STATUS_QUEUED), None
+        ):
+            await self._async_run(job)
+
+    async def _async_run(self, job: dict) -> None:
+        """Run one job batch by batch."""
+        self._set_status(job, STATUS_RUNNING)
+        _LOGGER.debug(
+            "Running suggestion job %s from item %s of %s",
+            job["id"],
+            job["done"],
+            len(job["items"]),
+        )
+        while job["status"] == STATUS_RUNNING:
+            start = job["done"]
+            batch = job["items"][start : start + JOB_BATCH_SIZE]
+            if not batch:
+                self._set_status(job, STATUS_COMPLETED)
+                break
+            try:
+                suggestions = await self._suggest(job["kind"], batch, job["options"])
+            except Exception as err:
+                _LOGGER.error("Suggestion job %s failed: %s", job["id"], err)
+                if job["status"] == STATUS_RUNNING:
+                    job["error"] = str(err)
+                    self._set_status(job, STATUS_FAILED)
+                break
+            if job["status"] != STATUS_RUNNING:
+                break
+            job["results"][start : start + len(batch)] = suggestions
+            job["done"] += len(batch)
+            job["updated"] = time.time()
+            self._save()
+        self._save()
+
+    @callback
+    def _set_status(self, job: dict, status: str) -> None:
+        """Update the status of a job."""
+        job["status"] = status
+        job["updated"] = time.time()
+        if status in (STATUS_QUEUED, STATUS_RUNNING):
+            job["error"] = None
+
+    @callback
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond ``JOB_MAX_FINISHED``."""
+        finished = [
+            job["id"]
+            for job in self._jobs.values()
+            if job["status"] in (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+        ]
+        for job_id in finished[: max(len(finished) - JOB_MAX_FINISHED, 0)]:
+            del self._jobs[job_id]
+
+    @callback
+    def _save(self) -> None:
+        """Schedule saving the jobs."""
+        self._store.async_delay_save(self._data_to_save, JOB_SAVE_DELAY)
+
+    @callback
+    def _data_to_save(self) -> dict:
+        """Return the data to persist."""
+        return {"jobs": list(self._jobs.values())}
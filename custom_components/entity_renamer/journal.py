@@ -0,0 +1,161 @@
+"""Append-only journal of the rename batches applied by the Entity Renamer integration."""
+
+import asyncio
+import json
+import logging
+import os
+import secrets
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.util.file import write_utf8_file
+
+from .const import DOMAIN, JOURNAL_MAX_BATCHES
+
+_LOGGER = logging.getLogger(__name__)
+
+JOURNAL_FILE = f"{DOMAIN}.journal"
+
+
+def batch_summary(batch: dict) -> dict:
+    """Return what a batch did, without its renames."""
+    return {
+        "id": batch["id"],
+        "time": batch["time"],
+        "source": batch["source"],
+        "entities": len(batch["entities"]),
+        "devices": len(batch["devices"]),
+        "undoes": batch.get("undoes"),
+        "undone_by": batch.get("undone_by"),
+    }
+
+
+class RenameJournal:
+    """Every rename batch applied, kept so that a batch can be undone.
+
+    Each batch is one JSON line appended to ``.storage/entity_renamer.journal``
+    with its ``id``, ``time``, ``source``, its ``entities`` as
+    ``[entity_id, new_entity_id, name, new_name]`` and its ``devices`` as
+    ``[device_id, name, new_name]``. Undoing a batch is a batch of its own
+    whose ``undoes`` names the batch it reverted. Lines are written in the
+    executor, in order, and the file is never rewritten except to drop the
+    oldest batches once it holds twice ``JOURNAL_MAX_BATCHES``.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the journal."""
+        self.hass = hass
+        self._path = hass.config.path(".storage", JOURNAL_FILE)
+        self._batches: dict[str, dict] = {}
+        self._pending: list[str] = []
+        self._writer: asyncio.Task | None = None
+
+    async def async_load(self) -> None:
+        """Read the batches in the journal file."""
+        lines = await self.hass.async_add_executor_job(self._read)
+        for line in lines:
+            try:
+                self._add(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                # A line cut short by a crash while it was written
+                _LOGGER.warning("Skipping an unreadable rename journal entry")
+        if len(lines) > 2 * JOURNAL_MAX_BATCHES:
+            compacted = "".join(f"{_encode(batch)}\n" for batch in self._batches.values())
+            await self.hass.async_add_executor_job(write_utf8_file, self._path, compacted)
+        _LOGGER.debug("Loaded %s rename batches from the journal", len(self._batches))
+
+    def _read(self) -> list[str]:
+        """Return the lines of the journal file."""
+        try:
+            with open(self._path, encoding="utf-8") as file:
+                return [line for line in file if line.strip()]
+        except FileNotFoundError:
+            return []
+
+    def _add(self, batch: dict) -> None:
+        """Add a batch, linking it to the batch it undoes, and drop the oldest."""
+        self._batches[batch["id"]] = batch
+        undoes = batch.get("undoes")
+        if undoes is not None and (undone := self._batches.get(undoes)) is not None:
+            undone["undone_by"] = batch["id"]
+        while len(self._batches) > JOURNAL_MAX_BATCHES:
+            del self._batches[next(iter(self._batches))]
+
+    @callback
+    def async_record(
+        self,
+        source: str,
+        entities: list[list],
+        devices: list[list],
+        undoes: str | None = None,
+    ) -> str:
+        """Add an applied batch to the journal and return its ID."""
+        batch: dict[str, Any] = {
+            "id": secrets.token_hex(6),
+            "time": time.time(),
+            "source": source,
+            "entities": entities,
+            "devices": devices,
+        }
+        if undoes is not None:
+            batch["undoes"] = undoes
+        self._pending.append(_encode(batch))
+        self._add(batch)
+        if self._writer is None:
+            self._writer = self.hass.async_create_task(self._async_write())
+        return batch["id"]
+
+    async def _async_write(self) -> None:
+        """Append the recorded batches to the journal file."""
+        try:
+            while self._pending:
+                lines, self._pending = self._pending, []
+                await self.hass.async_add_executor_job(self._append, lines)
+        finally:
+            self._writer = None
+
+    def _append(self, lines: list[str]) -> None:
+        """Append lines to the journal file and flush them to disk."""
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path, "a", encoding="utf-8") as file:
+            file.write("".join(f"{line}\n" for line in lines))
+            file.flush()
+            os.fsync(file.fileno())
+
+    @callback
+    def async_batches(self) -> list[dict]:
+        """Return the summaries of the batches, newest first."""
+        return [batch_summary(batch) for batch in reversed(self._batches.values())]
+
+    @callback
+    def async_get(self, batch_id: str | None = None) -> dict | None:
+        """Return a batch, or the newest batch not undone yet if ``batch_id`` is ``None``."""
+        if batch_id is not None:
+            return self._batches.get(batch_id)
+        for batch in reversed(self._batches.values()):
+            if not batch.get("undone_by") and not batch.get("undoes"):
+                return batch
+        return None
+
+
+def _encode(batch: dict) -> str:
+    """Return a batch as a compact JSON line, without the link to its undo."""
+    return json.dumps(
+        {key: value for key, value in batch.items() if key != "undone_by"},
+        separators=(",", ":"),
+    )
+
+
+@callback
+def async_record_renames(
+    hass: HomeAssistant,
+    source: str,
+    entities: list[list],
+    devices: list[list],
+    undoes: str | None = None,
+) -> str | None:
+    """Record an applied batch in the journal, if the integration is set up."""
+    if (journal := hass.data.get(DOMAIN, {}).get("journal")) is None:
+        return None
+    return journal.async_record(source, entities, devices, undoes)
@@ -0,0 +1,106 @@
+"""Compact, token-budgeted prompts for the Entity Renamer integration.
+
+Items are sent to the model as tab-separated rows under a single header row,
+so field labels and per-item boilerplate are not repeated for every item.
+Requests are packed with as many rows as fit in a token budget, measured
+with ``tiktoken`` when it is installed and estimated otherwise.
+"""
+
+import logging
+import re
+from collections.abc import Callable, Iterable
+
+from .const import DEFAULT_MODEL
+
+_LOGGER = logging.getLogger(__name__)
+
+# Words, numbers and single punctuation marks, roughly as a BPE tokenizer splits text
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Tokens taken up by the row id in front of every row
+ROW_ID_TOKENS = 2
+
+_encoding = None
+
+
+def load_tokenizer() -> bool:
+    """Load the ``tiktoken`` encoding of the model, if ``tiktoken`` is installed.
+
+    Loading may read or download the encoding files, so call this from the
+    executor. Returns whether a tokenizer is available.
+    """
+    global _encoding
+    if _encoding is not None:
+        return True
+    try:
+        import tiktoken
+
+        _encoding = tiktoken.encoding_for_model(DEFAULT_MODEL)
+    except ImportError:
+        _LOGGER.debug("tiktoken not installed, estimating prompt tokens")
+        return False
+    except Exception as e:
+        _LOGGER.debug("Could not load the tiktoken encoding, estimating prompt tokens: %s", e)
+        return False
+    return True
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens ``text`` takes up in a prompt.
+
+    Uses the ``tiktoken`` encoding once ``load_tokenizer`` has loaded it.
+    Otherwise every word, number or punctuation mark counts as one token,
+    plus one for every six further characters of a long word.
+    """
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return sum(1 + len(piece) // 6 for piece in _PIECE_RE.findall(text))
+
+
+def _cell(value) -> str:
+    """Return a value as a single-line table cell."""
+    if value is None:
+        return ""
+    return _WHITESPACE_RE.sub(" ", str(value)).strip()
+
+
+def encode_row(values: Iterable) -> str:
+    """Return one tab-separated table row."""
+    return "\t".join(_cell(value) for value in values) + "\n"
+
+
+def build_prompt(instructions: str, rows: Iterable[tuple[str, str]]) -> str:
+    """Return the user prompt for ``(row id, encoded row)`` pairs.
+
+    The row id goes in the first column so replies can be matched by id.
+    """
+    return instructions + "".join(f"{_cell(key)}\t{row}" for key, row in rows)
+
+
+def pack_items(
+    items: list[dict],
+    encode: Callable[[dict], str],
+    budget: int,
+    overhead: int = 0,
+) -> list[tuple[int, list[dict]]]:
+    """Split ``items`` into consecutive chunks of at most ``budget`` prompt tokens.
+
+    ``overhead`` is the token count of the instructions every chunk repeats.
+    Returns ``(offset, chunk)`` pairs so results can be merged back in the
+    original order. An item larger than the budget gets a chunk of its own.
+    """
+    chunks = []
+    start = 0
+    chunk: list[dict] = []
+    used = overhead
+    for position, item in enumerate(items):
+        cost = count_tokens(encode(item)) + ROW_ID_TOKENS
+        if chunk and used + cost > budget:
+            chunks.append((start, chunk))
+            start, chunk, used = position, [], overhead
+        chunk.append(item)
+        used += cost
+    if chunk:
+        chunks.append((start, chunk))
+    return chunks
@@ -0,0 +1,269 @@
+"""Index of the configuration that refers to each entity ID.
+
+Renaming an entity does not update the automations, scripts, scenes and
+dashboards that use its old ID. This index finds them: it reads the YAML
+files in the configuration directory and the dashboards stored in
+``.storage``, and maps every entity ID mentioned to the configuration
+objects that mention it.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+from collections.abc import Iterable, Iterator
+
+import yaml
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+# Events fired after configuration that may refer to entities was changed
+RELOAD_EVENTS = (
+    "automation_reloaded",
+    "script_reloaded",
+    "scene_reloaded",
+    "lovelace_updated",
+    "core_config_updated",
+)
+
+# Directories of the configuration directory that hold no configuration
+SKIPPED_DIRS = {"custom_components", "deps", "tts", "www", "blueprints", "__pycache__"}
+SKIPPED_FILES = {"secrets.yaml"}
+
+# Object kind of the well-known configuration files
+FILE_KINDS = {"automations.yaml": "automation", "scripts.yaml": "script", "scenes.yaml": "scene"}
+
+STORAGE_DIR = ".storage"
+DASHBOARD_PREFIX = "lovelace"
+DEFAULT_DASHBOARD = "Overview"
+
+# Anything shaped like an entity ID, also inside templates such as
+# ``states.sensor.power.state``, where it starts after a dot
+_ENTITY_ID_RE = re.compile(r"(?=\b([a-z][a-z0-9_]*\.[a-z0-9_]+))")
+
+
+class _ConfigLoader(yaml.SafeLoader):
+    """YAML loader that reads tags such as ``!include`` and ``!secret`` as plain values.
+
+    Included files are indexed on their own, so they are not followed.
+    """
+
+
+def _construct_tagged(
+    loader: yaml.SafeLoader,
+    suffix: str,
+    node: yaml.ScalarNode | yaml.SequenceNode | yaml.MappingNode,
+):
+    """Return the value of a tagged node without applying the tag."""
+    if isinstance(node, yaml.SequenceNode):
+        return loader.construct_sequence(node, deep=True)
+    if isinstance(node, yaml.MappingNode):
+        return loader.construct_mapping(node, deep=True)
+    return loader.construct_scalar(node)
+
+
+_ConfigLoader.add_multi_constructor("!", _construct_tagged)
+
+
+def _mentioned_ids(value) -> set[str]:
+    """Return every entity ID mentioned in a parsed configuration value."""
+    found = set()
+    stack = [value]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.keys())
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+        elif isinstance(value, str):
+            found.update(_ENTITY_ID_RE.findall(value))
+    return found
+
+
+def _object_name(item, position: int) -> str:
+    """Return the name of a configuration object in a list."""
+    if isinstance(item, dict):
+        for key in ("alias", "id", "name", "title", "path"):
+            if item.get(key):
+                return str(item[key])
+    return f"#{position + 1}"
+
+
+def _yaml_objects(path: str, relpath: str) -> Iterator[tuple[str, str, object]]:
+    """Yield the kind, name and value of each object in a YAML file."""
+    kind = FILE_KINDS.get(relpath, "yaml")
+    with open(path, encoding="utf-8") as file:
+        data = yaml.load(file, Loader=_ConfigLoader)
+    if isinstance(data, list):
+        for position, item in enumerate(data):
+            yield kind, _object_name(item, position), item
+    elif isinstance(data, dict):
+        for key, item in data.items():
+            yield kind, str(key), item
+
+
+def _dashboard_objects(path: str, filename: str) -> Iterator[tuple[str, str, object]]:
+    """Yield the kind, name and value of each view of a stored dashboard."""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+    _, _, url_path = filename.partition(".")
+    dashboard = url_path or DEFAULT_DASHBOARD
+    config = (data.get("data") or {}).get("config") or {}
+    for position, view in enumerate(config.get("views") or []):
+        yield "dashboard", f"{dashboard} / {_object_name(view, position)}", view
+
+
+def config_files(config_dir: str, storage: bool = True) -> Iterator[tuple[str, str]]:
+    """Yield the path and relative path of every file that may refer to entities.
+
+    These are the YAML files and, unless ``storage`` is false, the stored
+    dashboards.
+    """
+    for root, dirs, files in os.walk(config_dir):
+        dirs[:] = [d for d in dirs if not d.startswith(".") and d not in SKIPPED_DIRS]
+        for filename in files:
+            if filename.endswith(".yaml") and filename not in SKIPPED_FILES:
+                path = os.path.join(root, filename)
+                yield path, os.path.relpath(path, config_dir)
+
+    storage_dir = os.path.join(config_dir, STORAGE_DIR)
+    if storage and os.path.isdir(storage_dir):
+        for filename in os.listdir(storage_dir):
+            if filename == DASHBOARD_PREFIX or filename.startswith(f"{DASHBOARD_PREFIX}."):
+                path = os.path.join(storage_dir, filename)
+                yield path, os.path.join(STORAGE_DIR, filename)
+
+
+def _file_references(path: str, relpath: str) -> dict[str, list[dict]]:
+    """Return the objects of one file by the entity IDs they mention."""
+    if relpath.startswith(STORAGE_DIR + os.sep):
+        objects = _dashboard_objects(path, os.path.basename(relpath))
+    else:
+        objects = _yaml_objects(path, relpath)
+
+    references: dict[str, list[dict]] = {}
+    try:
+        for kind, name, value in objects:
+            reference = {"type": kind, "name": name, "source": relpath}
+            for entity_id in _mentioned_ids(value):
+                references.setdefault(entity_id, []).append(reference)
+    except (OSError, UnicodeDecodeError, ValueError, yaml.YAMLError) as err:
+        _LOGGER.debug("Skipping %s in the reference index: %s", relpath, err)
+    return references
+
+
+def scan_changes(
+    config_dir: str, known: dict[str, tuple[float, int]]
+) -> tuple[dict[str, tuple[float, int]], dict[str, dict[str, list[dict]]]]:
+    """Read the configuration files that changed since ``known`` was taken.
+
+    ``known`` maps the relative path of each indexed file to its modification
+    time and size. Returns the same for the files found now, and the
+    references of every file that is new or changed. Files are parsed one at
+    a time and unchanged files are only looked up, so a rescan after a
+    reload reads just what was edited. Does file I/O, so run it in the
+    executor.
+    """
+    found: dict[str, tuple[float, int]] = {}
+    changed: dict[str, dict[str, list[dict]]] = {}
+    for path, relpath in config_files(config_dir):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        found[relpath] = (stat.st_mtime, stat.st_size)
+        if known.get(relpath) != found[relpath]:
+            changed[relpath] = _file_references(path, relpath)
+    return found, changed
+
+
+class ReferenceIndex:
+    """Entity IDs mapped to the configuration objects that refer to them.
+
+    The index is built on first use, or in the background once Home
+    Assistant has started. Reloading automations, scripts, scenes or the
+    core configuration and saving a dashboard mark it stale; the next lookup
+    then rescans the configuration, parsing only the files that changed.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the index."""
+        self.hass = hass
+        self._files: dict[str, tuple[float, int]] = {}
+        # Entity ID -> relative path -> objects of that file referring to it
+        self._references: dict[str, dict[str, list[dict]]] = {}
+        self._by_file: dict[str, set[str]] = {}
+        self._stale = True
+        self._lock = asyncio.Lock()
+        self._unsubs: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_start(self) -> None:
+        """Subscribe to configuration reload events."""
+        self._unsubs = [
+            self.hass.bus.async_listen(event_type, self._async_reloaded)
+            for event_type in RELOAD_EVENTS
+        ]
+
+    @callback
+    def async_stop(self) -> None:
+        """Unsubscribe from configuration reload events."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    @callback
+    def _async_reloaded(self, event: Event) -> None:
+        """Rescan the configuration on the next lookup."""
+        self._stale = True
+
+    @callback
+    def async_mark_stale(self) -> None:
+        """Rescan the configuration on the next lookup, after it was changed."""
+        self._stale = True
+
+    async def async_refresh(self) -> None:
+        """Bring the index up to date with the configuration files."""
+        async with self._lock:
+            if not self._stale:
+                return
+            # Events arriving during the scan mark the index stale again
+            self._stale = False
+            found, changed = await self.hass.async_add_executor_job(
+                scan_changes, self.hass.config.config_dir, dict(self._files)
+            )
+            for relpath in set(self._files) - set(found):
+                self._remove_file(relpath)
+            for relpath, references in changed.items():
+                self._remove_file(relpath)
+                for entity_id, objects in references.items():
+                    self._references.setdefault(entity_id, {})[relpath] = objects
+                self._by_file[relpath] = set(references)
+            self._files = found
+            if changed:
+                _LOGGER.debug("Reference index updated from %s files", len(changed))
+
+    def _remove_file(self, relpath: str) -> None:
+        """Drop the references of one file."""
+        for entity_id in self._by_file.pop(relpath, ()):
+            sources = self._references.get(entity_id)
+            if sources:
+                sources.pop(relpath, None)
+                if not sources:
+                    del self._references[entity_id]
+
+    async def async_lookup(self, entity_ids: Iterable[str]) -> dict[str, list[dict]]:
+        """Return the configuration objects that refer to each entity ID."""
+        if self._stale:
+            await self.async_refresh()
+        return {
+            entity_id: [
+                reference
+                for relpath in sorted(self._references.get(entity_id, {}))
+                for reference in self._references[entity_id][relpath]
+            ]
+            for entity_id in entity_ids
+        }
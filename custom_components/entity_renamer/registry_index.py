@@ -0,0 +1,424 @@
+"""In-memory join index over the entity, device and area registries."""
+
+import logging
+import secrets
+from collections import deque
+
+import homeassistant.helpers.entity_registry as er
+from homeassistant.core import CALLBACK_TYPE, Event, HomeAssistant, callback
+from homeassistant.helpers.area_registry import EVENT_AREA_REGISTRY_UPDATED
+from homeassistant.helpers.area_registry import async_get as async_get_area_registry
+from homeassistant.helpers.device_registry import EVENT_DEVICE_REGISTRY_UPDATED
+from homeassistant.helpers.device_registry import async_get as async_get_device_registry
+
+_LOGGER = logging.getLogger(__name__)
+
+NO_DEVICE = "No Device"
+NO_AREA = "No Area"
+UNKNOWN_DEVICE = "Unknown Device"
+PLACEHOLDER_NAMES = (NO_DEVICE, NO_AREA, UNKNOWN_DEVICE)
+
+# Number of row changes kept for clients catching up through the change feed
+MAX_CHANGES = 5000
+
+SORT_KEYS = ("entity_id", "name", "device_name", "area_name", "domain", "original_name")
+
+
+def _sort_value(row: dict, sort_key: str | None) -> tuple[str, str]:
+    """Return the sort value of an entity row, tie-broken by entity ID."""
+    if sort_key is None or sort_key == "entity_id":
+        return (row["entity_id"], "")
+    if sort_key == "domain":
+        value = row["entity_id"].split(".")[0]
+    else:
+        value = row[sort_key] or ""
+    return (value.lower(), row["entity_id"])
+
+
+def known_name(name: str | None) -> str | None:
+    """Return a row's device or area name, or ``None`` for a placeholder."""
+    return None if name in PLACEHOLDER_NAMES else name
+
+
+def entity_payload(row: dict) -> dict:
+    """Return the public JSON representation of an entity row."""
+    return {
+        "entity_id": row["entity_id"],
+        "name": row["name"],
+        "device_name": row["device_name"],
+        "area_name": row["area_name"],
+        "original_name": row["original_name"],
+        "device_model": row["device_model"],
+    }
+
+
+def device_payload(row: dict) -> dict:
+    """Return the public JSON representation of a device row."""
+    return {
+        "id": row["id"],
+        "name": row["name"],
+        "manufacturer": row["manufacturer"],
+        "model": row["model"],
+        "area_name": row["area_name"],
+    }
+
+
+def _discard(index: dict[str, set[str]], key: str, entity_id: str) -> None:
+    """Remove an entity from an index bucket, dropping the bucket when empty."""
+    members = index.get(key)
+    if members:
+        members.discard(entity_id)
+        if not members:
+            del index[key]
+
+
+class RegistryIndex:
+    """Entity and device rows joined with their device and area names.
+
+    The index is built lazily on first use and then kept current from the
+    registry update events, so list requests never repeat the joins. Every
+    registry event bumps ``revision``, which clients use for conditional
+    requests through ``etag`` and to catch up through ``async_changes_since``.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the index."""
+        self.hass = hass
+        self.revision = 0
+        # Revisions restart at zero with Home Assistant, so tags carry a
+        # per-instance prefix to keep them from matching after a restart.
+        self._instance = secrets.token_hex(4)
+        self._entities: dict[str, dict] = {}
+        self._devices: dict[str, dict] = {}
+        self._device_entities: dict[str, set[str]] = {}
+        self._by_domain: dict[str, set[str]] = {}
+        self._by_area: dict[str, set[str]] = {}
+        self._by_device: dict[str, set[str]] = {}
+        self._search_text: dict[str, str] = {}
+        self._sorted: dict[str, list[str]] = {}
+        self._changes: deque[dict] = deque()
+        self._changes_start = 0
+        self._built = False
+        self._unsubs: list[CALLBACK_TYPE] = []
+
+    @callback
+    def async_start(self) -> None:
+        """Subscribe to registry update events."""
+        self._unsubs = [
+            self.hass.bus.async_listen(
+                er.EVENT_ENTITY_REGISTRY_UPDATED, self._async_entity_updated
+            ),
+            self.hass.bus.async_listen(EVENT_DEVICE_REGISTRY_UPDATED, self._async_device_updated),
+            self.hass.bus.async_listen(EVENT_AREA_REGISTRY_UPDATED, self._async_area_updated),
+        ]
+
+    @callback
+    def async_stop(self) -> None:
+        """Unsubscribe from registry update events."""
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    @property
+    def token(self) -> str:
+        """Return the opaque token for the current registry revision."""
+        return f"{self._instance}-{self.revision}"
+
+    @property
+    def etag(self) -> str:
+        """Return the entity tag for the current registry revision."""
+        return f'"{self.token}"'
+
+    @callback
+    def async_changes_since(self, token: str) -> list[dict] | None:
+        """Return the row changes made after ``token``, oldest first.
+
+        Returns ``None`` when the changes cannot be replayed, because the
+        token is from another run or older than the retained change log,
+        in which case the client has to reload the full lists.
+        """
+        instance, _, revision = token.strip().strip('"').partition("-")
+        if not self._built or instance != self._instance or not revision.isdigit():
+            return None
+
+        since = int(revision)
+        if since < self._changes_start or since > self.revision:
+            return None
+
+        return [change for change in self._changes if change["revision"] > since]
+
+    @callback
+    def async_entities(self) -> list[dict]:
+        """Return the joined entity rows."""
+        self._async_ensure_built()
+        return list(self._entities.values())
+
+    @callback
+    def async_query(
+        self,
+        *,
+        area: str | None = None,
+        device: str | None = None,
+        domain: str | None = None,
+        search: str | None = None,
+        sort: str | None = None,
+        offset: int = 0,
+        limit: int | None = None,
+    ) -> tuple[int, list[dict]]:
+        """Return the total match count and one page of matching entity rows.
+
+        ``area`` and ``device`` match the joined names, ``search`` is a
+        case-insensitive substring match on entity ID and name, and ``sort``
+        is one of ``SORT_KEYS`` with an optional ``-`` prefix for descending.
+        """
+        self._async_ensure_built()
+
+        descending = sort is not None and sort.startswith("-")
+        sort_key = sort.lstrip("-") if sort else None
+        if sort_key is not None and sort_key not in SORT_KEYS:
+            raise ValueError(f"Unsupported sort key: {sort_key}")
+
+        buckets = [
+            index.get(value, set())
+            for index, value in (
+                (self._by_area, area),
+                (self._by_device, device),
+                (self._by_domain, domain),
+            )
+            if value
+        ]
+
+        if buckets:
+            buckets.sort(key=len)
+            candidates = set(buckets[0]).intersection(*buckets[1:])
+            if search:
+                needle = search.lower()
+                candidates = {
+                    entity_id for entity_id in candidates if needle in self._search_text[entity_id]
+                }
+            rows = self._entities
+            entity_ids = sorted(
+                candidates, key=lambda entity_id: _sort_value(rows[entity_id], sort_key)
+            )
+        else:
+            entity_ids = self._sorted_ids(sort_key)
+            if search:
+                needle = search.lower()
+                entity_ids = [
+                    entity_id for entity_id in entity_ids if needle in self._search_text[entity_id]
+                ]
+
+        if descending:
+            entity_ids = entity_ids[::-1]
+
+        end = None if limit is None else offset + limit
+        return len(entity_ids), [self._entities[entity_id] for entity_id in entity_ids[offset:end]]
+
+    def _sorted_ids(self, sort_key: str | None) -> list[str]:
+        """Return every entity ID in sort order, cached until the next change."""
+        cache_key = sort_key or "entity_id"
+        if cache_key not in self._sorted:
+            rows = self._entities
+            self._sorted[cache_key] = sorted(
+                rows, key=lambda entity_id: _sort_value(rows[entity_id], sort_key)
+            )
+        return self._sorted[cache_key]
+
+    @callback
+    def async_devices(self) -> list[dict]:
+        """Return the joined device rows."""
+        self._async_ensure_built()
+        return list(self._devices.values())
+
+    @callback
+    def _async_ensure_built(self) -> None:
+        """Build the index from the registries if it has not been built yet."""
+        if self._built:
+            return
+
+        device_registry = async_get_device_registry(self.hass)
+        area_registry = async_get_area_registry(self.hass)
+        area_names = {area_id: area.name for area_id, area in area_registry.areas.items()}
+
+        self._devices = {
+            device_id: self._device_row(device, area_names.get(device.area_id))
+            for device_id, device in device_registry.devices.items()
+        }
+        self._entities = {}
+        self._device_entities = {}
+        self._by_domain = {}
+        self._by_area = {}
+        self._by_device = {}
+        self._search_text = {}
+        self._sorted = {}
+        for entity_id, entity in er.async_get(self.hass).entities.items():
+            self._set_entity_row(entity_id, entity)
+
+        self._changes.clear()
+        self._changes_start = self.revision
+        self._built = True
+        _LOGGER.debug(
+            "Built registry index with %s entities and %s devices",
+            len(self._entities),
+            len(self._devices),
+        )
+
+    @staticmethod
+    def _device_row(device, area_name: str | None) -> dict:
+        """Return the list row for a device registry entry."""
+        return {
+            "id": device.id,
+            "name": device.name or device.model or UNKNOWN_DEVICE,
+            "manufacturer": device.manufacturer or "",
+            "model": device.model or "",
+            "area_id": device.area_id,
+            "area_name": area_name or NO_AREA,
+        }
+
+    def _set_entity_row(self, entity_id: str, entity) -> None:
+        """Insert or replace the row for a registry entry."""
+        device_id = entity.device_id
+        device = self._devices.get(device_id) if device_id else None
+
+        # Replace in place so the row keeps its position in the listing
+        old_row = self._entities.get(entity_id)
+        if old_row:
+            self._unindex_row(old_row)
+
+        row = {
+            "entity_id": entity_id,
+            "name": entity.name or entity_id.split(".")[-1],
+            "device_id": device_id if device else None,
+            "device_name": device["name"] if device else NO_DEVICE,
+            "area_id": device["area_id"] if device else None,
+            "area_name": device["area_name"] if device else NO_AREA,
+            "original_name": entity.original_name,
+            "device_model": device["model"] if device else "",
+        }
+        self._entities[entity_id] = row
+        self._index_row(row)
+        if row != old_row:
+            self._record("entity", "update" if old_row else "create", entity_id, row)
+
+    def _remove_entity_row(self, entity_id: str) -> None:
+        """Drop the row for an entity if it exists."""
+        row = self._entities.pop(entity_id, None)
+        if row:
+            self._unindex_row(row)
+            self._record("entity", "remove", entity_id, None)
+
+    def _record(self, kind: str, action: str, row_id: str, row: dict | None) -> None:
+        """Append a row change to the change log once the index is live."""
+        if not self._built:
+            return
+
+        if row is not None:
+            row = entity_payload(row) if kind == "entity" else device_payload(row)
+        self._changes.append(
+            {"revision": self.revision, "type": kind, "action": action, "id": row_id, "row": row}
+        )
+        if len(self._changes) > MAX_CHANGES:
+            self._changes_start = self._changes.popleft()["revision"]
+
+    def _index_row(self, row: dict) -> None:
+        """Add a row to the secondary indexes."""
+        entity_id = row["entity_id"]
+        if row["device_id"]:
+            self._device_entities.setdefault(row["device_id"], set()).add(entity_id)
+        self._by_domain.setdefault(entity_id.split(".")[0], set()).add(entity_id)
+        self._by_area.setdefault(row["area_name"], set()).add(entity_id)
+        self._by_device.setdefault(row["device_name"], set()).add(entity_id)
+        self._search_text[entity_id] = f"{entity_id}\n{row['name']}".lower()
+        self._sorted.clear()
+
+    def _unindex_row(self, row: dict) -> None:
+        """Remove a row from the secondary indexes."""
+        entity_id = row["entity_id"]
+        if row["device_id"]:
+            _discard(self._device_entities, row["device_id"], entity_id)
+        _discard(self._by_domain, entity_id.split(".")[0], entity_id)
+        _discard(self._by_area, row["area_name"], entity_id)
+        _discard(self._by_device, row["device_name"], entity_id)
+        self._search_text.pop(entity_id, None)
+        self._sorted.clear()
+
+    def _refresh_device(self, device_id: str) -> None:
+        """Re-join a device and every entity attached to it."""
+        device = async_get_device_registry(self.hass).async_get(device_id)
+        old_row = self._devices.get(device_id)
+        if device is None:
+            if self._devices.pop(device_id, None):
+                self._record("device", "remove", device_id, None)
+        else:
+            area_name = None
+            if device.area_id:
+                area = async_get_area_registry(self.hass).async_get_area(device.area_id)
+                if area:
+                    area_name = area.name
+            row = self._device_row(device, area_name)
+            self._devices[device_id] = row
+            if row != old_row:
+                self._record("device", "update" if old_row else "create", device_id, row)
+
+        entity_registry = er.async_get(self.hass)
+        for entity_id in list(self._device_entities.get(device_id, ())):
+            entity = entity_registry.async_get(entity_id)
+            if entity is None:
+                self._remove_entity_row(entity_id)
+            else:
+                self._set_entity_row(entity_id, entity)
+
+    @callback
+    def _async_entity_updated(self, event: Event) -> None:
+        """Update the index after an entity registry change."""
+        self.revision += 1
+        if not self._built:
+            return
+
+        entity_id = event.data["entity_id"]
+        if old_entity_id := event.data.get("old_entity_id"):
+            self._remove_entity_row(old_entity_id)
+
+        if event.data["action"] == "remove":
+            self._remove_entity_row(entity_id)
+            return
+
+        entity = er.async_get(self.hass).async_get(entity_id)
+        if entity is None:
+            self._remove_entity_row(entity_id)
+        else:
+            self._set_entity_row(entity_id, entity)
+
+    @callback
+    def _async_device_updated(self, event: Event) -> None:
+        """Update the index after a device registry change."""
+        self.revision += 1
+        if not self._built:
+            return
+
+        device_id = event.data["device_id"]
+        self._refresh_device(device_id)
+
+        if event.data["action"] == "create":
+            # Entities can be registered before their device is, so pick up
+            # any that already point at it.
+            for entity in er.async_entries_for_device(
+                er.async_get(self.hass), device_id, include_disabled_entities=True
+            ):
+                self._set_entity_row(entity.entity_id, entity)
+
+    @callback
+    def _async_area_updated(self, event: Event) -> None:
+        """Update the index after an area registry change."""
+        self.revision += 1
+        if not self._built:
+            return
+
+        area_id = event.data.get("area_id")
+        if area_id is None:
+            return
+
+        device_registry = async_get_device_registry(self.hass)
+        for device_id, device in device_registry.devices.items():
+            if device.area_id == area_id:
+                self._refresh_device(device_id)
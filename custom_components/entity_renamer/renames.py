@@ -0,0 +1,316 @@
+"""Batch entity and device renames for the Entity Renamer integration."""
+
+import logging
+from collections import Counter
+from functools import partial
+
+import homeassistant.helpers.entity_registry as er
+from homeassistant.core import HomeAssistant, callback, split_entity_id, valid_entity_id
+from homeassistant.helpers.device_registry import async_get as async_get_device_registry
+from homeassistant.util import slugify
+
+from .journal import async_record_renames
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class EntityIdChecker:
+    """Make proposed entity IDs valid and unique before they are applied.
+
+    Proposed IDs are checked against a set of the entity IDs in use, taken
+    once from the entity registry and the state machine, and against the IDs
+    already handed out in the same batch. Each check is a set lookup, so a
+    batch is checked in one pass.
+    """
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        """Initialize the checker with the entity IDs currently in use."""
+        self._taken = set(er.async_get(hass).entities)
+        self._taken.update(hass.states.async_entity_ids())
+        self._claims: dict[int, str] = {}
+        self._claimed: set[str] = set()
+
+    @callback
+    def async_check(self, position: int, entity_id: str, proposed) -> tuple[str, str | None]:
+        """Return the ID to use for the rename at ``position`` and why it was adjusted.
+
+        The proposal is slugified and kept in the domain of ``entity_id``. If
+        the result is used by another entity or by an earlier rename in the
+        batch, the first free ``_2``, ``_3``, ... suffix is added. Checking a
+        position again replaces its earlier claim.
+        """
+        if (previous := self._claims.pop(position, None)) is not None:
+            self._claimed.discard(previous)
+
+        domain, object_id = split_entity_id(entity_id)
+        proposed = str(proposed or "")
+        proposed_domain, _, proposed_object_id = proposed.rpartition(".")
+        reason = None
+        if proposed_domain and proposed_domain != domain:
+            reason = "domain"
+        if any(char.isalnum() for char in proposed_object_id):
+            base = slugify(proposed_object_id)
+        else:
+            base = object_id
+        if reason is None and f"{domain}.{base}" != proposed:
+            reason = "invalid"
+
+        new_entity_id = f"{domain}.{base}"
+        suffix = 2
+        while new_entity_id in self._claimed or (
+            new_entity_id != entity_id and new_entity_id in self._taken
+        ):
+            if reason is None:
+                reason = "duplicate" if new_entity_id in self._claimed else "in_use"
+            new_entity_id = f"{domain}.{base}_{suffix}"
+            suffix += 1
+
+        self._claims[position] = new_entity_id
+        self._claimed.add(new_entity_id)
+        return new_entity_id, reason
+
+
+@callback
+def async_check_proposed_ids(hass: HomeAssistant, renames: list[dict]) -> list[dict]:
+    """Check a batch of proposed entity IDs and return the IDs to use instead."""
+    checker = EntityIdChecker(hass)
+    results = []
+    for position, rename in enumerate(renames):
+        new_entity_id, reason = checker.async_check(
+            position, rename["entity_id"], rename.get("new_entity_id")
+        )
+        result = {
+            "entity_id": rename["entity_id"],
+            "requested": rename.get("new_entity_id"),
+            "new_entity_id": new_entity_id,
+        }
+        if reason is not None:
+            result["adjusted"] = reason
+        results.append(result)
+    return results
+
+
+def _entity_result(rename: dict, error: str | None = None) -> dict:
+    """Return the result row of one entity rename."""
+    result = {
+        "entity_id": rename.get("entity_id"),
+        "new_entity_id": rename.get("new_entity_id"),
+        "success": error is None,
+    }
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+def _device_result(rename: dict, error: str | None = None) -> dict:
+    """Return the result row of one device rename."""
+    result = {"device_id": rename.get("device_id"), "success": error is None}
+    if error is not None:
+        result["error"] = error
+    return result
+
+
+@callback
+def async_check_entity_renames(hass: HomeAssistant, renames: list[dict]) -> list[str | None]:
+    """Return the reason each entity rename would fail, or ``None`` if it is valid.
+
+    The batch is checked as a whole: an entity may only be renamed once and
+    two renames may not claim the same new ID.
+    """
+    registry = er.async_get(hass)
+    # Renames missing either ID are rejected below and not counted
+    complete = [
+        rename for rename in renames if rename.get("entity_id") and rename.get("new_entity_id")
+    ]
+    sources = Counter(rename["entity_id"] for rename in complete)
+    targets = Counter(rename["new_entity_id"] for rename in complete)
+
+    errors: list[str | None] = []
+    for rename in renames:
+        entity_id = rename.get("entity_id")
+        new_entity_id = rename.get("new_entity_id")
+        if not entity_id or not new_entity_id:
+            errors.append("Missing entity_id or new_entity_id")
+        elif registry.async_get(entity_id) is None:
+            errors.append(f"Entity {entity_id} not found")
+        elif not valid_entity_id(new_entity_id):
+            errors.append(f"Invalid entity ID {new_entity_id}")
+        elif split_entity_id(new_entity_id)[0] != split_entity_id(entity_id)[0]:
+            errors.append("New entity ID must keep the domain")
+        elif sources[entity_id] > 1:
+            errors.append(f"Entity {entity_id} is renamed more than once")
+        elif targets[new_entity_id] > 1:
+            errors.append(f"Entity ID {new_entity_id} is requested more than once")
+        elif new_entity_id != entity_id and (
+            registry.async_is_registered(new_entity_id)
+            or hass.states.get(new_entity_id) is not None
+        ):
+            errors.append(f"Entity ID {new_entity_id} is already in use")
+        else:
+            errors.append(None)
+    return errors
+
+
+@callback
+def async_check_device_renames(hass: HomeAssistant, renames: list[dict]) -> list[str | None]:
+    """Return the reason each device rename would fail, or ``None`` if it is valid."""
+    registry = async_get_device_registry(hass)
+    errors: list[str | None] = []
+    for rename in renames:
+        device_id = rename.get("device_id")
+        if not device_id or ("name" not in rename and rename.get("new_name") is None):
+            errors.append("Missing device_id or new_name")
+        elif registry.async_get(device_id) is None:
+            errors.append(f"Device {device_id} not found")
+        else:
+            errors.append(None)
+    return errors
+
+
+@callback
+def async_apply_renames(
+    hass: HomeAssistant,
+    entities: list[dict],
+    devices: list[dict] | None = None,
+    *,
+    source: str = "bulk_rename",
+    undoes: str | None = None,
+) -> dict:
+    """Apply a batch of entity and device renames as one transaction.
+
+    Every rename is checked before anything is changed; if any of them is
+    invalid, nothing is applied. The renames are then applied in a single
+    pass without yielding to the event loop, so the registries schedule one
+    save for the whole batch. If a rename still fails, the renames already
+    applied are reverted. An applied batch is recorded in the rename journal
+    under ``source``.
+
+    An entity or device rename with a ``name`` sets the name to exactly
+    that, where ``None`` clears it, instead of ``new_name``.
+
+    Returns ``success``, the journal ``batch_id`` and one result per entity
+    and device, in request order.
+    """
+    devices = devices or []
+    entity_errors = async_check_entity_renames(hass, entities)
+    device_errors = async_check_device_renames(hass, devices)
+
+    if any(entity_errors) or any(device_errors):
+        return {
+            "success": False,
+            "entities": [
+                _entity_result(rename, error or "Not applied, another rename is invalid")
+                for rename, error in zip(entities, entity_errors)
+            ],
+            "devices": [
+                _device_result(rename, error or "Not applied, another rename is invalid")
+                for rename, error in zip(devices, device_errors)
+            ],
+        }
+
+    entity_registry = er.async_get(hass)
+    device_registry = async_get_device_registry(hass)
+    # Undo steps for the renames applied so far, and the journal records
+    applied: list = []
+    entity_records: list[list] = []
+    device_records: list[list] = []
+    failure: tuple[str, int, str] | None = None
+
+    for position, rename in enumerate(entities):
+        entry = entity_registry.async_get(rename["entity_id"])
+        undo = partial(
+            entity_registry.async_update_entity,
+            rename["new_entity_id"],
+            new_entity_id=entry.entity_id,
+            name=entry.name,
+        )
+        update_kwargs = {"new_entity_id": rename["new_entity_id"]}
+        if "name" in rename:
+            update_kwargs["name"] = rename["name"]
+        elif rename.get("new_name"):
+            update_kwargs["name"] = rename["new_name"]
+        try:
+            entity_registry.async_update_entity(rename["entity_id"], **update_kwargs)
+        except ValueError as err:
+            failure = ("entities", position, str(err))
+            break
+        applied.append(undo)
+        entity_records.append(
+            [
+                entry.entity_id,
+                rename["new_entity_id"],
+                entry.name,
+                update_kwargs.get("name", entry.name),
+            ]
+        )
+
+    if failure is None:
+        for position, rename in enumerate(devices):
+            device = device_registry.async_get(rename["device_id"])
+            undo = partial(device_registry.async_update_device, device.id, name=device.name)
+            new_name = rename["name"] if "name" in rename else rename["new_name"]
+            try:
+                device_registry.async_update_device(rename["device_id"], name=new_name)
+            except ValueError as err:
+                failure = ("devices", position, str(err))
+                break
+            applied.append(undo)
+            device_records.append([device.id, device.name, new_name])
+
+    if failure is None:
+        _LOGGER.info("Renamed %s entities and %s devices", len(entities), len(devices))
+        batch_id = async_record_renames(hass, source, entity_records, device_records, undoes)
+        return {
+            "success": True,
+            "batch_id": batch_id,
+            "entities": [_entity_result(rename) for rename in entities],
+            "devices": [_device_result(rename) for rename in devices],
+        }
+
+    kind, failed_position, error = failure
+    _LOGGER.error("Batch rename failed, reverting %s applied renames: %s", len(applied), error)
+    for undo in reversed(applied):
+        try:
+            undo()
+        except ValueError as err:
+            _LOGGER.error("Could not revert rename: %s", err)
+
+    order = ("entities", "devices")
+
+    def _error(row_kind: str, position: int) -> str:
+        if (row_kind, position) == (kind, failed_position):
+            return error
+        if (order.index(row_kind), position) < (order.index(kind), failed_position):
+            return "Rolled back, another rename failed"
+        return "Not applied, another rename failed"
+
+    return {
+        "success": False,
+        "entities": [
+            _entity_result(rename, _error("entities", position))
+            for position, rename in enumerate(entities)
+        ],
+        "devices": [
+            _device_result(rename, _error("devices", position))
+            for position, rename in enumerate(devices)
+        ],
+    }
+
+
+@callback
+def async_undo_batch(hass: HomeAssistant, batch: dict) -> dict:
+    """Revert a batch recorded in the rename journal, as one batch rename.
+
+    Entities get their old ID and name back and devices their old name, in
+    reverse order. Like any batch, the undo is applied in one registry pass
+    and nothing is changed if one of the renames cannot be reverted, for
+    example because the old ID was taken since.
+    """
+    entities = [
+        {"entity_id": new_entity_id, "new_entity_id": entity_id, "name": name}
+        for entity_id, new_entity_id, name, _ in reversed(batch["entities"])
+    ]
+    devices = [
+        {"device_id": device_id, "name": name} for device_id, name, _ in reversed(batch["devices"])
+    ]
+    return async_apply_renames(hass, entities, devices, source="undo", undoes=batch["id"])
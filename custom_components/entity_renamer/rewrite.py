@@ -0,0 +1,247 @@
+"""Rewriting of the configuration that refers to renamed entities.
+
+After a batch of renames, every old ID in the configuration YAML files and
+the stored dashboards is replaced by the new one in a single pass over each
+file. All old IDs are found at once by an Aho-Corasick automaton, so the
+work grows with the size of the configuration, not with the number of
+renames. Files are written atomically, and the originals are kept in a
+backup directory first.
+"""
+
+import json
+import logging
+import os
+import shutil
+from collections import deque
+from datetime import datetime
+
+from homeassistant.components.lovelace.const import ConfigNotFound
+from homeassistant.core import HomeAssistant
+from homeassistant.util.file import write_utf8_file
+
+from .const import DOMAIN
+from .references import config_files
+
+_LOGGER = logging.getLogger(__name__)
+
+# Backups go to a hidden directory, which the reference index skips
+BACKUP_DIR = ".entity_renamer_backups"
+MAX_BACKUPS = 10
+
+# Services reloading the configuration read from YAML files
+RELOAD_DOMAINS = ("automation", "script", "scene")
+
+# Characters that continue an entity ID, so a match next to one is part of
+# a longer ID
+_ID_CHARS = frozenset("abcdefghijklmnopqrstuvwxyz0123456789_")
+
+
+class EntityIdMatcher:
+    """Replacer of many entity IDs at once.
+
+    The old IDs form an Aho-Corasick automaton: a trie whose nodes carry
+    failure links to the longest proper suffix that is also in the trie, and
+    output links to the nearest such suffix that is a complete ID. Text is
+    read once, character by character, whatever the number of IDs. Only
+    whole IDs are replaced, and each position is replaced at most once, so a
+    batch that renames ``a`` to ``b`` and ``b`` to ``c`` does not turn ``a``
+    into ``c``.
+    """
+
+    def __init__(self, mapping: dict[str, str]) -> None:
+        """Build the automaton for the old IDs of ``mapping``, old ID to new ID."""
+        self._mapping = mapping
+        self._goto: list[dict[str, int]] = [{}]
+        self._pattern: list[str | None] = [None]
+        for old_id in mapping:
+            node = 0
+            for char in old_id:
+                if (child := self._goto[node].get(char)) is None:
+                    child = len(self._goto)
+                    self._goto[node][char] = child
+                    self._goto.append({})
+                    self._pattern.append(None)
+                node = child
+            self._pattern[node] = old_id
+
+        self._fail = [0] * len(self._goto)
+        self._output = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[child] = fail
+                self._output[child] = fail if self._pattern[fail] else self._output[fail]
+                queue.append(child)
+
+    def replace(self, text: str) -> tuple[str, int]:
+        """Return ``text`` with the old IDs replaced, and the number of replacements."""
+        matches = []
+        node = 0
+        for end, char in enumerate(text, 1):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            found = node if self._pattern[node] else self._output[node]
+            while found:
+                # Output links only lead to nodes that end an old ID
+                old_id = self._pattern[found]
+                assert old_id is not None
+                start = end - len(old_id)
+                if (start == 0 or text[start - 1] not in _ID_CHARS) and (
+                    end == len(text) or text[end] not in _ID_CHARS
+                ):
+                    matches.append((start, end, old_id))
+                found = self._output[found]
+
+        # Leftmost, then longest, match wins where matches overlap
+        matches.sort(key=lambda match: (match[0], -match[1]))
+        parts = []
+        position = count = 0
+        for start, end, old_id in matches:
+            if start < position:
+                continue
+            parts.append(text[position:start])
+            parts.append(self._mapping[old_id])
+            position = end
+            count += 1
+        parts.append(text[position:])
+        return "".join(parts), count
+
+
+def _backup(config_dir: str, backup: str, relpath: str) -> None:
+    """Copy a configuration file into the backup directory."""
+    target = os.path.join(config_dir, backup, relpath)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copy2(os.path.join(config_dir, relpath), target)
+
+
+def _prune_backups(config_dir: str) -> None:
+    """Remove all but the newest MAX_BACKUPS backups."""
+    root = os.path.join(config_dir, BACKUP_DIR)
+    for name in sorted(os.listdir(root))[:-MAX_BACKUPS]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def rewrite_files(config_dir: str, matcher: EntityIdMatcher, backup: str) -> tuple[list[str], int]:
+    """Rewrite the old IDs in the configuration YAML files.
+
+    Each file is read and rewritten in one pass. A file that changes is
+    copied to ``backup``, relative to the configuration directory, and then
+    replaced atomically. Returns the relative paths of the rewritten files
+    and the number of replacements. Does file I/O, so run it in the executor.
+    """
+    rewritten = []
+    total = 0
+    for path, relpath in config_files(config_dir, storage=False):
+        try:
+            with open(path, encoding="utf-8") as file:
+                text = file.read()
+        except (OSError, UnicodeDecodeError) as err:
+            _LOGGER.warning("Not rewriting references in %s: %s", relpath, err)
+            continue
+        text, count = matcher.replace(text)
+        if not count:
+            continue
+        _backup(config_dir, backup, relpath)
+        write_utf8_file(path, text)
+        rewritten.append(relpath)
+        total += count
+    return rewritten, total
+
+
+def _write_backup(config_dir: str, backup: str, relpath: str, data: dict) -> None:
+    """Write a dashboard configuration into the backup directory."""
+    target = os.path.join(config_dir, backup, relpath)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    write_utf8_file(target, json.dumps(data, indent=2))
+
+
+def _storage_dashboards(hass: HomeAssistant) -> dict:
+    """Return the dashboards of Lovelace by URL path."""
+    lovelace = hass.data.get("lovelace")
+    dashboards = getattr(lovelace, "dashboards", None)
+    if dashboards is None and isinstance(lovelace, dict):
+        dashboards = lovelace.get("dashboards")
+    return dashboards or {}
+
+
+async def _async_rewrite_dashboards(
+    hass: HomeAssistant, matcher: EntityIdMatcher, backup: str
+) -> tuple[list[str], int]:
+    """Rewrite the old IDs in the dashboards stored in ``.storage``.
+
+    Dashboards are saved through Lovelace rather than by writing their files,
+    because Lovelace keeps them in memory and would overwrite the files.
+    """
+    rewritten = []
+    total = 0
+    for url_path, dashboard in _storage_dashboards(hass).items():
+        if getattr(dashboard, "mode", None) != "storage":
+            continue
+        try:
+            config = await dashboard.async_load(False)
+        except ConfigNotFound:
+            # Dashboards never saved from the UI have no configuration yet
+            continue
+        text, count = matcher.replace(json.dumps(config))
+        if not count:
+            continue
+        name = url_path or "lovelace"
+        await hass.async_add_executor_job(
+            _write_backup,
+            hass.config.config_dir,
+            backup,
+            os.path.join("dashboards", f"{name}.json"),
+            config,
+        )
+        await dashboard.async_save(json.loads(text))
+        rewritten.append(name)
+        total += count
+    return rewritten, total
+
+
+async def async_rewrite_references(hass: HomeAssistant, mapping: dict[str, str]) -> dict:
+    """Replace the old entity IDs of ``mapping`` in the configuration.
+
+    Rewrites the configuration YAML files and the stored dashboards, then
+    reloads automations, scripts and scenes if any file changed. Other YAML
+    configuration takes effect after its own reload or a restart. Returns
+    the rewritten ``files`` and ``dashboards``, the number of
+    ``replacements`` and the ``backup`` directory.
+    """
+    mapping = {old: new for old, new in mapping.items() if old != new}
+    result = {"files": [], "dashboards": [], "replacements": 0, "backup": None}
+    if not mapping:
+        return result
+
+    matcher = EntityIdMatcher(mapping)
+    backup = os.path.join(BACKUP_DIR, datetime.now().strftime("%Y%m%d-%H%M%S-%f"))
+    files, file_count = await hass.async_add_executor_job(
+        rewrite_files, hass.config.config_dir, matcher, backup
+    )
+    dashboards, dashboard_count = await _async_rewrite_dashboards(hass, matcher, backup)
+
+    result.update(files=files, dashboards=dashboards, replacements=file_count + dashboard_count)
+    if files or dashboards:
+        result["backup"] = backup
+        await hass.async_add_executor_job(_prune_backups, hass.config.config_dir)
+        _LOGGER.info(
+            "Rewrote %s references to %s renamed entities in %s files and %s dashboards, "
+            "backup in %s",
+            result["replacements"],
+            len(mapping),
+            len(files),
+            len(dashboards),
+            backup,
+        )
+    if files:
+        for domain in RELOAD_DOMAINS:
+            if hass.services.has_service(domain, "reload"):
+                await hass.services.async_call(domain, "reload", blocking=True)
+        hass.data[DOMAIN]["references"].async_mark_stale()
+    return result
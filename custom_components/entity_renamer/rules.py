@@ -0,0 +1,251 @@
+"""Local rule-based suggestions for the Entity Renamer integration.
+
+Entities and devices whose area, domain and name already say what they are
+are named here, following the same convention the model is asked to use,
+without a round trip to OpenAI. Anything the rules cannot name with
+confidence is left to the model.
+"""
+
+import re
+
+from .registry_index import known_name
+
+# Short location codes for common area names, keyed by the slugified area name
+AREA_ABBREVIATIONS = {
+    "living_room": "living",
+    "family_room": "family",
+    "dining_room": "dining",
+    "master_bedroom": "master",
+    "main_bedroom": "master",
+    "primary_bedroom": "master",
+    "guest_bedroom": "guest",
+    "guest_room": "guest",
+    "kids_room": "kids",
+    "childrens_room": "kids",
+    "bathroom": "bath",
+    "master_bathroom": "master_bath",
+    "main_bathroom": "main_bath",
+    "guest_bathroom": "guest_bath",
+    "laundry_room": "laundry",
+    "utility_room": "utility",
+    "home_office": "office",
+    "hallway": "hall",
+    "entrance": "entry",
+    "entryway": "entry",
+    "front_yard": "front_yard",
+    "back_yard": "backyard",
+    "staircase": "stairs",
+    "playroom": "play",
+}
+
+# Device type used in the entity ID of each domain that names a single kind of device
+DOMAIN_DEVICE_TYPES = {
+    "alarm_control_panel": "alarm",
+    "camera": "camera",
+    "climate": "thermostat",
+    "cover": "cover",
+    "fan": "fan",
+    "humidifier": "humidifier",
+    "lawn_mower": "mower",
+    "light": "light",
+    "lock": "lock",
+    "media_player": "media",
+    "remote": "remote",
+    "siren": "siren",
+    "switch": "switch",
+    "vacuum": "vacuum",
+    "valve": "valve",
+    "water_heater": "water_heater",
+}
+
+# Domains that need a measurement in the name to say what they are
+MEASUREMENT_DOMAINS = {"sensor", "binary_sensor"}
+
+# Device type of sensors by a word in their name
+MEASUREMENT_TYPES = {
+    "battery": "battery",
+    "co2": "co2",
+    "contact": "contact",
+    "current": "current",
+    "door": "door",
+    "energy": "energy",
+    "humidity": "humidity",
+    "illuminance": "lux",
+    "leak": "leak",
+    "linkquality": "signal",
+    "lux": "lux",
+    "moisture": "moisture",
+    "motion": "motion",
+    "noise": "noise",
+    "occupancy": "occupancy",
+    "pm25": "pm25",
+    "power": "power",
+    "presence": "presence",
+    "pressure": "pressure",
+    "rssi": "signal",
+    "signal": "signal",
+    "smoke": "smoke",
+    "tamper": "tamper",
+    "temp": "temp",
+    "temperature": "temp",
+    "vibration": "vibration",
+    "voc": "voc",
+    "voltage": "voltage",
+    "window": "window",
+}
+
+# Words that say nothing about what an entity does
+NOISE_WORDS = {
+    "aqara",
+    "ecobee",
+    "govee",
+    "hue",
+    "ikea",
+    "kasa",
+    "lifx",
+    "meross",
+    "nest",
+    "philips",
+    "ring",
+    "sensor",
+    "shelly",
+    "sonoff",
+    "sonos",
+    "the",
+    "tplink",
+    "tradfri",
+    "tuya",
+    "wiz",
+    "wyze",
+    "xiaomi",
+    "yeelight",
+    "zigbee",
+    "zwave",
+}
+
+# Device type shown in device names, by a word in the device name or model
+DEVICE_TYPES = {
+    "blind": "Blinds",
+    "blinds": "Blinds",
+    "bridge": "Bridge",
+    "bulb": "Light",
+    "button": "Button",
+    "camera": "Camera",
+    "curtain": "Curtain",
+    "dimmer": "Dimmer",
+    "doorbell": "Doorbell",
+    "fan": "Fan",
+    "hub": "Hub",
+    "lamp": "Lamp",
+    "leak": "Leak Sensor",
+    "light": "Light",
+    "lock": "Lock",
+    "motion": "Motion Sensor",
+    "outlet": "Outlet",
+    "plug": "Plug",
+    "remote": "Remote",
+    "router": "Router",
+    "shade": "Shade",
+    "siren": "Siren",
+    "smoke": "Smoke Detector",
+    "speaker": "Speaker",
+    "switch": "Switch",
+    "television": "TV",
+    "thermostat": "Thermostat",
+    "tv": "TV",
+    "vacuum": "Vacuum",
+}
+
+# Descriptive words allowed in an entity ID before the entity is left to the model
+MAX_DESCRIPTORS = 2
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _words(text) -> list[str]:
+    """Split text into lowercase words."""
+    return _WORD_RE.findall(str(text or "").lower())
+
+
+def location_code(area_name) -> str | None:
+    """Return the short location code for an area name."""
+    if not (words := _words(known_name(area_name))):
+        return None
+    slug = "_".join(words)
+    return AREA_ABBREVIATIONS.get(slug, slug)
+
+
+def local_entity_suggestion(entity: dict, *, strict: bool = True) -> str | None:
+    """Suggest an entity ID from the entity's area, domain and name.
+
+    Builds ``<domain>.<location_code>_<device_type>_<function>_<identifier>``
+    from the rule tables. In ``strict`` mode ``None`` is returned when the
+    entity has no area, its type cannot be told from the domain or name, or
+    its name has more descriptive words than fit the convention. Otherwise a
+    best-effort ID is always returned.
+    """
+    entity_id = entity.get("entity_id") or ""
+    domain, _, object_id = entity_id.partition(".")
+    if not domain or not object_id:
+        return None
+
+    area_name = known_name(entity.get("area_name"))
+    location = location_code(area_name)
+    # Unnamed entities are listed under their object ID, which says less
+    # than the name their integration gave them
+    name = entity.get("name")
+    if not name or name == object_id:
+        name = entity.get("original_name") or name
+    name_words = _words(name)
+    if strict and (location is None or not name_words):
+        return None
+
+    device_type = None
+    if domain in MEASUREMENT_DOMAINS:
+        device_type = next(
+            (MEASUREMENT_TYPES[word] for word in name_words if word in MEASUREMENT_TYPES), None
+        )
+    else:
+        device_type = DOMAIN_DEVICE_TYPES.get(domain)
+    if device_type is None:
+        if strict:
+            return None
+        device_type = domain
+
+    ignored = set(_words(area_name)) | NOISE_WORDS | set(domain.split("_"))
+    ignored.update(device_type.split("_"))
+    if domain in MEASUREMENT_DOMAINS:
+        ignored.update(word for word in name_words if word in MEASUREMENT_TYPES)
+    descriptors = [word for word in name_words if word not in ignored and not word.isdigit()]
+    identifiers = [word for word in name_words if word.isdigit()]
+    if len(descriptors) > MAX_DESCRIPTORS:
+        if strict:
+            return None
+        descriptors = descriptors[:MAX_DESCRIPTORS]
+
+    parts = [location, device_type, *descriptors, *identifiers[-1:]]
+    return f"{domain}.{'_'.join(part for part in parts if part)}"
+
+
+def local_device_suggestion(device: dict, *, strict: bool = True) -> str | None:
+    """Suggest a device name as ``[Location] [Device Type]``.
+
+    In ``strict`` mode ``None`` is returned unless the device has an area and
+    its name or model points to exactly one device type. Otherwise a
+    best-effort name is always returned.
+    """
+    area_name = (known_name(device.get("area_name")) or "").strip()
+    types = []
+    for word in (*_words(known_name(device.get("name"))), *_words(device.get("model"))):
+        if (device_type := DEVICE_TYPES.get(word)) and device_type not in types:
+            types.append(device_type)
+
+    if strict and (not area_name or len(types) != 1):
+        return None
+
+    device_type = (
+        types[0] if types else (device.get("model") or known_name(device.get("name")) or "Device")
+    )
+    if area_name and not device_type.lower().startswith(area_name.lower()):
+        return f"{area_name} {device_type}"
+    return device_type
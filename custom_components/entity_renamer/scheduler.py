@@ -0,0 +1,245 @@
+"""Rate-limit-aware scheduling of OpenAI requests for the Entity Renamer integration."""
+
+import asyncio
+import logging
+import random
+import re
+import time
+from collections.abc import Awaitable, Callable, Mapping
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import (
+    DEFAULT_REQUESTS_PER_MINUTE,
+    DEFAULT_TOKENS_PER_MINUTE,
+    DOMAIN,
+    RATE_LIMIT_BACKOFF,
+    RATE_LIMIT_MAX_BACKOFF,
+    RATE_LIMIT_RETRIES,
+)
+
+_LOGGER = logging.getLogger(__name__)
+
+# Parts of a reset duration such as ``6m0s`` or ``20ms``
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimitExceeded(Exception):
+    """Error raised when a request is still rate limited after all retries."""
+
+
+def _parse_int(value) -> int | None:
+    """Return a header value as an integer, if it is one."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_duration(value) -> float | None:
+    """Return a reset duration such as ``1m30s`` in seconds."""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+def _retry_after(headers: Mapping[str, str]) -> float | None:
+    """Return the delay in seconds a rate-limited response asks for."""
+    try:
+        if (value := headers.get("retry-after-ms")) is not None:
+            return float(value) / 1000
+        if (value := headers.get("retry-after")) is not None:
+            return float(value)
+    except ValueError:
+        pass
+    return None
+
+
+def _backoff(attempt: int) -> float:
+    """Return the jittered exponential backoff in seconds before retry ``attempt``."""
+    delay = min(RATE_LIMIT_MAX_BACKOFF, RATE_LIMIT_BACKOFF * 2**attempt)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class _TokenBucket:
+    """Capacity left under one per-minute limit, refilled continuously."""
+
+    def __init__(self, per_minute: int | None) -> None:
+        """Initialize a full bucket; ``None`` means no limit until one is reported."""
+        self.capacity = float("inf") if per_minute is None else float(per_minute)
+        self.level = self.capacity
+        self._updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        """Add the capacity that has come back since the last refill."""
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.capacity / 60)
+        self._updated = now
+
+    def wait_time(self, cost: float) -> float:
+        """Return the seconds until ``cost`` fits in the bucket."""
+        cost = min(cost, self.capacity)
+        if self.level >= cost:
+            return 0.0
+        return (cost - self.level) * 60 / self.capacity
+
+    def take(self, cost: float) -> None:
+        """Use ``cost`` of the capacity."""
+        self.level -= min(cost, self.capacity)
+
+    def update(self, limit: int | None, remaining: int | None, now: float) -> None:
+        """Follow the limit and remaining capacity reported by the server."""
+        self.refill(now)
+        if limit:
+            self.capacity = float(limit)
+            self.level = min(self.level, self.capacity)
+        if remaining is not None:
+            self.level = min(self.level, float(remaining))
+
+
+class RequestScheduler:
+    """Shared pacing of every request sent to the OpenAI API.
+
+    Requests wait, in order, until there is room under both the requests per
+    minute and the tokens per minute limit. Each limit is a token bucket
+    that starts at a conservative default and follows the ``x-ratelimit``
+    headers of the responses passed to ``async_observe``. A rate-limited
+    request pauses all requests for the time the server asks for, or for a
+    jittered exponential backoff, and is retried. Server errors, timeouts and
+    connection errors are retried after the same backoff. Concurrent
+    requests with the same key are sent once and share the result.
+    """
+
+    def __init__(
+        self,
+        *,
+        requests_per_minute: int | None = DEFAULT_REQUESTS_PER_MINUTE,
+        tokens_per_minute: int | None = DEFAULT_TOKENS_PER_MINUTE,
+        retries: int = RATE_LIMIT_RETRIES,
+    ) -> None:
+        """Initialize the scheduler."""
+        self._requests = _TokenBucket(requests_per_minute)
+        self._tokens = _TokenBucket(tokens_per_minute)
+        self._retries = retries
+        self._paused_until = 0.0
+        self._admission = asyncio.Lock()
+        self._shared: dict[str, asyncio.Task] = {}
+
+    async def async_run(
+        self, call: Callable[[], Awaitable[Any]], *, cost: int = 0, key: str | None = None
+    ) -> Any:
+        """Return the result of ``call()`` once the limits allow it.
+
+        ``cost`` is the number of tokens the request is expected to use.
+        Raises ``RateLimitExceeded`` if the request is still rate limited
+        after all retries.
+        """
+        if key is None:
+            return await self._async_run(call, cost)
+        if (task := self._shared.get(key)) is None:
+            task = asyncio.get_running_loop().create_task(self._async_run(call, cost))
+            self._shared[key] = task
+            shared_key = key
+            task.add_done_callback(lambda _: self._shared.pop(shared_key, None))
+        else:
+            _LOGGER.debug("Sharing an identical request already in flight")
+        return await asyncio.shield(task)
+
+    async def _async_run(self, call: Callable[[], Awaitable[Any]], cost: int) -> Any:
+        """Run ``call`` within the limits, retrying rate-limited and failed requests."""
+        import openai
+
+        attempt = 0
+        while True:
+            await self._async_acquire(cost)
+            try:
+                return await call()
+            except openai.RateLimitError as err:
+                if getattr(err, "code", None) == "insufficient_quota":
+                    raise RateLimitExceeded("OpenAI quota exceeded") from err
+                if attempt == self._retries:
+                    raise RateLimitExceeded("OpenAI rate limit reached, try again later") from err
+                headers = err.response.headers
+                self.async_observe(headers)
+                if (delay := _retry_after(headers)) is not None:
+                    delay *= random.uniform(1.0, 1.2)
+                else:
+                    delay = _backoff(attempt)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                _LOGGER.warning(
+                    "Rate limited by OpenAI (attempt %s), pausing requests for %.1f s",
+                    attempt + 1,
+                    delay,
+                )
+            except (openai.InternalServerError, openai.APIConnectionError) as err:
+                # Server errors, timeouts and dropped connections only hold
+                # back the failed request
+                if attempt == self._retries:
+                    raise
+                delay = _backoff(attempt)
+                _LOGGER.warning(
+                    "Request to OpenAI failed (attempt %s): %s, retrying in %.1f s",
+                    attempt + 1,
+                    err,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _async_acquire(self, cost: int) -> None:
+        """Wait until a request of ``cost`` tokens fits under the limits."""
+        async with self._admission:
+            while True:
+                now = time.monotonic()
+                self._requests.refill(now)
+                self._tokens.refill(now)
+                wait = max(
+                    self._paused_until - now,
+                    self._requests.wait_time(1),
+                    self._tokens.wait_time(cost),
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            self._requests.take(1)
+            self._tokens.take(cost)
+
+    @callback
+    def async_observe(self, headers: Mapping[str, str]) -> None:
+        """Update the limits from the ``x-ratelimit`` headers of a response."""
+        now = time.monotonic()
+        for bucket, kind in ((self._requests, "requests"), (self._tokens, "tokens")):
+            limit = _parse_int(headers.get(f"x-ratelimit-limit-{kind}"))
+            remaining = _parse_int(headers.get(f"x-ratelimit-remaining-{kind}"))
+            if limit is None and remaining is None:
+                continue
+            bucket.update(limit, remaining, now)
+            reset = _parse_duration(headers.get(f"x-ratelimit-reset-{kind}"))
+            if remaining == 0 and reset:
+                # Nothing fits until the window resets
+                self._paused_until = max(self._paused_until, now + reset)
+
+    async def async_observe_response(self, response) -> None:
+        """Read the limits of an ``httpx`` response, for use as a response hook."""
+        self.async_observe(response.headers)
+
+
+@callback
+def async_get_scheduler(hass: HomeAssistant, base_url: str | None = None) -> RequestScheduler:
+    """Return the scheduler shared by all requests to the backend at ``base_url``.
+
+    ``None`` is the OpenAI API, which starts at the default limits; other
+    backends are not limited until they report limits.
+    """
+    schedulers = hass.data.setdefault(DOMAIN, {}).setdefault("schedulers", {})
+    if (scheduler := schedulers.get(base_url)) is None:
+        if base_url is None:
+            scheduler = RequestScheduler()
+        else:
+            scheduler = RequestScheduler(requests_per_minute=None, tokens_per_minute=None)
+        schedulers[base_url] = scheduler
+    return scheduler
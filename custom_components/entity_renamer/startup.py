@@ -0,0 +1,38 @@
+"""Startup timing and pre-warming for the Entity Renamer integration."""
+
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from .client import import_sdk
+from .prompt import load_tokenizer
+
+
+class StartupTimer:
+    """Durations of the integration's startup steps, in milliseconds."""
+
+    def __init__(self) -> None:
+        """Initialize the timer."""
+        self.steps: dict[str, float] = {}
+
+    @contextmanager
+    def measure(self, step: str) -> Iterator[None]:
+        """Time the steps run inside the ``with`` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps[step] = round((time.perf_counter() - start) * 1000, 2)
+
+    def summary(self) -> str:
+        """Return the steps and their durations as one line."""
+        return ", ".join(f"{step} {duration:.1f} ms" for step, duration in self.steps.items())
+
+
+def prewarm() -> None:
+    """Import the model SDK and load the tokenizer so the first request does not.
+
+    Does blocking imports and file I/O, so run it in the executor.
+    """
+    import_sdk()
+    load_tokenizer()
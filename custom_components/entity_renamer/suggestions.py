@@ -0,0 +1,729 @@
+"""Suggestion pipeline for the Entity Renamer integration."""
+
+import asyncio
+import json
+import logging
+import re
+from collections.abc import Awaitable, Callable
+from functools import partial
+from typing import Any
+
+from .cache import SuggestionCache, fingerprint
+from .clusters import cluster_entities, cluster_template_item, expand_template
+from .const import CHUNK_RETRIES, COMPLETION_TOKENS_PER_ROW, DEFAULT_MODEL
+from .prompt import build_prompt, count_tokens, encode_row, pack_items
+from .scheduler import RequestScheduler
+
+_LOGGER = logging.getLogger(__name__)
+
+# Bump whenever the prompts change so cached suggestions are not reused
+PROMPT_VERSION = 3
+
+# Every row starts with an ``id`` the model echoes back with its suggestion
+ENTITY_COLUMNS = ("id", "entity_id", "name", "device", "area")
+DEVICE_COLUMNS = ("id", "name", "manufacturer", "model", "area")
+ENTITY_TEMPLATE_COLUMNS = ("id", "domain", "model", "pattern", "count", "entity_id", "name", "area")
+
+RESPONSE_INSTRUCTIONS = (
+    'Return only a JSON object {"suggestions": [{"id": "<row id>", "suggestion": "<%s>"}]} '
+    "with one entry for every row.\n\n"
+)
+
+# Structured output schema of a reply, used by models that support it
+RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "suggestions",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "suggestions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "id": {"type": "string"},
+                            "suggestion": {"type": "string"},
+                        },
+                        "required": ["id", "suggestion"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["suggestions"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+# Backend base URLs and models that rejected ``RESPONSE_FORMAT``; they get the
+# same schema in the instructions only
+_UNSTRUCTURED_MODELS: set[tuple[str, str]] = set()
+
+ENTITY_SYSTEM_PROMPT = (
+    "You are a Home Assistant entity naming expert. Create technical entity IDs "
+    "following HA's strict naming conventions for use in automations and integrations. "
+    "Focus on machine-readability and systematic organization."
+)
+
+ENTITY_CONVENTION = (
+    "- Format: `<domain>.<location_code>_<device_type>_<function>_<identifier>`\n"
+    "- Use ONLY lowercase letters, numbers, and underscores\n"
+    "- Do NOT start or end with underscores\n"
+    "- Examples: 'light.kitchen_ceiling_main', 'sensor.bedroom_temp_primary'\n"
+    "- Keep location codes short (living_room → living, master_bedroom → master)\n"
+    "- Prioritize clarity and consistency over brevity\n"
+)
+
+ENTITY_INSTRUCTIONS = (
+    "Suggest Home Assistant entity IDs following the official naming convention:\n"
+    + ENTITY_CONVENTION
+    + "Goal: systematic entity IDs for automations. The domain is the part of "
+    "entity_id before the dot and must not change.\n"
+    "Entities follow as tab-separated rows under a header row.\n"
+    + RESPONSE_INSTRUCTIONS % "entity_id"
+    + encode_row(ENTITY_COLUMNS)
+)
+
+ENTITY_TEMPLATE_INSTRUCTIONS = (
+    "Suggest Home Assistant entity ID templates following the official naming convention:\n"
+    + ENTITY_CONVENTION
+    + "Each row is a group of similar entities of one device model; count is the "
+    "number of entities and the other columns describe one of them. Suggest one "
+    "template per group that is filled in for every entity of the group. Use "
+    "`{location}` for the location code and `{device}` for the device name, "
+    "e.g. 'sensor.{location}_{device}_power'. Keep the domain.\n"
+    "Groups follow as tab-separated rows under a header row.\n"
+    + RESPONSE_INSTRUCTIONS % "entity ID template"
+    + encode_row(ENTITY_TEMPLATE_COLUMNS)
+)
+
+DEVICE_SYSTEM_PROMPT = (
+    "You are a Home Assistant device naming expert. Create user-friendly device names "
+    "that are clear, location-based, and suitable for UI display. Focus on human "
+    "readability over technical structure."
+)
+
+DEVICE_INSTRUCTIONS = (
+    "Suggest human-readable device names for Home Assistant following these rules:\n"
+    "- Use proper capitalization and spaces\n"
+    "- Format: '[Location] [Device Type]' or '[Descriptive Name]'\n"
+    "- Be concise but clear for UI display\n"
+    "- Consider the device's physical location and purpose\n"
+    "- Examples: 'Kitchen Light', 'Living Room Thermostat', 'Main Bedroom Motion Sensor'\n"
+    "Goal: user-friendly names for dashboard display.\n"
+    "Devices follow as tab-separated rows under a header row.\n"
+    + RESPONSE_INSTRUCTIONS % "device name"
+    + encode_row(DEVICE_COLUMNS)
+)
+
+
+class SuggestionError(Exception):
+    """Error raised when the model does not return usable suggestions."""
+
+
+def describe_entity(entity: dict) -> str:
+    """Return the prompt row describing an entity."""
+    return encode_row(
+        (
+            entity["entity_id"],
+            entity.get("name"),
+            entity.get("device_name"),
+            entity.get("area_name"),
+        )
+    )
+
+
+def describe_device(device: dict) -> str:
+    """Return the prompt row describing a device."""
+    return encode_row(
+        (
+            device.get("name"),
+            device.get("manufacturer"),
+            device.get("model"),
+            device.get("area_name"),
+        )
+    )
+
+
+def describe_entity_template(template: dict) -> str:
+    """Return the prompt row describing a group of look-alike entities."""
+    example = template["example"]
+    return encode_row(
+        (
+            template["domain"],
+            template["model"],
+            template["pattern"],
+            template["count"],
+            example["entity_id"],
+            example.get("name"),
+            example.get("area_name"),
+        )
+    )
+
+
+def entity_fingerprint(entity: dict, model: str = DEFAULT_MODEL) -> str:
+    """Return the cache key for the context an entity suggestion depends on."""
+    return fingerprint(
+        "entity",
+        PROMPT_VERSION,
+        model,
+        entity["entity_id"],
+        entity.get("name"),
+        entity.get("device_name"),
+        entity.get("area_name"),
+        entity["entity_id"].split(".")[0],
+    )
+
+
+def entity_template_fingerprint(template: dict, model: str = DEFAULT_MODEL) -> str:
+    """Return the cache key of the template for a group of look-alike entities."""
+    return fingerprint(
+        "entity_template",
+        PROMPT_VERSION,
+        model,
+        template["domain"],
+        template["model"],
+        template["pattern"],
+    )
+
+
+def device_fingerprint(device: dict, model: str = DEFAULT_MODEL) -> str:
+    """Return the cache key for the context a device suggestion depends on."""
+    return fingerprint(
+        "device",
+        PROMPT_VERSION,
+        model,
+        device.get("id"),
+        device.get("name"),
+        device.get("manufacturer"),
+        device.get("model"),
+        device.get("area_name"),
+    )
+
+
+def _valid_suggestion(suggestion) -> bool:
+    """Return whether a suggestion can be shown to the user."""
+    return isinstance(suggestion, str) and bool(suggestion.strip())
+
+
+def _keyed_suggestion(item) -> tuple[str, Any] | None:
+    """Return the row id and suggestion of one reply entry, if it has both."""
+    if isinstance(item, dict) and "id" in item and "suggestion" in item:
+        return str(item["id"]), item["suggestion"]
+    return None
+
+
+def parse_suggestions(content: str, keys: list[str]) -> dict[str, str]:
+    """Return the valid suggestions of a model reply by row id.
+
+    The reply is expected to be ``{"suggestions": [{"id", "suggestion"}]}``.
+    Entries for unknown ids and empty suggestions are dropped, so the caller
+    can ask again for just the rows that are missing. A bare JSON array with
+    one suggestion per row is also accepted and matched by position.
+    """
+    try:
+        reply = json.loads(content)
+    except json.JSONDecodeError:
+        # Models without structured output may wrap the JSON in prose
+        json_match = re.search(r"[\[{].*[\]}]", content, re.DOTALL)
+        try:
+            reply = json.loads(json_match.group(0)) if json_match else None
+        except json.JSONDecodeError:
+            reply = None
+    if reply is None:
+        raise SuggestionError("Failed to parse OpenAI response")
+
+    if isinstance(reply, dict):
+        reply = reply.get("suggestions", [])
+    if not isinstance(reply, list):
+        raise SuggestionError("Unexpected OpenAI response")
+
+    suggestions = {}
+    # A reply of bare suggestions is matched to the rows by position
+    positional = len(reply) == len(keys) and not any(_keyed_suggestion(item) for item in reply)
+    keyed_pairs = filter(None, map(_keyed_suggestion, reply))
+    for key, suggestion in zip(keys, reply) if positional else keyed_pairs:
+        if key in keys and _valid_suggestion(suggestion):
+            suggestions[key] = suggestion
+    return suggestions
+
+
+def entity_suggestion_row(entity: dict, suggested_id: str) -> dict:
+    """Combine an entity with its suggested ID and the name derived from it."""
+    parts = suggested_id.split(".", 1)
+    if len(parts) > 1:
+        name_part = parts[1]
+    else:
+        name_part = parts[0]
+    suggested_name = " ".join(word.capitalize() for word in name_part.split("_"))
+    return {**entity, "suggested_id": suggested_id, "suggested_name": suggested_name}
+
+
+def device_suggestion_row(device: dict, suggestion) -> dict:
+    """Combine a device with its suggested name, cleaned up for display."""
+    if isinstance(suggestion, dict):
+        suggestion = (
+            suggestion.get("name")
+            or suggestion.get("suggested_name")
+            or next(iter(suggestion.values()), "")
+        )
+
+    # Ensure device name follows proper conventions
+    if not suggestion or not isinstance(suggestion, str):
+        name = "Unnamed Device"
+    else:
+        # Ensure proper capitalization
+        name = suggestion.strip()
+        if name.islower():
+            name = " ".join(word.capitalize() for word in name.split())
+
+    return {**device, "suggested_name": name}
+
+
+class _ArrayScanner:
+    """Decode the items of a JSON array incrementally as its text arrives."""
+
+    def __init__(self) -> None:
+        """Initialize the scanner."""
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos: int | None = None
+        self._count = 0
+        self._done = False
+
+    def feed(self, text: str) -> list[tuple[int, Any]]:
+        """Add reply text and return the ``(index, item)`` pairs it completed."""
+        self._buffer += text
+        items: list[tuple[int, Any]] = []
+        if self._done:
+            return items
+        if self._pos is None:
+            start = self._buffer.find("[")
+            if start == -1:
+                return items
+            self._pos = start + 1
+
+        buffer = self._buffer
+        pos = self._pos
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos >= len(buffer):
+                break
+            if buffer[pos] == "]":
+                self._done = True
+                break
+            try:
+                item, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Item not complete yet
+                break
+            if end == len(buffer) and not isinstance(item, (str, list, dict)):
+                # A number or literal may continue in the next delta
+                break
+            pos = end
+            items.append((self._count, item))
+            self._count += 1
+        self._pos = pos
+        return items
+
+
+async def _async_create(client, scheduler: RequestScheduler | None = None, cost: int = 0, **kwargs):
+    """Create a chat completion, in structured output mode where the model supports it.
+
+    With a ``scheduler`` the request waits for room under the rate limits,
+    and identical requests in flight at the same time share one reply.
+    """
+    import openai
+
+    async def _create(**extra):
+        create = partial(client.chat.completions.create, **kwargs, **extra)
+        if scheduler is None:
+            return await create()
+        key = None if kwargs.get("stream") else fingerprint("chat", kwargs, extra)
+        return await scheduler.async_run(create, cost=cost, key=key)
+
+    model = kwargs["model"]
+    # A local server may reject what the OpenAI API accepts for the same model
+    backend_model = (str(client.base_url), model)
+    if backend_model in _UNSTRUCTURED_MODELS:
+        return await _create()
+    try:
+        return await _create(response_format=RESPONSE_FORMAT)
+    except openai.BadRequestError as err:
+        if "response_format" not in str(err):
+            raise
+        _LOGGER.debug("Model %s does not support structured output: %s", model, err)
+        _UNSTRUCTURED_MODELS.add(backend_model)
+    return await _create()
+
+
+async def _async_complete(
+    client,
+    system_prompt: str,
+    prompt: str,
+    on_item: Callable[[int, Any], Awaitable[None]] | None = None,
+    *,
+    scheduler: RequestScheduler | None = None,
+    cost: int = 0,
+    model: str = DEFAULT_MODEL,
+) -> str:
+    """Send one chat completion request and return the reply text.
+
+    With ``on_item`` the reply is streamed, and the callback is awaited with
+    each entry of the suggestions array as soon as it can be decoded.
+    ``cost`` is the number of tokens the request is expected to use.
+    """
+    messages = [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": prompt},
+    ]
+    create = partial(
+        _async_create,
+        client,
+        scheduler,
+        cost,
+        model=model,
+        messages=messages,
+        temperature=0.7,
+    )
+    if on_item is None:
+        response = await create()
+        return response.choices[0].message.content
+
+    stream = await create(stream=True)
+    scanner = _ArrayScanner()
+    content = []
+    async for chunk in stream:
+        if not chunk.choices or not (delta := chunk.choices[0].delta.content):
+            continue
+        content.append(delta)
+        for index, item in scanner.feed(delta):
+            await on_item(index, item)
+    return "".join(content)
+
+
+async def async_suggest(
+    client,
+    system_prompt: str,
+    instructions: str,
+    items: list[dict],
+    describe: Callable[[dict], str],
+    *,
+    chunk_tokens: int,
+    max_concurrency: int,
+    cache: SuggestionCache | None = None,
+    cache_key: Callable[[dict], str] | None = None,
+    refresh: bool = False,
+    local: Callable[[dict], Any] | None = None,
+    on_item: Callable[[int, Any], Awaitable[None]] | None = None,
+    scheduler: RequestScheduler | None = None,
+    model: str = DEFAULT_MODEL,
+) -> list:
+    """Return one raw suggestion per item, in the order of ``items``.
+
+    When ``local`` is given, it is called with every item first; the items
+    it returns a suggestion for are not sent to the model. ``client`` is not
+    used when ``local`` answers every item.
+
+    When a ``cache`` is given, items whose ``cache_key`` is cached are
+    answered from it (unless ``refresh`` is set) and only the remaining
+    items are sent to the model; new suggestions are added to the cache.
+
+    Items are split into token-budgeted chunks that are sent to the model
+    concurrently, at most ``max_concurrency`` at a time. A chunk whose
+    request or reply fails is retried on its own; the other chunks keep
+    their results.
+
+    When ``on_item`` is given, replies are streamed and the callback is
+    awaited with the position and suggestion of each item as soon as it is
+    known. An item of a retried chunk can be reported more than once; the
+    last report wins.
+
+    With a ``scheduler`` every request waits for room under the shared rate
+    limits and is retried when rate limited. ``model`` is the model of the
+    backend ``client`` talks to.
+    """
+    results: list = [None] * len(items)
+    keys: dict[int, str] = {}
+    pending = list(range(len(items)))
+
+    if local is not None:
+        pending = []
+        for position, item in enumerate(items):
+            if (suggestion := local(item)) is not None:
+                results[position] = suggestion
+            else:
+                pending.append(position)
+        _LOGGER.debug(
+            "Answered %s of %s suggestions with local rules",
+            len(items) - len(pending),
+            len(items),
+        )
+
+    if pending and cache is not None and cache_key is not None:
+        await cache.async_load()
+        keys = {position: cache_key(items[position]) for position in pending}
+        if not refresh:
+            uncached = []
+            for position in pending:
+                if (cached := cache.async_get(keys[position])) is not None:
+                    results[position] = cached
+                else:
+                    uncached.append(position)
+            _LOGGER.debug(
+                "Answered %s of %s remaining suggestions from the cache",
+                len(pending) - len(uncached),
+                len(pending),
+            )
+            pending = uncached
+
+    if on_item is not None:
+        for position, suggestion in enumerate(results):
+            if suggestion is not None:
+                await on_item(position, suggestion)
+
+    if pending:
+        on_result: Callable[[int, Any], None] | None = None
+        if cache is not None and keys:
+            suggestion_cache = cache
+
+            def _store(index: int, suggestion) -> None:
+                # Cache as chunks complete, so a retry after a failed request
+                # only has to ask for the chunks that failed
+                suggestion_cache.async_set(keys[pending[index]], suggestion)
+
+            on_result = _store
+
+        if on_item is not None:
+            # Bound to a local so the callback sees the narrowed type
+            emit = on_item
+
+        async def _emit(index: int, suggestion) -> None:
+            await emit(pending[index], suggestion)
+
+        suggestions = await _async_request(
+            client,
+            system_prompt,
+            instructions,
+            [items[position] for position in pending],
+            describe,
+            chunk_tokens=chunk_tokens,
+            max_concurrency=max_concurrency,
+            on_result=on_result,
+            on_item=_emit if on_item is not None else None,
+            scheduler=scheduler,
+            model=model,
+        )
+        for position, suggestion in zip(pending, suggestions):
+            results[position] = suggestion
+
+    return results
+
+
+async def async_suggest_entities(
+    client,
+    entities: list[dict],
+    *,
+    chunk_tokens: int,
+    max_concurrency: int,
+    cache: SuggestionCache | None = None,
+    refresh: bool = False,
+    local: Callable[[dict], Any] | None = None,
+    on_item: Callable[[int, Any], Awaitable[None]] | None = None,
+    scheduler: RequestScheduler | None = None,
+    model: str = DEFAULT_MODEL,
+) -> list:
+    """Return one raw entity ID suggestion per entity, in the order of ``entities``.
+
+    Entities the ``local`` rules do not name are grouped by domain, device
+    model and name pattern. Each group of look-alike entities is sent to the
+    model as a single row asking for an entity ID template, which is
+    expanded for every entity of the group; templates are cached per group.
+    The other entities, and those a template cannot be expanded for, are
+    sent one row each through ``async_suggest``.
+    """
+    results: list = [None] * len(entities)
+    pending = list(range(len(entities)))
+    if local is not None:
+        pending = []
+        for position, entity in enumerate(entities):
+            if (suggestion := local(entity)) is not None:
+                results[position] = suggestion
+                if on_item is not None:
+                    await on_item(position, suggestion)
+            else:
+                pending.append(position)
+
+    groups, singles = cluster_entities([entities[position] for position in pending])
+    groups = [[pending[index] for index in group] for group in groups]
+    singles = [pending[index] for index in singles]
+
+    if groups:
+        _LOGGER.debug(
+            "Naming %s entities from %s templates",
+            sum(len(group) for group in groups),
+            len(groups),
+        )
+        templates = await async_suggest(
+            client,
+            ENTITY_SYSTEM_PROMPT,
+            ENTITY_TEMPLATE_INSTRUCTIONS,
+            [cluster_template_item([entities[p] for p in group]) for group in groups],
+            describe_entity_template,
+            chunk_tokens=chunk_tokens,
+            max_concurrency=max_concurrency,
+            cache=cache,
+            cache_key=partial(entity_template_fingerprint, model=model),
+            refresh=refresh,
+            scheduler=scheduler,
+            model=model,
+        )
+        for group, template in zip(groups, templates):
+            for position in group:
+                if (suggestion := expand_template(template, entities[position])) is None:
+                    singles.append(position)
+                    continue
+                results[position] = suggestion
+                if on_item is not None:
+                    await on_item(position, suggestion)
+        singles.sort()
+
+    if singles:
+        if on_item is not None:
+            # Bound to a local so the callback sees the narrowed type
+            emit = on_item
+
+        async def _emit(index: int, suggestion) -> None:
+            await emit(singles[index], suggestion)
+
+        suggestions = await async_suggest(
+            client,
+            ENTITY_SYSTEM_PROMPT,
+            ENTITY_INSTRUCTIONS,
+            [entities[position] for position in singles],
+            describe_entity,
+            chunk_tokens=chunk_tokens,
+            max_concurrency=max_concurrency,
+            cache=cache,
+            cache_key=partial(entity_fingerprint, model=model),
+            refresh=refresh,
+            on_item=_emit if on_item is not None else None,
+            scheduler=scheduler,
+            model=model,
+        )
+        for position, suggestion in zip(singles, suggestions):
+            results[position] = suggestion
+
+    return results
+
+
+async def _async_request(
+    client,
+    system_prompt: str,
+    instructions: str,
+    items: list[dict],
+    describe: Callable[[dict], str],
+    *,
+    chunk_tokens: int,
+    max_concurrency: int,
+    on_result: Callable[[int, Any], None] | None = None,
+    on_item: Callable[[int, Any], Awaitable[None]] | None = None,
+    scheduler: RequestScheduler | None = None,
+    model: str = DEFAULT_MODEL,
+) -> list:
+    """Request suggestions for ``items`` from the model in concurrent chunks.
+
+    ``on_result`` is called with the position and suggestion of every item
+    as soon as its chunk has been answered and validated. ``on_item`` turns
+    on streaming and ``scheduler`` rate limiting, see ``async_suggest``.
+    """
+    import openai
+
+    retryable = (
+        SuggestionError,
+        openai.APIConnectionError,
+        openai.APITimeoutError,
+        openai.RateLimitError,
+        openai.InternalServerError,
+    )
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results: list = [None] * len(items)
+    if on_item is not None:
+        # Bound to a local so the callbacks see the narrowed type
+        emit = on_item
+
+    async def _async_run_chunk(offset: int, chunk: list[dict]) -> None:
+        # Positions of the items still without a valid suggestion, by the row
+        # id they are sent with. Each attempt only asks for these.
+        missing = {str(index + 1): offset + index for index in range(len(chunk))}
+
+        for attempt in range(CHUNK_RETRIES + 1):
+            keys = list(missing)
+            prompt = build_prompt(
+                instructions, ((key, describe(items[missing[key]])) for key in keys)
+            )
+            cost = system_tokens + count_tokens(prompt) + COMPLETION_TOKENS_PER_ROW * len(keys)
+
+            async def _async_on_chunk_item(index: int, item, keys=keys) -> None:
+                if keyed := _keyed_suggestion(item):
+                    key, suggestion = keyed
+                elif index < len(keys):
+                    key, suggestion = keys[index], item
+                else:
+                    return
+                if key in missing and _valid_suggestion(suggestion):
+                    await emit(missing[key], suggestion)
+
+            try:
+                async with semaphore:
+                    content = await _async_complete(
+                        client,
+                        system_prompt,
+                        prompt,
+                        _async_on_chunk_item if on_item is not None else None,
+                        scheduler=scheduler,
+                        cost=cost,
+                        model=model,
+                    )
+                suggestions = parse_suggestions(content, keys)
+            except retryable as err:
+                if attempt == CHUNK_RETRIES:
+                    raise
+                _LOGGER.warning(
+                    "Suggestion chunk at %s failed (attempt %s), retrying: %s",
+                    offset,
+                    attempt + 1,
+                    err,
+                )
+                continue
+
+            for key, suggestion in suggestions.items():
+                position = missing.pop(key)
+                results[position] = suggestion
+                if on_result is not None:
+                    on_result(position, suggestion)
+            if not missing:
+                return
+            if attempt == CHUNK_RETRIES:
+                raise SuggestionError(f"No valid suggestion for {len(missing)} items")
+            _LOGGER.warning(
+                "Suggestion chunk at %s is missing %s of %s items (attempt %s), asking again",
+                offset,
+                len(missing),
+                len(keys),
+                attempt + 1,
+            )
+
+    system_tokens = count_tokens(system_prompt)
+    chunks = pack_items(items, describe, chunk_tokens, system_tokens + count_tokens(instructions))
+    _LOGGER.debug("Requesting suggestions for %s items in %s chunks", len(items), len(chunks))
+    outcomes = await asyncio.gather(
+        *(_async_run_chunk(offset, chunk) for offset, chunk in chunks), return_exceptions=True
+    )
+    for outcome in outcomes:
+        if isinstance(outcome, BaseException):
+            raise outcome
+    return results
@@ -38,20 +38,31 @@ async def hass():
         await hass.async_stop()
 
 
+def _registry_entry(name, **attributes):
+    """Return a mocked registry entry named ``name``.
+
+    The ``name`` keyword of MagicMock names the mock itself, so the entry's
+    name is set as an attribute after construction.
+    """
+    entry = MagicMock(**attributes)
+    entry.name = name
+    return entry
+
+
 @pytest.fixture
 def mock_entity_registry():
     """Return a mocked entity registry."""
     registry = MagicMock()
     registry.entities = {
-        "light.living_room": MagicMock(
+        "light.living_room": _registry_entry(
+            "Living Room Light",
             entity_id="light.living_room",
-            name="Living Room Light",
             device_id="device_1",
             original_name="Hue Light 1",
         ),
-        "switch.kitchen": MagicMock(
+        "switch.kitchen": _registry_entry(
+            "Kitchen Switch",
             entity_id="switch.kitchen",
-            name="Kitchen Switch",
             device_id="device_2",
             original_name="Z-Wave Switch",
         ),
@@ -64,11 +75,11 @@ def mock_device_registry():
     """Return a mocked device registry."""
     registry = MagicMock()
     registry.devices = {
-        "device_1": MagicMock(
-            id="device_1", name="Philips Hue", model="Hue Bulb", area_id="area_1"
+        "device_1": _registry_entry(
+            "Philips Hue", id="device_1", model="Hue Bulb", area_id="area_1"
         ),
-        "device_2": MagicMock(
-            id="device_2", name="Z-Wave Switch", model="Z-Wave Switch", area_id="area_2"
+        "device_2": _registry_entry(
+            "Z-Wave Switch", id="device_2", model="Z-Wave Switch", area_id="area_2"
         ),
     }
 
@@ -84,8 +95,8 @@ def mock_area_registry():
     """Return a mocked area registry."""
     registry = MagicMock()
     registry.areas = {
-        "area_1": MagicMock(id="area_1", name="Living Room"),
-        "area_2": MagicMock(id="area_2", name="Kitchen"),
+        "area_1": _registry_entry("Living Room", id="area_1"),
+        "area_2": _registry_entry("Kitchen", id="area_2"),
     }
 
     def get_area(area_id):
@@ -0,0 +1,85 @@
+"""Tests for the benchmark suite's synthetic data, fake backend and comparison."""
+
+import json
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+from fake_backend import reply_suggestions  # noqa: E402
+from run_benchmarks import find_regressions  # noqa: E402
+from synthetic import synthetic_registry  # noqa: E402
+
+from custom_components.entity_renamer.prompt import build_prompt  # noqa: E402
+from custom_components.entity_renamer.suggestions import (  # noqa: E402
+    DEVICE_INSTRUCTIONS,
+    ENTITY_INSTRUCTIONS,
+    describe_device,
+    describe_entity,
+    parse_suggestions,
+)
+
+
+def test_synthetic_registry_is_deterministic():
+    """Test a registry has exactly the requested entities and is the same every time."""
+    registry = synthetic_registry(1000)
+
+    assert len(registry["entities"]) == 1000
+    assert registry == synthetic_registry(1000)
+    assert registry != synthetic_registry(1000, seed=1)
+    assert all(
+        entity["device"] is None or entity["device"] < len(registry["devices"])
+        for entity in registry["entities"]
+    )
+
+
+def test_fake_backend_answers_every_row():
+    """Test the fake backend's reply suggests something for every prompt row."""
+    entities = [
+        {"entity_id": "sensor.plug_power", "name": "Plug Power", "area_name": "Kitchen"},
+        {"entity_id": "light.hue_bulb_1", "name": None, "device_name": "Hue Bulb 1"},
+    ]
+    prompt = build_prompt(
+        ENTITY_INSTRUCTIONS, [(str(i), describe_entity(e)) for i, e in enumerate(entities)]
+    )
+    reply = json.dumps({"suggestions": reply_suggestions(prompt)})
+
+    assert parse_suggestions(reply, ["0", "1"]) == {
+        "0": "sensor.plug_power_bench",
+        "1": "light.hue_bulb_1_bench",
+    }
+
+    prompt = build_prompt(DEVICE_INSTRUCTIONS, [("d1", describe_device({"name": "Plug S 2"}))])
+    assert reply_suggestions(prompt) == [{"id": "d1", "suggestion": "Plug S 2 Bench"}]
+
+
+def test_find_regressions():
+    """Test only growth over the tolerance and the noise floor is reported."""
+    baseline = {
+        "sizes": {
+            "1000": {
+                "endpoints": {
+                    "entities": {"p50_ms": 10.0, "p95_ms": 12.0, "peak_kib": 900.0},
+                    "devices": {"p50_ms": 0.2, "p95_ms": 0.3, "peak_kib": 20.0},
+                }
+            }
+        }
+    }
+    results = {
+        "sizes": {
+            "1000": {
+                "endpoints": {
+                    "entities": {"p50_ms": 11.0, "p95_ms": 20.0, "peak_kib": 2000.0},
+                    "devices": {"p50_ms": 0.6, "p95_ms": 0.9, "peak_kib": 60.0},
+                }
+            },
+            "10000": {"endpoints": {}},
+        }
+    }
+
+    assert find_regressions(baseline, results, 0.2) == [
+        "1000 entities, entities: p95_ms 12 -> 20 ms (+67%)",
+        "1000 entities, entities: peak_kib 900 -> 2000 KiB (+122%)",
+    ]
@@ -0,0 +1,37 @@
+"""Tests for the model backend clients."""
+
+import os
+import sys
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer import async_unload_entry
+from custom_components.entity_renamer.client import async_create_entry_client
+from custom_components.entity_renamer.const import CONF_MAX_CONCURRENCY, DOMAIN
+
+
+@pytest.mark.asyncio
+async def test_entry_client_owns_its_pool(hass):
+    """Test an entry's client gets a pool of its own that closes on unload."""
+    entry = MagicMock(
+        entry_id="entry_1",
+        data={"api_key": "test_api_key"},
+        options={CONF_MAX_CONCURRENCY: 3},
+    )
+
+    client, http_client = await async_create_entry_client(hass, entry)
+
+    assert isinstance(http_client, httpx.AsyncClient)
+    assert client.api_key == "test_api_key"
+    assert client.max_retries == 0
+    pool = http_client._transport._pool
+    assert (pool._max_connections, pool._max_keepalive_connections) == (3, 3)
+
+    hass.data[DOMAIN] = {"entry_1": {"client": client, "http_client": http_client}}
+    assert await async_unload_entry(hass, entry)
+    assert http_client.is_closed
+    assert "entry_1" not in hass.data[DOMAIN]
@@ -0,0 +1,75 @@
+"""Tests for grouping look-alike entities."""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.clusters import (
+    cluster_entities,
+    expand_template,
+    name_pattern,
+)
+from custom_components.entity_renamer.registry_index import NO_AREA, NO_DEVICE
+
+
+def _plug_sensor(area, measurement, model="Plug S"):
+    """Return a sensor entity of a smart plug in ``area``."""
+    return {
+        "entity_id": f"sensor.shellyplug_{area.lower()}_{measurement.lower()}",
+        "name": f"{area} Plug {measurement}",
+        "original_name": measurement,
+        "device_name": f"{area} Plug",
+        "device_model": model,
+        "area_name": area,
+    }
+
+
+def test_name_pattern():
+    """Test device and area words are dropped and numbers masked."""
+    assert name_pattern(_plug_sensor("Kitchen", "Power")) == "power"
+    assert (
+        name_pattern(
+            {"name": "Office Lamp Channel 2", "device_name": "Lamp", "area_name": "Office"}
+        )
+        == "channel #"
+    )
+
+
+def test_cluster_entities():
+    """Test only groups of look-alike entities of one model are clustered."""
+    entities = [
+        _plug_sensor("Kitchen", "Power"),
+        _plug_sensor("Kitchen", "Energy"),
+        _plug_sensor("Office", "Power"),
+        _plug_sensor("Garage", "Power"),
+        _plug_sensor("Hall", "Power", model="Plug Mini"),
+        {"entity_id": "light.desk", "name": "Desk"},
+    ]
+
+    assert cluster_entities(entities) == ([[0, 2, 3]], [1, 4, 5])
+
+
+def test_expand_template():
+    """Test templates are filled in per entity and kept in its domain."""
+    entity = _plug_sensor("Living Room", "Power")
+
+    assert expand_template("sensor.{location}_{device}_power", entity) == (
+        "sensor.living_plug_power"
+    )
+    assert expand_template("switch.{location}__{Device}", entity) == "sensor.living_plug"
+    assert expand_template("{unknown}", entity) is None
+    assert expand_template(None, entity) is None
+
+
+def test_expand_template_without_area_or_device():
+    """Test the placeholders of an entity without an area or device are left empty."""
+    entity = {**_plug_sensor("Kitchen", "Power"), "area_name": NO_AREA}
+
+    assert expand_template("sensor.{location}_{device}_power", entity) == (
+        "sensor.kitchen_plug_power"
+    )
+    entity = {**entity, "device_name": NO_DEVICE}
+    assert expand_template("sensor.{location}_{device}_power", entity) == "sensor.power"
+    entity = {"name": "Device Power", "area_name": NO_AREA, "device_name": NO_DEVICE}
+    assert name_pattern(entity) == "device power"
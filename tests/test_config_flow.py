@@ -1,12 +1,15 @@
 """Test the config flow for AI Entity Renamer."""
-from unittest.mock import patch, MagicMock
+from unittest.mock import AsyncMock, patch, MagicMock
 
 import os
 import sys
+import httpx
+import openai
 import pytest
 from homeassistant import config_entries, setup
 from homeassistant.core import HomeAssistant
 from homeassistant.data_entry_flow import FlowResultType
+from homeassistant.helpers.httpx_client import get_async_client
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
@@ -30,8 +33,8 @@ async def test_form(hass: HomeAssistant) -> None:
     
     # Test form submission with valid data
     with patch(
-        "custom_components.entity_renamer.config_flow.openai.OpenAI",
-        return_value=MagicMock(),
+        "openai.AsyncOpenAI",
+        return_value=AsyncMock(),
     ), patch(
         "homeassistant.components.http.ban.async_is_banned",
         return_value=False,
@@ -50,32 +53,59 @@ async def test_form(hass: HomeAssistant) -> None:
 
 
 @pytest.mark.asyncio
-async def test_form_openai_httpx_fallback(hass: HomeAssistant) -> None:
-    """Test OpenAI client fallback when initialization fails."""
+async def test_form_uses_shared_http_client(hass: HomeAssistant) -> None:
+    """Test the API key probe uses Home Assistant's shared async HTTP client."""
     await setup.async_setup_component(hass, "http", {})
 
     flow = EntityRenamerConfigFlow()
     flow.hass = hass
 
-    mock_client = MagicMock()
-    mock_client.models.list.return_value = []
-
-    with patch(
-        "custom_components.entity_renamer.config_flow.openai.OpenAI",
-        side_effect=[TypeError("proxies"), TypeError("proxies"), mock_client],
-    ) as mock_openai, patch(
-        "custom_components.entity_renamer.config_flow.httpx.Client",
-        return_value=MagicMock(),
-        create=True,
-    ) as mock_http_client, patch(
-        "homeassistant.components.http.ban.async_is_banned",
-        return_value=False,
+    # Only the request is faked; the clients are built for real
+    with (
+        patch("openai.AsyncOpenAI", wraps=openai.AsyncOpenAI) as mock_openai,
+        patch(
+            "openai.resources.models.AsyncModels.list",
+            new_callable=AsyncMock,
+        ) as mock_list,
     ):
         result = await flow.async_step_user({"api_key": "test_api_key"})
 
         assert result["type"] == FlowResultType.CREATE_ENTRY
-        assert mock_openai.call_count == 3
-        mock_http_client.assert_called_once()
+        mock_openai.assert_called_once_with(
+            api_key="test_api_key",
+            base_url=None,
+            http_client=get_async_client(hass),
+            max_retries=0,
+        )
+        mock_list.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_form_local_backend_without_api_key(hass: HomeAssistant) -> None:
+    """Test a local OpenAI-compatible server can be set up without an API key."""
+    await setup.async_setup_component(hass, "http", {})
+
+    flow = EntityRenamerConfigFlow()
+    flow.hass = hass
+
+    user_input = {"api_key": "", "base_url": "http://localhost:11434/v1", "model": "llama3.1"}
+
+    with (
+        patch("openai.AsyncOpenAI", wraps=openai.AsyncOpenAI) as mock_openai,
+        patch(
+            "openai.resources.models.AsyncModels.list",
+            new_callable=AsyncMock,
+        ) as mock_list,
+    ):
+        result = await flow.async_step_user(user_input)
+
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+        assert result["data"] == user_input
+        assert mock_openai.call_args.kwargs["base_url"] == "http://localhost:11434/v1"
+        mock_list.assert_awaited_once()
+
+    result = await flow.async_step_user({**user_input, "base_url": "localhost:11434"})
+    assert result["errors"] == {"base_url": "invalid_base_url"}
 
 
 @pytest.mark.asyncio
@@ -88,15 +118,19 @@ async def test_form_invalid_api_key(hass: HomeAssistant) -> None:
     flow.hass = hass
     
     # Test form submission with invalid API key
+    mock_client = AsyncMock()
+    mock_client.models.list.side_effect = openai.AuthenticationError(
+        "Invalid API key",
+        response=httpx.Response(401, request=httpx.Request("GET", "https://api.openai.com")),
+        body=None,
+    )
+
     with patch(
-        "custom_components.entity_renamer.config_flow.openai.OpenAI",
-        return_value=MagicMock(),
+        "openai.AsyncOpenAI",
+        return_value=mock_client,
     ), patch(
         "homeassistant.components.http.ban.async_is_banned",
         return_value=False,
-    ), patch(
-        "custom_components.entity_renamer.config_flow.EntityRenamerConfigFlow.hass.async_add_executor_job",
-        side_effect=Exception("Invalid API key"),
     ):
         result = await flow.async_step_user(
             {
@@ -113,18 +147,51 @@ async def test_form_invalid_api_key(hass: HomeAssistant) -> None:
 async def test_form_no_api_key(hass: HomeAssistant) -> None:
     """Test we handle no API key."""
     await setup.async_setup_component(hass, "http", {})
-    
+
     # Initialize the config flow
     flow = EntityRenamerConfigFlow()
     flow.hass = hass
-    
+
     # Test form submission with no API key
     result = await flow.async_step_user(
         {
             "api_key": "",
         }
     )
-    
+
     assert result["type"] == FlowResultType.FORM
     assert result["step_id"] == "user"
     assert result["errors"] == {"api_key": "api_key_required"}
+
+
+@pytest.mark.asyncio
+async def test_validated_backend_is_cached(hass: HomeAssistant) -> None:
+    """Test a validated key is not checked again and its models fill the selector."""
+    await setup.async_setup_component(hass, "http", {})
+
+    models = MagicMock(data=[MagicMock(id="gpt-4o-mini"), MagicMock(id="gpt-4")])
+
+    # Only the request is faked; the client is built for real
+    with (
+        patch("openai.AsyncOpenAI", wraps=openai.AsyncOpenAI) as mock_openai,
+        patch(
+            "openai.resources.models.AsyncModels.list",
+            new_callable=AsyncMock,
+            return_value=models,
+        ) as mock_list,
+    ):
+        flow = EntityRenamerConfigFlow()
+        flow.hass = hass
+        result = await flow.async_step_user({"api_key": "test_api_key", "model": "gpt-5"})
+        assert result["errors"] == {"model": "unknown_model"}
+        schema = result["data_schema"].schema
+        model_field = next(field for key, field in schema.items() if key == "model")
+        assert model_field.config["options"] == ["gpt-4", "gpt-4o-mini"]
+
+        flow = EntityRenamerConfigFlow()
+        flow.hass = hass
+        result = await flow.async_step_user({"api_key": "test_api_key", "model": "gpt-4o-mini"})
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+
+    mock_openai.assert_called_once()
+    mock_list.assert_awaited_once()
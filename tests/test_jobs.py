@@ -0,0 +1,116 @@
+"""Tests for background suggestion jobs."""
+
+import os
+import sys
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.jobs import JobManager, job_summary
+
+
+def _items(count):
+    """Return ``count`` entity rows."""
+    return [{"entity_id": f"light.light_{i}"} for i in range(count)]
+
+
+async def _suggest(kind, items, options):
+    """Suggest a new ID for every item."""
+    return [f"{item['entity_id']}_new" for item in items]
+
+
+@pytest.fixture
+def mock_store():
+    """Patch the job store."""
+    with patch("custom_components.entity_renamer.jobs.Store") as mock_store:
+        mock_store.return_value.async_load = AsyncMock(return_value=None)
+        yield mock_store.return_value
+
+
+@pytest.mark.asyncio
+async def test_job_runs_in_batches(hass, mock_store):
+    """Test a job is processed batch by batch and saved as it goes."""
+    suggest = AsyncMock(side_effect=_suggest)
+    jobs = JobManager(hass, suggest)
+    await jobs.async_load()
+    jobs.async_resume()
+
+    with patch("custom_components.entity_renamer.jobs.JOB_BATCH_SIZE", 2):
+        job = jobs.async_create("entities", _items(5), {"local_only": True, "stream": True})
+        await jobs._worker
+
+    assert job_summary(job)["status"] == "completed"
+    assert job["results"] == [f"light.light_{i}_new" for i in range(5)]
+    assert job["options"] == {"local_only": True}
+    assert [len(call.args[1]) for call in suggest.call_args_list] == [2, 2, 1]
+    assert mock_store.async_delay_save.called
+
+
+@pytest.mark.asyncio
+async def test_failed_job_resumes_where_it_stopped(hass, mock_store):
+    """Test a retried job only asks for the items that are not done."""
+    suggest = AsyncMock(side_effect=[["light.light_0_new"], RuntimeError("Rate limited")])
+    jobs = JobManager(hass, suggest)
+    jobs.async_resume()
+
+    with patch("custom_components.entity_renamer.jobs.JOB_BATCH_SIZE", 1):
+        job = jobs.async_create("entities", _items(2), {})
+        await jobs._worker
+        assert (job["status"], job["done"], job["error"]) == ("failed", 1, "Rate limited")
+
+        suggest.side_effect = _suggest
+        jobs.async_retry(job["id"])
+        await jobs._worker
+
+    assert job["status"] == "completed"
+    assert job["results"] == ["light.light_0_new", "light.light_1_new"]
+    assert suggest.call_args.args[1] == [{"entity_id": "light.light_1"}]
+
+
+@pytest.mark.asyncio
+async def test_jobs_start_after_a_worker_finished_eagerly(hass, mock_store):
+    """Test a worker that never suspended does not keep later jobs from starting."""
+
+    def eager_task(coro, name):
+        """Run ``coro`` to completion the way an eager task that never suspends does."""
+        with pytest.raises(StopIteration):
+            coro.send(None)
+        task = hass.loop.create_future()
+        task.set_result(None)
+        return task
+
+    jobs = JobManager(hass, AsyncMock(side_effect=_suggest))
+    jobs.async_resume()
+
+    with patch.object(hass, "async_create_background_task", side_effect=eager_task):
+        first = jobs.async_create("entities", _items(1), {"local_only": True})
+        second = jobs.async_create("entities", _items(1), {"local_only": True})
+
+    assert (first["status"], second["status"]) == ("completed", "completed")
+
+
+@pytest.mark.asyncio
+async def test_interrupted_jobs_are_queued_again(hass, mock_store):
+    """Test a job that was running when Home Assistant stopped is queued on load."""
+    mock_store.async_load.return_value = {
+        "jobs": [
+            {
+                "id": "abc",
+                "kind": "devices",
+                "status": "running",
+                "created": 0,
+                "updated": 0,
+                "options": {},
+                "items": [{"id": "device_1"}],
+                "results": [None],
+                "done": 0,
+                "error": None,
+            }
+        ]
+    }
+    jobs = JobManager(hass, AsyncMock())
+    await jobs.async_load()
+
+    assert jobs.async_get("abc")["status"] == "queued"
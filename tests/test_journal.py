@@ -0,0 +1,52 @@
+"""Tests for the rename journal."""
+
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.journal import JOURNAL_FILE, RenameJournal
+
+
+@pytest.mark.asyncio
+async def test_journal_is_appended_and_reloaded(hass, tmp_path):
+    """Test batches survive a reload, with undos linked to the batches they revert."""
+    hass.config.config_dir = str(tmp_path)
+    journal = RenameJournal(hass)
+    await journal.async_load()
+
+    first = journal.async_record(
+        "bulk_rename", [["light.lamp", "light.desk_lamp", None, "Desk Lamp"]], []
+    )
+    second = journal.async_record("rename", [], [["device_1", "Hue 1", "Desk Bulb"]])
+    undo = journal.async_record("undo", [], [["device_1", "Desk Bulb", "Hue 1"]], undoes=second)
+    await hass.async_block_till_done()
+
+    lines = (tmp_path / ".storage" / JOURNAL_FILE).read_text().splitlines()
+    assert len(lines) == 3
+
+    reloaded = RenameJournal(hass)
+    await reloaded.async_load()
+    assert [batch["id"] for batch in reloaded.async_batches()] == [undo, second, first]
+    assert reloaded.async_get(second)["undone_by"] == undo
+    assert reloaded.async_get()["id"] == first
+    assert reloaded.async_get(first)["entities"] == [
+        ["light.lamp", "light.desk_lamp", None, "Desk Lamp"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_truncated_line_is_skipped(hass, tmp_path):
+    """Test a line cut short by a crash does not lose the other batches."""
+    hass.config.config_dir = str(tmp_path)
+    (tmp_path / ".storage").mkdir()
+    (tmp_path / ".storage" / JOURNAL_FILE).write_text(
+        '{"id":"a","time":1,"source":"rename","entities":[],"devices":[]}\n{"id":"b","ti'
+    )
+
+    journal = RenameJournal(hass)
+    await journal.async_load()
+
+    assert [batch["id"] for batch in journal.async_batches()] == ["a"]
@@ -0,0 +1,62 @@
+"""Tests for the reference-impact index."""
+
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.references import scan_changes
+
+AUTOMATIONS = """
+- id: "1"
+  alias: Evening lights
+  trigger:
+    - platform: state
+      entity_id: sensor.hall_motion
+  action:
+    - service: light.turn_on
+      target:
+        entity_id: !secret evening_light
+    - condition: template
+      value_template: "{{ states.sensor.outdoor_lux.state | int < 50 }}"
+"""
+
+DASHBOARD = {
+    "data": {
+        "config": {
+            "views": [
+                {"title": "Usage", "cards": [{"type": "entity", "entity": "sensor.hall_motion"}]}
+            ]
+        }
+    }
+}
+
+
+def test_scan_changes(tmp_path):
+    """Test objects are indexed by the entity IDs they mention and rescans are incremental."""
+    (tmp_path / "automations.yaml").write_text(AUTOMATIONS)
+    (tmp_path / "scenes.yaml").write_text("- name: Movie\n  entities:\n    light.tv_wall: 'off'\n")
+    (tmp_path / "secrets.yaml").write_text("evening_light: light.porch\n")
+    (tmp_path / ".storage").mkdir()
+    (tmp_path / ".storage" / "lovelace.energy").write_text(json.dumps(DASHBOARD))
+    dashboard = os.path.join(".storage", "lovelace.energy")
+
+    found, changed = scan_changes(str(tmp_path), {})
+
+    assert set(found) == {"automations.yaml", "scenes.yaml", dashboard}
+    automation = {"type": "automation", "name": "Evening lights", "source": "automations.yaml"}
+    assert changed["automations.yaml"]["sensor.hall_motion"] == [automation]
+    assert changed["automations.yaml"]["sensor.outdoor_lux"] == [automation]
+    assert "light.porch" not in changed["automations.yaml"]
+    assert changed["scenes.yaml"]["light.tv_wall"] == [
+        {"type": "scene", "name": "Movie", "source": "scenes.yaml"}
+    ]
+    assert changed[dashboard]["sensor.hall_motion"] == [
+        {"type": "dashboard", "name": "energy / Usage", "source": dashboard}
+    ]
+
+    (tmp_path / "scenes.yaml").write_text("[]\n")
+    _, changed = scan_changes(str(tmp_path), found)
+
+    assert changed == {"scenes.yaml": {}}
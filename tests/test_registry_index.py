@@ -0,0 +1,159 @@
+"""Tests for the registry join index."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.registry_index import RegistryIndex
+
+
+@pytest.fixture
+def patched_registries(mock_entity_registry, mock_device_registry, mock_area_registry):
+    """Patch the registry getters used by the index."""
+    mock_entity_registry.async_get = mock_entity_registry.entities.get
+    with (
+        patch(
+            "custom_components.entity_renamer.registry_index.er.async_get",
+            return_value=mock_entity_registry,
+        ),
+        patch(
+            "custom_components.entity_renamer.registry_index.async_get_device_registry",
+            return_value=mock_device_registry,
+        ),
+        patch(
+            "custom_components.entity_renamer.registry_index.async_get_area_registry",
+            return_value=mock_area_registry,
+        ),
+    ):
+        yield mock_entity_registry, mock_device_registry, mock_area_registry
+
+
+@pytest.mark.asyncio
+async def test_entities_joined_with_device_and_area(hass, patched_registries):
+    """Test entity rows carry their device and area names."""
+    index = RegistryIndex(hass)
+    rows = {row["entity_id"]: row for row in index.async_entities()}
+
+    assert rows["light.living_room"]["device_name"] == "Philips Hue"
+    assert rows["light.living_room"]["area_name"] == "Living Room"
+    assert rows["switch.kitchen"]["area_name"] == "Kitchen"
+
+
+@pytest.mark.asyncio
+async def test_area_rename_updates_entities(hass, patched_registries):
+    """Test an area update re-joins the entities in that area."""
+    _, _, area_registry = patched_registries
+    index = RegistryIndex(hass)
+    index.async_entities()
+
+    area_registry.areas["area_1"].name = "Lounge"
+    index._async_area_updated(MagicMock(data={"action": "update", "area_id": "area_1"}))
+
+    rows = {row["entity_id"]: row for row in index.async_entities()}
+    assert rows["light.living_room"]["area_name"] == "Lounge"
+    assert rows["switch.kitchen"]["area_name"] == "Kitchen"
+
+
+@pytest.mark.asyncio
+async def test_entity_rename_replaces_row(hass, patched_registries):
+    """Test a renamed entity replaces its old row."""
+    entity_registry, _, _ = patched_registries
+    index = RegistryIndex(hass)
+    index.async_entities()
+
+    entity = entity_registry.entities.pop("light.living_room")
+    entity.entity_id = "light.lounge_ceiling"
+    entity_registry.entities["light.lounge_ceiling"] = entity
+    index._async_entity_updated(
+        MagicMock(
+            data={
+                "action": "update",
+                "entity_id": "light.lounge_ceiling",
+                "old_entity_id": "light.living_room",
+            }
+        )
+    )
+
+    entity_ids = {row["entity_id"] for row in index.async_entities()}
+    assert entity_ids == {"light.lounge_ceiling", "switch.kitchen"}
+
+
+@pytest.mark.asyncio
+async def test_query_filters_sorts_and_pages(hass, patched_registries):
+    """Test server-side filtering, sorting and paging."""
+    index = RegistryIndex(hass)
+
+    total, rows = index.async_query(domain="switch")
+    assert total == 1
+    assert rows[0]["entity_id"] == "switch.kitchen"
+
+    total, rows = index.async_query(search="LIVING")
+    assert [row["entity_id"] for row in rows] == ["light.living_room"]
+
+    total, rows = index.async_query(sort="-area_name", limit=1)
+    assert total == 2
+    assert [row["area_name"] for row in rows] == ["Living Room"]
+
+    total, rows = index.async_query(area="Kitchen", domain="light")
+    assert (total, rows) == (0, [])
+
+    with pytest.raises(ValueError):
+        index.async_query(sort="unknown")
+
+
+@pytest.mark.asyncio
+async def test_registry_events_bump_etag(hass, patched_registries):
+    """Test every registry event changes the entity tag."""
+    index = RegistryIndex(hass)
+    etag = index.etag
+
+    index._async_area_updated(MagicMock(data={"action": "update", "area_id": "area_1"}))
+
+    assert index.revision == 1
+    assert index.etag != etag
+
+
+@pytest.mark.asyncio
+async def test_changes_since_replays_row_changes(hass, patched_registries):
+    """Test the change feed replays the row changes after a token."""
+    _, _, area_registry = patched_registries
+    index = RegistryIndex(hass)
+    index.async_entities()
+    token = index.token
+
+    area_registry.areas["area_2"].name = "Galley"
+    index._async_area_updated(MagicMock(data={"action": "update", "area_id": "area_2"}))
+
+    changes = index.async_changes_since(token)
+    assert [(change["type"], change["id"]) for change in changes] == [
+        ("device", "device_2"),
+        ("entity", "switch.kitchen"),
+    ]
+    assert changes[1]["row"]["area_name"] == "Galley"
+    assert index.async_changes_since(index.token) == []
+    assert index.async_changes_since("other-run-0") is None
+
+
+@pytest.mark.asyncio
+async def test_query_sorts_rows_without_a_name(hass, patched_registries):
+    """Test rows without an original name sort first, tie-broken by entity ID."""
+    entity_registry, _, _ = patched_registries
+    entity_registry.entities["switch.kitchen"].name = None
+    entity_registry.entities["switch.kitchen"].original_name = None
+    index = RegistryIndex(hass)
+
+    total, rows = index.async_query(sort="original_name")
+    assert total == 2
+    assert [row["entity_id"] for row in rows] == ["switch.kitchen", "light.living_room"]
+    assert [row["original_name"] for row in rows] == [None, "Hue Light 1"]
+
+    total, rows = index.async_query(sort="-original_name")
+    assert [row["entity_id"] for row in rows] == ["light.living_room", "switch.kitchen"]
+
+    # Entities without a name are listed under their object ID
+    total, rows = index.async_query(sort="name")
+    assert [row["name"] for row in rows] == ["kitchen", "Living Room Light"]
@@ -0,0 +1,238 @@
+"""Tests for batch renames."""
+
+import os
+import sys
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from homeassistant.core import ServiceRegistry
+
+from custom_components.entity_renamer import _async_register_api
+from custom_components.entity_renamer.const import DOMAIN
+from custom_components.entity_renamer.journal import RenameJournal
+from custom_components.entity_renamer.renames import (
+    EntityIdChecker,
+    async_apply_renames,
+    async_check_proposed_ids,
+    async_undo_batch,
+)
+
+
+@pytest.fixture
+def patched_registries(hass, mock_entity_registry, mock_device_registry):
+    """Patch the registries used by batch renames."""
+    entities = mock_entity_registry.entities
+    mock_entity_registry.async_get = entities.get
+    mock_entity_registry.async_is_registered = lambda entity_id: entity_id in entities
+
+    def update_entity(entity_id, *, new_entity_id, name=None):
+        if new_entity_id == "switch.broken":
+            raise ValueError("Entity with this ID is already registered")
+        old = entities.pop(entity_id)
+        entities[new_entity_id] = MagicMock(entity_id=new_entity_id, device_id=old.device_id)
+        entities[new_entity_id].name = name or old.name
+
+    mock_entity_registry.async_update_entity = MagicMock(side_effect=update_entity)
+    with (
+        patch(
+            "custom_components.entity_renamer.renames.er.async_get",
+            return_value=mock_entity_registry,
+        ),
+        patch(
+            "custom_components.entity_renamer.renames.async_get_device_registry",
+            return_value=mock_device_registry,
+        ),
+    ):
+        yield mock_entity_registry, mock_device_registry
+
+
+@pytest.mark.asyncio
+async def test_apply_renames(hass, patched_registries):
+    """Test a valid batch is applied and reported per item."""
+    entity_registry, device_registry = patched_registries
+    device_registry.async_update_device = MagicMock()
+
+    result = async_apply_renames(
+        hass,
+        [{"entity_id": "light.living_room", "new_entity_id": "light.lr_ceiling"}],
+        [{"device_id": "device_1", "new_name": "Ceiling Bulb"}],
+    )
+
+    assert result["success"]
+    assert [row["success"] for row in (*result["entities"], *result["devices"])] == [True, True]
+    assert set(entity_registry.entities) == {"light.lr_ceiling", "switch.kitchen"}
+    device_registry.async_update_device.assert_called_once_with("device_1", name="Ceiling Bulb")
+
+
+@pytest.mark.asyncio
+async def test_collisions_are_rejected_up_front(hass, patched_registries):
+    """Test nothing is applied when one rename collides."""
+    entity_registry, _ = patched_registries
+
+    result = async_apply_renames(
+        hass,
+        [
+            {"entity_id": "light.living_room", "new_entity_id": "light.lounge"},
+            {"entity_id": "switch.kitchen", "new_entity_id": "switch.kitchen_2"},
+            {"entity_id": "switch.kitchen", "new_entity_id": "light.kitchen"},
+        ],
+    )
+
+    assert not result["success"]
+    assert [row.get("error") for row in result["entities"]] == [
+        "Not applied, another rename is invalid",
+        "Entity switch.kitchen is renamed more than once",
+        "New entity ID must keep the domain",
+    ]
+    entity_registry.async_update_entity.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_failed_rename_rolls_back(hass, patched_registries):
+    """Test renames already applied are reverted when a later one fails."""
+    entity_registry, _ = patched_registries
+
+    result = async_apply_renames(
+        hass,
+        [
+            {"entity_id": "light.living_room", "new_entity_id": "light.lounge"},
+            {"entity_id": "switch.kitchen", "new_entity_id": "switch.broken"},
+        ],
+    )
+
+    assert not result["success"]
+    assert result["entities"][0]["error"] == "Rolled back, another rename failed"
+    assert "already registered" in result["entities"][1]["error"]
+    assert set(entity_registry.entities) == {"light.living_room", "switch.kitchen"}
+
+
+@pytest.fixture
+def registered_services(hass):
+    """Register the integration's services on a real service registry."""
+    hass.services = ServiceRegistry(hass)
+    with patch("custom_components.entity_renamer.frontend"):
+        _async_register_api(hass)
+    return hass.services
+
+
+@pytest.mark.asyncio
+async def test_bulk_rename_service(hass, tmp_path, patched_registries, registered_services):
+    """Test the bulk rename service applies a batch and returns its result."""
+    entity_registry, _ = patched_registries
+    hass.config.config_dir = str(tmp_path)
+    hass.data[DOMAIN] = {"journal": RenameJournal(hass)}
+
+    result = await registered_services.async_call(
+        DOMAIN,
+        "bulk_rename",
+        {"entities": [{"entity_id": "light.living_room", "new_entity_id": "light.lounge"}]},
+        blocking=True,
+        return_response=True,
+    )
+
+    assert result["success"]
+    assert result["entities"] == [
+        {"entity_id": "light.living_room", "new_entity_id": "light.lounge", "success": True}
+    ]
+    assert set(entity_registry.entities) == {"light.lounge", "switch.kitchen"}
+    await hass.async_block_till_done()
+
+
+@pytest.mark.asyncio
+async def test_undo_batch(hass, tmp_path, patched_registries):
+    """Test an applied batch is journaled and undone as one batch."""
+    entity_registry, device_registry = patched_registries
+    device_registry.async_update_device = MagicMock()
+    hass.config.config_dir = str(tmp_path)
+    journal = RenameJournal(hass)
+    hass.data[DOMAIN] = {"journal": journal}
+
+    result = async_apply_renames(
+        hass,
+        [{"entity_id": "light.living_room", "new_entity_id": "light.lounge", "new_name": "Lounge"}],
+        [{"device_id": "device_1", "new_name": "Ceiling Bulb"}],
+    )
+    batch = journal.async_get(result["batch_id"])
+    assert batch["entities"] == [
+        ["light.living_room", "light.lounge", "Living Room Light", "Lounge"]
+    ]
+    assert batch["devices"] == [["device_1", "Philips Hue", "Ceiling Bulb"]]
+
+    undo = async_undo_batch(hass, batch)
+
+    assert undo["success"]
+    assert set(entity_registry.entities) == {"light.living_room", "switch.kitchen"}
+    entity_registry.async_update_entity.assert_called_with(
+        "light.lounge", new_entity_id="light.living_room", name="Living Room Light"
+    )
+    device_registry.async_update_device.assert_called_with("device_1", name="Philips Hue")
+    assert batch["undone_by"] == undo["batch_id"]
+    assert journal.async_get() is None
+    await hass.async_block_till_done()
+
+
+@pytest.mark.asyncio
+async def test_undo_rename_service(hass, tmp_path, patched_registries, registered_services):
+    """Test the undo service reverts the newest batch, and only once."""
+    entity_registry, _ = patched_registries
+    hass.config.config_dir = str(tmp_path)
+    hass.data[DOMAIN] = {"journal": RenameJournal(hass)}
+    applied = async_apply_renames(
+        hass, [{"entity_id": "light.living_room", "new_entity_id": "light.lounge"}]
+    )
+
+    result = await registered_services.async_call(
+        DOMAIN, "undo_rename", {}, blocking=True, return_response=True
+    )
+
+    assert result["success"]
+    assert set(entity_registry.entities) == {"light.living_room", "switch.kitchen"}
+    result = await registered_services.async_call(
+        DOMAIN,
+        "undo_rename",
+        {"batch_id": applied["batch_id"]},
+        blocking=True,
+        return_response=True,
+    )
+    assert result == {"success": False, "error": f"Batch {applied['batch_id']} was already undone"}
+    await hass.async_block_till_done()
+
+
+@pytest.mark.asyncio
+async def test_check_proposed_ids(hass, patched_registries):
+    """Test proposed IDs are made valid and unique in one pass."""
+    hass.states.async_set("light.porch", "on")
+
+    results = async_check_proposed_ids(
+        hass,
+        [
+            {"entity_id": "light.living_room", "new_entity_id": "light.kitchen"},
+            {"entity_id": "switch.kitchen", "new_entity_id": "switch.Kitchen Counter"},
+            {"entity_id": "light.hall", "new_entity_id": "light.kitchen"},
+            {"entity_id": "light.garden", "new_entity_id": "light.switch_kitchen"},
+            {"entity_id": "light.patio", "new_entity_id": "switch.porch"},
+            {"entity_id": "light.attic", "new_entity_id": "light.living_room"},
+        ],
+    )
+
+    assert [(row["new_entity_id"], row.get("adjusted")) for row in results] == [
+        ("light.kitchen", None),
+        ("switch.kitchen_counter", "invalid"),
+        ("light.kitchen_2", "duplicate"),
+        ("light.switch_kitchen", None),
+        ("light.porch_2", "domain"),
+        ("light.living_room_2", "in_use"),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_checker_releases_replaced_claims(hass, patched_registries):
+    """Test checking a position again frees the ID it claimed before."""
+    checker = EntityIdChecker(hass)
+
+    assert checker.async_check(0, "light.a", "light.new") == ("light.new", None)
+    assert checker.async_check(0, "light.a", "light.other") == ("light.other", None)
+    assert checker.async_check(1, "light.b", "light.new") == ("light.new", None)
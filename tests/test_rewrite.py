@@ -0,0 +1,52 @@
+"""Tests for rewriting references to renamed entities."""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.rewrite import EntityIdMatcher, rewrite_files
+
+
+def test_matcher_replaces_whole_ids_in_one_pass():
+    """Test only whole IDs are replaced, each once, including chained renames."""
+    matcher = EntityIdMatcher(
+        {
+            "light.lamp": "light.desk_lamp",
+            "light.desk_lamp": "light.office_desk_lamp",
+            "sensor.power": "sensor.plug_power",
+        }
+    )
+
+    text, count = matcher.replace(
+        "entity_id: light.lamp\n"
+        "target: [light.desk_lamp, light.lamp_2]\n"
+        "value: '{{ states.sensor.power.state }}'\n"
+        "other: sensor.power_factor\n"
+    )
+
+    assert count == 3
+    assert text == (
+        "entity_id: light.desk_lamp\n"
+        "target: [light.office_desk_lamp, light.lamp_2]\n"
+        "value: '{{ states.sensor.plug_power.state }}'\n"
+        "other: sensor.power_factor\n"
+    )
+
+
+def test_rewrite_files_keeps_backups(tmp_path):
+    """Test changed files are rewritten after a backup and others are left alone."""
+    (tmp_path / "automations.yaml").write_text("- trigger:\n    entity_id: sensor.power\n")
+    (tmp_path / "scripts.yaml").write_text("noop:\n  sequence: []\n")
+    matcher = EntityIdMatcher({"sensor.power": "sensor.plug_power"})
+
+    files, count = rewrite_files(str(tmp_path), matcher, os.path.join(".backups", "1"))
+
+    assert (files, count) == (["automations.yaml"], 1)
+    assert (tmp_path / "automations.yaml").read_text() == (
+        "- trigger:\n    entity_id: sensor.plug_power\n"
+    )
+    assert (tmp_path / ".backups" / "1" / "automations.yaml").read_text() == (
+        "- trigger:\n    entity_id: sensor.power\n"
+    )
+    assert not (tmp_path / ".backups" / "1" / "scripts.yaml").exists()
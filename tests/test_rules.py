@@ -0,0 +1,98 @@
+"""Tests for the local rule-based suggestions."""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.registry_index import (
+    NO_AREA,
+    NO_DEVICE,
+    device_payload,
+    entity_payload,
+)
+from custom_components.entity_renamer.rules import (
+    local_device_suggestion,
+    local_entity_suggestion,
+    location_code,
+)
+
+
+def _entity_row(entity_id, name=None, area_name=NO_AREA, device_name=NO_DEVICE, **extra):
+    """Return an entity row as the registry index lists it."""
+    return entity_payload(
+        {
+            "entity_id": entity_id,
+            "name": name or entity_id.split(".")[-1],
+            "device_name": device_name,
+            "area_name": area_name,
+            "original_name": extra.get("original_name"),
+            "device_model": extra.get("device_model", ""),
+        }
+    )
+
+
+def _device_row(name, model="", area_name=NO_AREA):
+    """Return a device row as the registry index lists it."""
+    return device_payload(
+        {"id": "device_1", "name": name, "manufacturer": "", "model": model, "area_name": area_name}
+    )
+
+
+def test_location_code():
+    """Test area names are shortened to location codes."""
+    assert location_code("Living Room") == "living"
+    assert location_code("Workshop") == "workshop"
+    assert location_code(None) is None
+    assert location_code(NO_AREA) is None
+
+
+def test_local_entity_suggestion():
+    """Test clear-cut entities are named from area, domain and name."""
+    assert (
+        local_entity_suggestion(
+            _entity_row(
+                "light.hue_1",
+                "Kitchen Hue Ceiling Light 2",
+                area_name="Kitchen",
+                device_name="Hue Bulb",
+            )
+        )
+        == "light.kitchen_light_ceiling_2"
+    )
+    assert (
+        local_entity_suggestion(
+            _entity_row(
+                "sensor.0x1234_temperature",
+                original_name="Temperature",
+                area_name="Master Bedroom",
+            )
+        )
+        == "sensor.master_temp"
+    )
+
+
+def test_ambiguous_entities_are_left_to_the_model():
+    """Test strict mode gives up on entities the rules cannot name."""
+    no_area = _entity_row("light.porch", "Porch")
+    unknown_sensor = _entity_row("sensor.x", "Mystery Value", area_name="Kitchen")
+
+    assert local_entity_suggestion(no_area) is None
+    assert local_entity_suggestion(unknown_sensor) is None
+    assert local_entity_suggestion(no_area, strict=False) == "light.light_porch"
+    assert (
+        local_entity_suggestion(unknown_sensor, strict=False)
+        == "sensor.kitchen_sensor_mystery_value"
+    )
+    assert local_entity_suggestion(_entity_row("sensor.temp", "Temp"), strict=False) == (
+        "sensor.temp"
+    )
+
+
+def test_local_device_suggestion():
+    """Test devices are named from their area and device type."""
+    device = _device_row("Hue Bulb", "LCT015", area_name="Kitchen")
+    assert local_device_suggestion(device) == "Kitchen Light"
+    assert local_device_suggestion(_device_row("Hue Bulb", "LCT015")) is None
+    assert local_device_suggestion(_device_row("Hue Bulb", "LCT015"), strict=False) == "Light"
+    assert local_device_suggestion(_device_row("Plug", area_name=NO_AREA), strict=False) == "Plug"
@@ -0,0 +1,120 @@
+"""Tests for the rate-limit-aware request scheduler."""
+
+import asyncio
+import os
+import sys
+import time
+from unittest.mock import AsyncMock, patch
+
+import httpx
+import openai
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.scheduler import RateLimitExceeded, RequestScheduler
+
+
+def _rate_limit_error(headers):
+    """Return the error OpenAI raises for a 429 response with ``headers``."""
+    return openai.RateLimitError(
+        "Rate limited",
+        response=httpx.Response(
+            429, headers=headers, request=httpx.Request("POST", "https://api.openai.com")
+        ),
+        body=None,
+    )
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_is_retried():
+    """Test a 429 pauses for the time the server asks for and retries."""
+    call = AsyncMock(side_effect=[_rate_limit_error({"retry-after-ms": "20"}), "reply"])
+    scheduler = RequestScheduler()
+
+    start = time.monotonic()
+    assert await scheduler.async_run(call) == "reply"
+
+    assert call.await_count == 2
+    assert time.monotonic() - start >= 0.02
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_error_after_retries():
+    """Test a request still rate limited after all retries fails."""
+    call = AsyncMock(side_effect=_rate_limit_error({"retry-after-ms": "1"}))
+    scheduler = RequestScheduler(retries=2)
+
+    with pytest.raises(RateLimitExceeded):
+        await scheduler.async_run(call)
+    assert call.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_server_error_is_retried_after_backoff():
+    """Test a 503 is retried after a jittered exponential backoff."""
+    error = openai.InternalServerError(
+        "Service unavailable",
+        response=httpx.Response(503, request=httpx.Request("POST", "https://api.openai.com")),
+        body=None,
+    )
+    call = AsyncMock(side_effect=[error, error, "reply"])
+    scheduler = RequestScheduler()
+
+    start = time.monotonic()
+    with patch("custom_components.entity_renamer.scheduler.RATE_LIMIT_BACKOFF", 0.02):
+        assert await scheduler.async_run(call) == "reply"
+
+    assert call.await_count == 3
+    # Half of 0.02 s and of 0.04 s at least, with the jitter
+    assert time.monotonic() - start >= 0.03
+
+
+@pytest.mark.asyncio
+async def test_server_error_after_retries():
+    """Test a request still failing after all retries raises the last error."""
+    call = AsyncMock(side_effect=openai.APIConnectionError(request=httpx.Request("POST", "/")))
+    scheduler = RequestScheduler(retries=1)
+
+    with patch("custom_components.entity_renamer.scheduler.RATE_LIMIT_BACKOFF", 0.001):
+        with pytest.raises(openai.APIConnectionError):
+            await scheduler.async_run(call)
+    assert call.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_wait_for_reported_limits():
+    """Test no request is sent before an exhausted limit resets."""
+    scheduler = RequestScheduler()
+    scheduler.async_observe(
+        {
+            "x-ratelimit-limit-tokens": "6000",
+            "x-ratelimit-remaining-tokens": "0",
+            "x-ratelimit-reset-tokens": "30ms",
+        }
+    )
+
+    start = time.monotonic()
+    await scheduler.async_run(AsyncMock(return_value="reply"), cost=1)
+
+    assert time.monotonic() - start >= 0.03
+
+
+@pytest.mark.asyncio
+async def test_identical_requests_are_coalesced():
+    """Test concurrent requests with the same key are sent once."""
+    release = asyncio.Event()
+
+    async def _call():
+        await release.wait()
+        return "reply"
+
+    call = AsyncMock(side_effect=_call)
+    scheduler = RequestScheduler()
+
+    runs = [asyncio.ensure_future(scheduler.async_run(call, key="same")) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+
+    assert await asyncio.gather(*runs) == ["reply"] * 3
+    assert call.await_count == 1
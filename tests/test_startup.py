@@ -0,0 +1,25 @@
+"""Tests for the startup timing report."""
+
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.startup import StartupTimer
+
+
+def test_startup_timer_reports_each_step():
+    """Test every measured step is reported in order, even when it fails."""
+    timer = StartupTimer()
+
+    with timer.measure("registry index"):
+        pass
+    try:
+        with timer.measure("job queue"):
+            raise RuntimeError
+    except RuntimeError:
+        pass
+
+    assert list(timer.steps) == ["registry index", "job queue"]
+    assert all(duration >= 0 for duration in timer.steps.values())
+    assert timer.summary().startswith("registry index 0.")
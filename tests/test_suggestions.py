@@ -0,0 +1,365 @@
+"""Tests for the suggestion pipeline."""
+
+import json
+import os
+import sys
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import openai
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from custom_components.entity_renamer.cache import SuggestionCache
+from custom_components.entity_renamer.prompt import count_tokens, pack_items
+from custom_components.entity_renamer.suggestions import (
+    ENTITY_INSTRUCTIONS,
+    SuggestionError,
+    _ArrayScanner,
+    async_suggest,
+    async_suggest_entities,
+    describe_entity,
+    entity_fingerprint,
+    parse_suggestions,
+)
+
+
+def _entities(count):
+    """Return ``count`` entity rows as sent by the panel."""
+    return [
+        {
+            "entity_id": f"light.light_{i}",
+            "name": f"Light {i}",
+            "device_name": "Hue Bulb",
+            "area_name": "Kitchen",
+        }
+        for i in range(count)
+    ]
+
+
+def _prompted_ids(kwargs):
+    """Return the entity IDs in the rows of a chat completion request."""
+    rows = kwargs["messages"][1]["content"].splitlines()
+    return [row.split("\t")[1] for row in rows if "\t" in row and not row.startswith("id\t")]
+
+
+def _prompted_rows(kwargs):
+    """Return the row ids and entity IDs of a chat completion request."""
+    rows = kwargs["messages"][1]["content"].splitlines()
+    return [
+        tuple(row.split("\t")[:2]) for row in rows if "\t" in row and not row.startswith("id\t")
+    ]
+
+
+def _reply(content):
+    """Return a chat completion response carrying ``content``."""
+    return MagicMock(choices=[MagicMock(message=MagicMock(content=content))])
+
+
+def test_pack_items_respects_budget():
+    """Test items are split into ordered chunks within the token budget."""
+    entities = _entities(10)
+    chunks = pack_items(entities, describe_entity, 60, overhead=20)
+
+    assert len(chunks) > 1
+    assert [item for _, chunk in chunks for item in chunk] == entities
+    assert [offset for offset, _ in chunks] == [
+        sum(len(chunk) for _, chunk in chunks[:i]) for i in range(len(chunks))
+    ]
+    for _, chunk in chunks:
+        assert len(chunk) == 1 or 20 + sum(count_tokens(describe_entity(e)) for e in chunk) <= 60
+
+
+def test_entities_are_encoded_as_rows():
+    """Test entities are sent as tab-separated rows under one header row."""
+    row = describe_entity(
+        {"entity_id": "light.a", "name": "Desk\tLamp", "device_name": None, "area_name": "Office"}
+    )
+
+    assert row == "light.a\tDesk Lamp\t\tOffice\n"
+    assert ENTITY_INSTRUCTIONS.endswith("id\tentity_id\tname\tdevice\tarea\n")
+
+
+def test_parse_suggestions():
+    """Test suggestions are matched to rows by id and invalid entries dropped."""
+    reply = {
+        "suggestions": [
+            {"id": "2", "suggestion": "light.b"},
+            {"id": "1", "suggestion": "light.a"},
+            {"id": "3", "suggestion": " "},
+            {"id": "9", "suggestion": "light.unknown"},
+        ]
+    }
+    assert parse_suggestions(json.dumps(reply), ["1", "2", "3"]) == {
+        "1": "light.a",
+        "2": "light.b",
+    }
+    assert parse_suggestions('Here you go: ["light.a", "light.b"]', ["1", "2"]) == {
+        "1": "light.a",
+        "2": "light.b",
+    }
+    assert parse_suggestions('["light.a"]', ["1", "2"]) == {}
+
+    with pytest.raises(SuggestionError):
+        parse_suggestions("not json", ["1"])
+
+
+@pytest.mark.asyncio
+async def test_async_suggest_retries_failed_chunk_only():
+    """Test a failed chunk is retried while the others keep their results."""
+    entities = _entities(6)
+    calls = []
+
+    def _create(**kwargs):
+        ids = _prompted_ids(kwargs)
+        calls.append(ids)
+        if len(calls) == 1:
+            return _reply("[]")
+        return _reply(json.dumps([f"{entity_id}_new" for entity_id in ids]))
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=_create)
+
+    suggestions = await async_suggest(
+        client,
+        "system",
+        "instructions\n",
+        entities,
+        describe_entity,
+        chunk_tokens=60,
+        max_concurrency=1,
+    )
+
+    assert suggestions == [f"{entity['entity_id']}_new" for entity in entities]
+    assert calls[0] == calls[1]
+    overhead = count_tokens("system") + count_tokens("instructions\n")
+    assert len(calls) == len(pack_items(entities, describe_entity, 60, overhead)) + 1
+
+
+@pytest.mark.asyncio
+async def test_structured_output_is_disabled_per_backend():
+    """Test a backend rejecting structured output does not disable it for other backends."""
+    entities = _entities(1)
+
+    def _client(base_url, supports_response_format):
+        async def _create(**kwargs):
+            if "response_format" in kwargs and not supports_response_format:
+                raise openai.BadRequestError(
+                    "Unsupported parameter: response_format",
+                    response=httpx.Response(400, request=httpx.Request("POST", base_url)),
+                    body=None,
+                )
+            return _reply(json.dumps([f"{entity_id}_new" for entity_id in _prompted_ids(kwargs)]))
+
+        client = MagicMock(base_url=base_url)
+        client.chat.completions.create = AsyncMock(side_effect=_create)
+        return client
+
+    local = _client("http://localhost:11434/v1/", False)
+    hosted = _client("https://api.openai.com/v1/", True)
+    for client in (local, hosted, local):
+        suggestions = await async_suggest(
+            client,
+            "system",
+            "instructions\n",
+            entities,
+            describe_entity,
+            chunk_tokens=1000,
+            max_concurrency=1,
+        )
+        assert suggestions == ["light.light_0_new"]
+
+    local_calls = local.chat.completions.create.mock_calls
+    assert ["response_format" in call.kwargs for call in local_calls] == [True, False, False]
+    assert "response_format" in hosted.chat.completions.create.call_args.kwargs
+
+
+@pytest.mark.asyncio
+async def test_async_suggest_only_requests_uncached_entities(hass):
+    """Test cached entities are answered locally and only misses are prompted."""
+    entities = _entities(3)
+    prompted = []
+
+    def _create(**kwargs):
+        ids = _prompted_ids(kwargs)
+        prompted.extend(ids)
+        return _reply(json.dumps([f"{entity_id}_new" for entity_id in ids]))
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=_create)
+
+    with patch("custom_components.entity_renamer.cache.Store") as mock_store:
+        mock_store.return_value.async_load = AsyncMock(return_value=None)
+        cache = SuggestionCache(hass)
+        cache.async_set(entity_fingerprint(entities[1]), "light.cached")
+
+        suggestions = await async_suggest(
+            client,
+            "system",
+            "instructions\n",
+            entities,
+            describe_entity,
+            chunk_tokens=1000,
+            max_concurrency=1,
+            cache=cache,
+            cache_key=entity_fingerprint,
+        )
+
+    assert suggestions == ["light.light_0_new", "light.cached", "light.light_2_new"]
+    assert prompted == ["light.light_0", "light.light_2"]
+    assert cache.async_get(entity_fingerprint(entities[2])) == "light.light_2_new"
+
+
+def test_array_scanner_decodes_items_as_they_complete():
+    """Test array items are reported once their text has fully arrived."""
+    scanner = _ArrayScanner()
+
+    assert scanner.feed('Sure: ["light.a", {"name": "X, [y]') == [(0, "light.a")]
+    assert scanner.feed('"}, 1') == [(1, {"name": "X, [y]"})]
+    assert scanner.feed("2]") == [(2, 12)]
+    assert scanner.feed(', "ignored"') == []
+
+
+@pytest.mark.asyncio
+async def test_async_suggest_streams_items():
+    """Test streamed replies report every item as it is decoded."""
+    entities = _entities(3)
+
+    async def _stream(text):
+        for start in range(0, len(text), 5):
+            yield MagicMock(choices=[MagicMock(delta=MagicMock(content=text[start : start + 5]))])
+
+    def _create(**kwargs):
+        assert kwargs["stream"] is True
+        return _stream(json.dumps([f"{entity['entity_id']}_new" for entity in entities]))
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=_create)
+    streamed = []
+
+    async def _on_item(position, suggestion):
+        streamed.append((position, suggestion))
+
+    suggestions = await async_suggest(
+        client,
+        "system",
+        "instructions\n",
+        entities,
+        describe_entity,
+        chunk_tokens=1000,
+        max_concurrency=1,
+        on_item=_on_item,
+    )
+
+    assert streamed == list(enumerate(suggestions))
+    assert suggestions == [f"{entity['entity_id']}_new" for entity in entities]
+
+
+@pytest.mark.asyncio
+async def test_async_suggest_only_requests_items_local_rules_skip():
+    """Test items answered by the local rules are not sent to the model."""
+    entities = _entities(3)
+    prompted = []
+
+    def _create(**kwargs):
+        ids = _prompted_ids(kwargs)
+        prompted.extend(ids)
+        return _reply(json.dumps([f"{entity_id}_new" for entity_id in ids]))
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=_create)
+
+    suggestions = await async_suggest(
+        client,
+        "system",
+        "instructions\n",
+        entities,
+        describe_entity,
+        chunk_tokens=1000,
+        max_concurrency=1,
+        local=lambda entity: "light.local" if entity["entity_id"] != "light.light_1" else None,
+    )
+
+    assert suggestions == ["light.local", "light.light_1_new", "light.local"]
+    assert prompted == ["light.light_1"]
+
+
+@pytest.mark.asyncio
+async def test_async_suggest_only_requests_missing_items_again():
+    """Test rows missing from a reply are asked for again on their own."""
+    entities = _entities(3)
+    calls = []
+
+    def _create(**kwargs):
+        rows = _prompted_rows(kwargs)
+        calls.append([entity_id for _, entity_id in rows])
+        # The first reply leaves out the second row
+        answered = rows if len(calls) > 1 else [rows[0], rows[2]]
+        return _reply(
+            json.dumps(
+                {
+                    "suggestions": [
+                        {"id": key, "suggestion": f"{entity_id}_new"} for key, entity_id in answered
+                    ]
+                }
+            )
+        )
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=_create)
+
+    suggestions = await async_suggest(
+        client,
+        "system",
+        "instructions\n",
+        entities,
+        describe_entity,
+        chunk_tokens=1000,
+        max_concurrency=1,
+    )
+
+    assert suggestions == [f"{entity['entity_id']}_new" for entity in entities]
+    assert calls == [["light.light_0", "light.light_1", "light.light_2"], ["light.light_1"]]
+
+
+@pytest.mark.asyncio
+async def test_async_suggest_entities_names_look_alikes_from_one_template():
+    """Test a group of look-alike entities takes one prompt row and one template."""
+    entities = [
+        {
+            "entity_id": f"sensor.shellyplug_{area.lower()}_power",
+            "name": f"{area} Plug Power",
+            "original_name": "Power",
+            "device_name": f"{area} Plug",
+            "device_model": "Plug S",
+            "area_name": area,
+        }
+        for area in ("Kitchen", "Office", "Garage")
+    ] + _entities(1)
+    prompts = []
+
+    def _create(**kwargs):
+        rows = _prompted_rows(kwargs)
+        prompts.append(rows)
+        if "template" in kwargs["messages"][1]["content"]:
+            answer = "sensor.{location}_{device}_power"
+            reply = [{"id": key, "suggestion": answer} for key, _ in rows]
+        else:
+            reply = [{"id": key, "suggestion": f"{entity_id}_new"} for key, entity_id in rows]
+        return _reply(json.dumps({"suggestions": reply}))
+
+    client = MagicMock()
+    client.chat.completions.create = AsyncMock(side_effect=_create)
+
+    suggestions = await async_suggest_entities(
+        client, entities, chunk_tokens=1000, max_concurrency=1
+    )
+
+    assert suggestions == [
+        "sensor.kitchen_plug_power",
+        "sensor.office_plug_power",
+        "sensor.garage_plug_power",
+        "light.light_0_new",
+    ]
+    assert prompts == [[("1", "sensor")], [("1", "light.light_0")]]